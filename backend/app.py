@@ -1,16 +1,31 @@
-from flask import Flask, request, jsonify, render_template, session
+from flask import Flask, Response, request, jsonify, render_template, session, g
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
-from flask_session import Session  # Add this import
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime, timedelta
-import pickle
-import numpy as np
 import os
+import logging
 import random
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
+import time
+from app_logging import setup_logging, get_logger
+from model_registry import ModelRegistry
+from prediction_cache import PredictionCache, cache_key
+from price_grid import PriceGrid
+from history_writer import HistoryWriter
+from otp_delivery import OTPDeliveryService
+from otp_sweeper import OTPSweeper
+from password_hashing import hash_password, verify_password, needs_rehash
+from metrics import Metrics
+from db_config import configure_app, install_sqlite_pragmas
+from session_store import init_session_store
+from user_cache import UserCache
+from batch_predict import FEATURE_FIELDS, normalize_row, parse_batch_body, predict_batch as batch_predict_rows, MAX_BATCH_ROWS
+from price_sweep import parse_sweep, sweep_prices
+from history_export import ENCODERS as EXPORT_ENCODERS, FORMATS as EXPORT_FORMATS, stream_rows
+from prediction_stats import PredictionStats, GLOBAL_USER_ID, DEFAULT_DAYS as STATS_DEFAULT_DAYS, MAX_DAYS as STATS_MAX_DAYS
+
+# Structured logs go through a queue so request threads never block on stdout
+setup_logging()
+logger = get_logger('app')
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True)
@@ -22,29 +37,43 @@ app.config['SECRET_KEY'] = 'your-secret-key-change-this-in-production'
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production with HTTPS
 app.config['SESSION_COOKIE_HTTPONLY'] = True
-# app.config['SESSION_TYPE'] = 'filesystem'  # Filesystem not supported on Vercel
-# Session(app) # Use default cookie-based sessions for Vercel compatibility
+# Server-side sessions (SESSION_BACKEND=sqlite|memory|cookie) - cookie-based
+# on Vercel, see session_store.py
+session_store = init_session_store(app)
 
 # Disable caching for static files in development
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 
-# Database configuration
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL', 'sqlite:///' + os.path.join(base_dir, 'instance', 'laptop_price.db'))
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# Database configuration (WAL + busy timeout on SQLite, pooled Postgres - see db_config.py)
+configure_app(app, base_dir)
 db = SQLAlchemy(app)
-
-# Load models
-try:
-    model = pickle.load(open(os.path.join(base_dir, 'model.pkl'), 'rb'))
-    encoder = pickle.load(open(os.path.join(base_dir, 'encoder.pkl'), 'rb'))
-    scaler = pickle.load(open(os.path.join(base_dir, 'scaler.pkl'), 'rb'))
-except Exception as e:
-    print(f"Error loading models: {e}")
-    model = None
-    encoder = None
-    scaler = None
+with app.app_context():
+    install_sqlite_pragmas(db.engine)
+
+# Stage timings and error counts, served in Prometheus format at /metrics
+metrics = Metrics()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    if metrics.enabled and 'request_started' in g:
+        labels = (('endpoint', request.endpoint or 'unknown'), ('method', request.method))
+        metrics.observe('app_request_seconds', labels, time.perf_counter() - g.request_started)
+        metrics.increment('app_requests_total', labels + (('status', str(response.status_code)),))
+    return response
+
+# Models are loaded on the first prediction, not at import (keeps cold starts fast),
+# and reloaded in the background when the artifact files change
+model_registry = ModelRegistry(base_dir)
+prediction_cache = PredictionCache()
+# Precomputed prices for common configurations (built offline by price_grid.py)
+price_grid = PriceGrid(base_dir)
+user_cache = UserCache()
 
 # Database Models
 class User(db.Model):
@@ -57,10 +86,10 @@ class User(db.Model):
     predictions = db.relationship('Prediction', backref='user', lazy=True, cascade='all, delete-orphan')
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
 
     def to_dict(self):
         return {
@@ -71,6 +100,13 @@ class User(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
+# Any insert/update/delete of a User drops its cached profile
+user_cache.watch(User)
+
+def load_user_profile(user_id):
+    """User.to_dict() payload from the profile cache, loading the row on a miss"""
+    return user_cache.get_or_load(user_id, User.query.get)
+
 class OTP(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -80,6 +116,13 @@ class OTP(db.Model):
     expires_at = db.Column(db.DateTime, nullable=False)
     is_verified = db.Column(db.Boolean, default=False)
 
+    # Serves verify-otp (user, verified flag, code, then expiry range) and the
+    # per-user delete of unverified codes on signin/resend
+    __table_args__ = (
+        db.Index('ix_otp_user_verified_code_expires', 'user_id', 'is_verified', 'otp_code', 'expires_at'),
+        db.Index('ix_otp_expires_at', 'expires_at'),  # otp_sweeper.py deletes by expiry
+    )
+
 class Prediction(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
@@ -92,6 +135,11 @@ class Prediction(db.Model):
     predicted_price = db.Column(db.Float)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # /history pages are "WHERE user_id = ? AND id < ? ORDER BY id DESC"
+    __table_args__ = (
+        db.Index('ix_prediction_user_id_id', 'user_id', 'id'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -105,9 +153,49 @@ class Prediction(db.Model):
             'created_at': self.created_at.isoformat()
         }
 
-# Create tables
+class PredictionBrandStat(db.Model):
+    """Running price stats per user and brand (user_id 0 = all users), see prediction_stats.py"""
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    brand = db.Column(db.String(50), primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+    sum_price = db.Column(db.Float, nullable=False)
+    min_price = db.Column(db.Float, nullable=False)
+    max_price = db.Column(db.Float, nullable=False)
+
+class PredictionDayStat(db.Model):
+    """Running price stats per user and UTC day (user_id 0 = all users), see prediction_stats.py"""
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    day = db.Column(db.Date, primary_key=True)
+    count = db.Column(db.Integer, nullable=False)
+    sum_price = db.Column(db.Float, nullable=False)
+    min_price = db.Column(db.Float, nullable=False)
+    max_price = db.Column(db.Float, nullable=False)
+
+prediction_stats = PredictionStats(PredictionBrandStat.__table__, PredictionDayStat.__table__)
+prediction_stats.watch_deletes(User)
+
+# Create missing tables (with their indexes). Indexes missing on existing tables
+# are left to migrate_database.py - building them here would hold the write lock
+# at every boot, in every worker
 with app.app_context():
+    stats_missing = not db.inspect(db.engine).has_table(PredictionBrandStat.__tablename__)
     db.create_all()
+    inspector = db.inspect(db.engine)
+    missing_indexes = [
+        index.name for table in db.metadata.sorted_tables
+        for index in table.indexes
+        if index.name not in {existing['name'] for existing in inspector.get_indexes(table.name)}
+    ]
+    if missing_indexes:
+        logger.warning("Missing indexes %s - run python migrate_database.py", ', '.join(missing_indexes))
+    # First start with the stats tables: seed them from the existing history
+    if stats_missing:
+        with db.engine.begin() as connection:
+            prediction_stats.rebuild(connection, Prediction.__table__)
+
+# Prediction rows are written behind the response in bulk (see history_writer.py),
+# and the stats aggregates are updated in the same transaction
+history_writer = HistoryWriter(app, db, Prediction.__table__, on_insert=prediction_stats.apply)
 
 # OTP Configuration - Load from config file
 try:
@@ -119,7 +207,7 @@ try:
         SMTP_PASSWORD,
         DEV_MODE
     )
-    print("[OK] OTP configuration loaded successfully")
+    logger.info("OTP configuration loaded")
 except ImportError:
     # Default values if config file not found
     OTP_EXPIRY_MINUTES = 10
@@ -128,7 +216,30 @@ except ImportError:
     SMTP_EMAIL = 'rahulkadu191@gmail.com'
     SMTP_PASSWORD = 'fvwg oxax twrt lill'
     DEV_MODE = False
-    print("[WARNING] Warning: otp_config.py not found. Using default values.")
+    logger.warning("otp_config.py not found, using default OTP settings")
+
+# OTP_DEV_MODE=1 forces dev mode (tests, benchmarks) without editing otp_config.py
+if os.environ.get('OTP_DEV_MODE', '').lower() in ('1', 'true', 'yes'):
+    DEV_MODE = True
+
+# Expired OTPs are deleted in small batches by a background sweeper (see otp_sweeper.py)
+otp_sweeper = OTPSweeper(app, db)
+
+# Emails go out from a background queue over a reused SMTP connection
+otp_delivery = OTPDeliveryService(SMTP_SERVER, SMTP_PORT, SMTP_EMAIL, SMTP_PASSWORD, OTP_EXPIRY_MINUTES)
+
+# Subsystem counters from /api/status also show up as /metrics gauges
+metrics.register_gauges('laptop_price_model', model_registry.stats)
+metrics.register_info('laptop_price_model_info', lambda: {
+    'version': (model_registry.version or '')[:12] or None, 'source': model_registry.source})
+metrics.register_gauges('laptop_price_prediction_cache', prediction_cache.stats)
+metrics.register_gauges('laptop_price_user_cache', user_cache.stats)
+metrics.register_gauges('laptop_price_price_grid', price_grid.stats)
+metrics.register_gauges('laptop_price_history_writer', history_writer.stats)
+metrics.register_gauges('laptop_price_otp_delivery', otp_delivery.stats)
+metrics.register_gauges('laptop_price_otp_sweeper', otp_sweeper.stats)
+if session_store is not None:
+    metrics.register_gauges('laptop_price_sessions', session_store.stats)
 
 def generate_otp():
     """Generate a 6-digit OTP"""
@@ -138,60 +249,13 @@ def send_email_otp(email, otp_code, username):
     """Send OTP via email"""
     # Check if DEV_MODE is enabled
     if DEV_MODE:
-        print(f"\n{'='*60}")
-        print("📧 DEV MODE: Email not sent, printing OTP instead")
-        print(f"{'='*60}")
-        print(f"To: {email}")
-        print(f"Subject: Your Login OTP - Laptop Price Predictor")
-        print(f"OTP Code: {otp_code}")
-        print(f"Expires: {OTP_EXPIRY_MINUTES} minutes")
-        print(f"{'='*60}\n")
+        logger.info("DEV MODE: email not sent, logging OTP instead", extra={'fields': {
+            'email': email, 'otp_code': otp_code, 'expires_minutes': OTP_EXPIRY_MINUTES}})
         return True
     
-    # Production mode - actually send email
-    try:
-        msg = MIMEMultipart('alternative')
-        msg['From'] = SMTP_EMAIL
-        msg['To'] = email
-        msg['Subject'] = 'Your Login OTP - Laptop Price Predictor'
-        
-        html_body = f"""
-        <html>
-        <body style="font-family: Arial, sans-serif; padding: 20px; background-color: #f4f4f4;">
-            <div style="max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
-                <h2 style="color: #667eea; text-align: center;">💻 Laptop Price Predictor</h2>
-                <h3 style="color: #333;">Hello {username}!</h3>
-                <p style="font-size: 16px; color: #555;">Your One-Time Password (OTP) for login is:</p>
-                <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; font-size: 32px; font-weight: bold; text-align: center; padding: 20px; border-radius: 8px; letter-spacing: 5px; margin: 20px 0;">
-                    {otp_code}
-                </div>
-                <p style="font-size: 14px; color: #666;">This OTP will expire in {OTP_EXPIRY_MINUTES} minutes.</p>
-                <p style="font-size: 14px; color: #666;">If you didn't request this OTP, please ignore this email.</p>
-                <hr style="border: none; border-top: 1px solid #eee; margin: 20px 0;">
-                <p style="font-size: 12px; color: #999; text-align: center;">Laptop Price Prediction App</p>
-            </div>
-        </body>
-        </html>
-        """
-        
-        msg.attach(MIMEText(html_body, 'html'))
-        
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(SMTP_EMAIL, SMTP_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        
-        print(f"[OK] Email OTP sent to {email}")
-        return True
-    except Exception as e:
-        print(f"[ERROR] Email error: {e}")
-        # Fallback to console if email fails
-        print(f"\n{'='*60}")
-        print("OTP Code (email failed, showing here):")
-        print(f"OTP for {email}: {otp_code}")
-        print(f"{'='*60}\n")
-        return False
+    # Production mode - hand the email to the delivery workers; the request
+    # returns as soon as the OTP is in the database
+    return otp_delivery.submit(email, otp_code, username)
 
 def send_sms_otp(phone, otp_code, username):
     """Send OTP via SMS (using Twilio or similar service)"""
@@ -206,13 +270,12 @@ def send_sms_otp(phone, otp_code, username):
         #     to=phone
         # )
         
-        # For now, just print to console (for development)
-        print(f"[OK] SMS OTP would be sent to {phone}: {otp_code}")
-        print(f"  Message: Your Laptop Price Predictor OTP is: {otp_code}. Valid for {OTP_EXPIRY_MINUTES} minutes.")
+        # For now, just log it (for development)
+        logger.info("SMS OTP would be sent", extra={'fields': {
+            'phone': phone, 'otp_code': otp_code, 'expires_minutes': OTP_EXPIRY_MINUTES}})
         return True
     except Exception as e:
-        print(f"[ERROR] SMS error: {e}")
-        print(f"  OTP for {phone}: {otp_code}")
+        logger.exception("SMS error", extra={'fields': {'phone': phone, 'otp_code': otp_code}})
         return False
 
 # Authentication Routes
@@ -245,13 +308,15 @@ def signup():
         db.session.add(new_user)
         db.session.commit()
 
-        # Log user in
+        # Log user in (setting user_id gets the session a fresh id, see session_store.py)
+        user_data = new_user.to_dict()
+        user_cache.put(new_user.id, user_data)
         session['user_id'] = new_user.id
         session['username'] = new_user.username
 
         return jsonify({
             'message': 'Account created successfully',
-            'user': new_user.to_dict()
+            'user': user_data
         }), 201
 
     except Exception as e:
@@ -268,47 +333,63 @@ def signin():
             return jsonify({'error': 'Username and password are required'}), 400
 
         # Find user
-        user = User.query.filter_by(username=username).first()
+        with metrics.span('signin', 'user_lookup'):
+            user = User.query.filter_by(username=username).first()
 
-        if not user or not user.check_password(password):
+        with metrics.span('signin', 'password_check'):
+            password_ok = user is not None and user.check_password(password)
+        if not password_ok:
+            metrics.count_error('signin', 'invalid_credentials')
             return jsonify({'error': 'Invalid username or password'}), 401
 
+        # Upgrade hashes made with outdated parameters while we have the plain password
+        # (committed together with the OTP below)
+        if needs_rehash(user.password_hash):
+            with metrics.span('signin', 'password_rehash'):
+                user.set_password(password)
+
+        # Make sure expired OTPs from users who never come back get cleaned up
+        otp_sweeper.ensure_started()
+
         # Generate OTP
         otp_code = generate_otp()
         expires_at = datetime.utcnow() + timedelta(minutes=OTP_EXPIRY_MINUTES)
         
-        # Delete old OTPs for this user
-        try:
-            OTP.query.filter_by(user_id=user.id, is_verified=False).delete()
-                                    except Exception as e:
-        print(f"[WARNING] Could not delete old OTPs: {e}")
-        
-        # Create OTP records
-        email_otp = OTP(
-            user_id=user.id,
-            otp_code=otp_code,
-            otp_type='email',
-            expires_at=expires_at
-        )
-        db.session.add(email_otp)
-        
-        # If user has phone, create SMS OTP too (same code for simplicity)
-        if user.phone:
-            sms_otp = OTP(
+        with metrics.span('signin', 'otp_write'):
+            # Delete old OTPs for this user
+            try:
+                OTP.query.filter_by(user_id=user.id, is_verified=False).delete()
+            except Exception as e:
+                logger.warning("Could not delete old OTPs: %s", e, extra={'fields': {'user_id': user.id}})
+            
+            # Create OTP records
+            email_otp = OTP(
                 user_id=user.id,
                 otp_code=otp_code,
-                otp_type='sms',
+                otp_type='email',
                 expires_at=expires_at
             )
-            db.session.add(sms_otp)
-        
-        
-        # Send OTP via email
-        send_email_otp(user.email, otp_code, user.username)
+            db.session.add(email_otp)
+            
+            # If user has phone, create SMS OTP too (same code for simplicity)
+            if user.phone:
+                sms_otp = OTP(
+                    user_id=user.id,
+                    otp_code=otp_code,
+                    otp_type='sms',
+                    expires_at=expires_at
+                )
+                db.session.add(sms_otp)
+            
+            db.session.commit()
         
-        # Send OTP via SMS if phone exists
-        if user.phone:
-            send_sms_otp(user.phone, otp_code, user.username)
+        with metrics.span('signin', 'otp_send'):
+            # Send OTP via email
+            send_email_otp(user.email, otp_code, user.username)
+            
+            # Send OTP via SMS if phone exists
+            if user.phone:
+                send_sms_otp(user.phone, otp_code, user.username)
         
         # Store user_id temporarily in session (not fully authenticated yet)
         session['pending_user_id'] = user.id
@@ -323,6 +404,7 @@ def signin():
         }), 200
 
     except Exception as e:
+        metrics.count_error('signin', e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/verify-otp', methods=['POST'])
@@ -341,33 +423,38 @@ def verify_otp():
         user_id = session['pending_user_id']
         
         # Find valid OTP
-        otp_record = OTP.query.filter_by(
-            user_id=user_id,
-            otp_code=otp_code,
-            is_verified=False
-        ).filter(OTP.expires_at > datetime.utcnow()).first()
+        with metrics.span('verify_otp', 'otp_lookup'):
+            otp_record = OTP.query.filter_by(
+                user_id=user_id,
+                otp_code=otp_code,
+                is_verified=False
+            ).filter(OTP.expires_at > datetime.utcnow()).first()
         
         if not otp_record:
+            metrics.count_error('verify_otp', 'invalid_otp')
             return jsonify({'error': 'Invalid or expired OTP'}), 401
         
         # Mark OTP as verified
-        otp_record.is_verified = True
-        db.session.commit()
+        with metrics.span('verify_otp', 'otp_commit'):
+            otp_record.is_verified = True
+            db.session.commit()
         
         # Get user
-        user = User.query.get(user_id)
+        with metrics.span('verify_otp', 'user_lookup'):
+            user_data = load_user_profile(user_id)
         
-        # Fully authenticate user
+        # Fully authenticate user - the session id is rotated on save
         session.pop('pending_user_id', None)
-        session['user_id'] = user.id
-        session['username'] = user.username
+        session['user_id'] = user_data['id']
+        session['username'] = user_data['username']
         
         return jsonify({
             'message': 'Login successful',
-            'user': user.to_dict()
+            'user': user_data
         }), 200
         
     except Exception as e:
+        metrics.count_error('verify_otp', e)
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/resend-otp', methods=['POST'])
@@ -376,7 +463,7 @@ def resend_otp():
         if 'pending_user_id' not in session:
             return jsonify({'error': 'No pending authentication'}), 401
         
-        user = User.query.get(session['pending_user_id'])
+        user = load_user_profile(session['pending_user_id'])
         if not user:
             return jsonify({'error': 'User not found'}), 404
         
@@ -385,41 +472,41 @@ def resend_otp():
         expires_at = datetime.utcnow() + timedelta(minutes=OTP_EXPIRY_MINUTES)
         
         # Delete old unverified OTPs
-            try:
-            OTP.query.filter_by(user_id=user.id, is_verified=False).delete()
-                    except Exception as e:
-        print(f"[WARNING] Could not delete old OTPs: {e}")
+        try:
+            OTP.query.filter_by(user_id=user['id'], is_verified=False).delete()
+        except Exception as e:
+            logger.warning("Could not delete old OTPs: %s", e, extra={'fields': {'user_id': user['id']}})
         
         # Create new OTP records
         email_otp = OTP(
-            user_id=user.id,
+            user_id=user['id'],
             otp_code=otp_code,
             otp_type='email',
             expires_at=expires_at
         )
         db.session.add(email_otp)
         
-        if user.phone:
+        if user['phone']:
             sms_otp = OTP(
-                user_id=user.id,
+                user_id=user['id'],
                 otp_code=otp_code,
                 otp_type='sms',
                 expires_at=expires_at
             )
             db.session.add(sms_otp)
         
-            db.session.commit()
+        db.session.commit()
         
         # Send OTP
-        send_email_otp(user.email, otp_code, user.username)
-        if user.phone:
-            send_sms_otp(user.phone, otp_code, user.username)
+        send_email_otp(user['email'], otp_code, user['username'])
+        if user['phone']:
+            send_sms_otp(user['phone'], otp_code, user['username'])
         
         return jsonify({
             'message': 'OTP resent successfully',
             'otp_sent_to': {
-                'email': user.email,
-                'phone': user.phone if user.phone else None
+                'email': user['email'],
+                'phone': user['phone'] if user['phone'] else None
             }
         }), 200
         
@@ -434,11 +521,12 @@ def logout():
 @app.route('/api/check-auth', methods=['GET'])
 def check_auth():
     if 'user_id' in session:
-        user = User.query.get(session['user_id'])
-        if user:
+        # Served from the profile cache - polling clients don't hit the database
+        user_data = load_user_profile(session['user_id'])
+        if user_data:
             return jsonify({
                 'authenticated': True,
-                'user': user.to_dict()
+                'user': user_data
             }), 200
     return jsonify({'authenticated': False}), 200
 
@@ -459,81 +547,318 @@ def predict():
     if 'user_id' not in session:
         return jsonify({'error': 'Please login to make predictions'}), 401
 
-    if not model:
+    engine = model_registry.get()
+    if not engine:
         return jsonify({'error': 'Models not loaded'}), 500
         
-    try:
-        data = request.json
-        brand = data['brand']
-        processor_speed = float(data['processor_speed'])
-        ram_size = int(float(data['ram_size']))
-        storage_capacity = int(float(data['storage_capacity']))
-        screen_size = float(data['screen_size'])
-        weight = float(data['weight'])
-
-        # Encode Brand
+    # Same checks as /predict/batch: missing fields and inf/nan are a 400, not an
+    # infinite price (or a failed history insert) from the engine
+    with metrics.span('predict', 'parse'):
         try:
-            brand_encoded = encoder.transform([brand])[0]
-        except ValueError:
-            return jsonify({'error': f'Unknown brand: {brand}. Available brands: {list(encoder.classes_)}'}), 400
+            brand, processor_speed, ram_size, storage_capacity, screen_size, weight = \
+                normalize_row(request.get_json(silent=True))
+        except ValueError as e:
+            metrics.count_error('predict', 'invalid_input')
+            return jsonify({'error': str(e)}), 400
 
-        # Prepare features for scaling
-        features = np.array([[brand_encoded, processor_speed, ram_size, storage_capacity, screen_size, weight]])
-        
-        # Scale features
-        scaled_features = scaler.transform(features)
-
-        # Predict
-        prediction = model.predict(scaled_features)[0]
-
-        # Save to DB with user_id
-        new_prediction = Prediction(
-            user_id=session['user_id'],
-            brand=brand,
-            processor_speed=processor_speed,
-            ram_size=ram_size,
-            storage_capacity=storage_capacity,
-            screen_size=screen_size,
-            weight=weight,
-            predicted_price=prediction
-        )
-        db.session.add(new_prediction)
-        db.session.commit()
-        print(f"[OK] Prediction saved: ID={new_prediction.id}, User={session['user_id']}, Brand={brand}, Price={prediction}")
+    try:
+
+        # Serve repeated configurations from the cache
+        with metrics.span('predict', 'cache_lookup'):
+            key = cache_key(brand, processor_speed, ram_size, storage_capacity, screen_size, weight)
+            prediction = prediction_cache.get(key, engine.version)
+
+        if prediction is None:
+            with metrics.span('predict', 'grid_lookup'):
+                prediction = price_grid.lookup(key, engine.version)
+
+        if prediction is None:
+            # Off the grid - encode brand, scale and predict in one call
+            try:
+                with metrics.span('predict', 'inference'):
+                    prediction = engine.predict_one(*key)
+            except ValueError:
+                metrics.count_error('predict', 'unknown_brand')
+                return jsonify({'error': f'Unknown brand: {brand}. Available brands: {engine.classes_}'}), 400
+            prediction_cache.put(key, prediction, engine.version)
+
+        # Save to DB with user_id (queued for a bulk insert unless in durable mode)
+        with metrics.span('predict', 'db_write'):
+            history_writer.write([{
+                'user_id': session['user_id'],
+                'brand': brand,
+                'processor_speed': processor_speed,
+                'ram_size': ram_size,
+                'storage_capacity': storage_capacity,
+                'screen_size': screen_size,
+                'weight': weight,
+                'predicted_price': prediction
+            }])
+        logger.debug("Prediction saved", extra={'fields': {
+            'user_id': session['user_id'], 'brand': brand, 'price': prediction}})
+
+        with metrics.span('predict', 'serialize'):
+            return jsonify({'price': prediction, 'model_version': engine.version[:12]})
+
+    except Exception as e:
+        metrics.count_error('predict', e)
+        logger.exception("Prediction error")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/predict/batch', methods=['POST'])
+def predict_batch():
+    """Price many laptops in one request (JSON array, NDJSON or CSV body)"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Please login to make predictions'}), 401
+
+    engine = model_registry.get()
+    if not engine:
+        return jsonify({'error': 'Models not loaded'}), 500
+
+    try:
+        rows = parse_batch_body(request.get_data(), request.content_type)
+    except ValueError as e:
+        return jsonify({'error': f'Could not parse batch: {e}'}), 400
+
+    if len(rows) > MAX_BATCH_ROWS:
+        return jsonify({'error': f'Batch too large: {len(rows)} rows (max {MAX_BATCH_ROWS})'}), 413
+
+    try:
+        results = batch_predict_rows(rows, engine)
+
+        # Save successful rows to history in one bulk insert (?save=false to skip)
+        if request.args.get('save', 'true').lower() not in ('0', 'false', 'no'):
+            history_writer.write([
+                dict(result['values'], user_id=session['user_id'], predicted_price=result['price'])
+                for result in results if 'price' in result
+            ])
+
+        for result in results:
+            result.pop('values', None)
+
+        succeeded = sum(1 for result in results if 'price' in result)
+        logger.info("Batch prediction", extra={'fields': {
+            'user_id': session['user_id'], 'rows': len(results), 'priced': succeeded}})
+
+        return jsonify({
+            'results': results,
+            'total': len(results),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'model_version': engine.version[:12]
+        })
+
+    except Exception as e:
+        metrics.count_error('predict_batch', e)
+        logger.exception("Batch prediction error")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/predict/sweep', methods=['POST'])
+def predict_sweep():
+    """Price curve (one axis) or surface (two axes) around a base configuration"""
+    if 'user_id' not in session:
+        return jsonify({'error': 'Please login to make predictions'}), 401
 
-        return jsonify({'price': prediction})
+    engine = model_registry.get()
+    if not engine:
+        return jsonify({'error': 'Models not loaded'}), 500
+
+    with metrics.span('predict_sweep', 'parse'):
+        try:
+            base, axes = parse_sweep(request.get_json(silent=True))
+        except ValueError as e:
+            metrics.count_error('predict_sweep', 'invalid_sweep')
+            return jsonify({'error': str(e)}), 400
 
+    try:
+        with metrics.span('predict_sweep', 'inference'):
+            prices = sweep_prices(base, axes, engine)
+    except ValueError:
+        metrics.count_error('predict_sweep', 'unknown_brand')
+        return jsonify({'error': f'Unknown brand. Available brands: {engine.classes_}'}), 400
     except Exception as e:
-        print(f"[ERROR] Prediction error: {e}")
-        import traceback
-        traceback.print_exc()
+        metrics.count_error('predict_sweep', e)
+        logger.exception("Sweep prediction error")
         return jsonify({'error': str(e)}), 500
 
+    with metrics.span('predict_sweep', 'serialize'):
+        return jsonify({
+            'base': dict(zip(FEATURE_FIELDS, base)),
+            'axes': [{'feature': feature, 'values': values} for feature, values in axes],
+            'prices': prices.tolist(),
+            'min_price': float(prices.min()),
+            'max_price': float(prices.max()),
+            'model_version': engine.version[:12]
+        })
+
+@app.route('/api/status', methods=['GET'])
+def status():
+    """Model load status and counters of the background subsystems"""
+    return jsonify({
+        'model': model_registry.stats(),
+        'prediction_cache': prediction_cache.stats(),
+        'price_grid': price_grid.stats(),
+        'history_writer': history_writer.stats(),
+        'otp_delivery': otp_delivery.stats(),
+        'otp_sweeper': otp_sweeper.stats(),
+        'sessions': session_store.stats() if session_store is not None else {'backend': 'cookie'},
+        'user_cache': user_cache.stats()
+    }), 200
+
+# Columns returned by /history - selected directly so no ORM objects are built
+HISTORY_COLUMNS = (
+    Prediction.id,
+    Prediction.brand,
+    Prediction.processor_speed,
+    Prediction.ram_size,
+    Prediction.storage_capacity,
+    Prediction.screen_size,
+    Prediction.weight,
+    Prediction.predicted_price,
+    Prediction.created_at,
+)
+HISTORY_DEFAULT_LIMIT = 500
+HISTORY_MAX_LIMIT = 1000
+# How long a history read waits for the user's own queued predictions to be inserted
+HISTORY_FLUSH_TIMEOUT = float(os.environ.get('HISTORY_FLUSH_TIMEOUT_SECONDS', 2))
+
+def parse_since(value):
+    """Parse the ?since= filter (YYYY-MM-DD or ISO datetime)"""
+    return datetime.fromisoformat(value.strip().replace('Z', ''))
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage histograms, request/error counters and subsystem gauges in Prometheus text format"""
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
 @app.route('/history', methods=['GET'])
 def history():
-    # Debug logging
-    print(f"[DEBUG] /history endpoint called")
-    print(f"[DEBUG] Session contents: {dict(session)}")
-    print(f"[DEBUG] Cookies: {request.cookies}")
-    
+    """Newest-first prediction history, one page at a time.
+
+    Query params: limit (default 500, max 1000), before_id (cursor from the
+    X-Next-Before-Id header of the previous page), since (date/datetime).
+    """
+    # Session/cookie dumps only at LOG_LEVEL=DEBUG - building them is not free on the hot path
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("/history called", extra={'fields': {
+            'session': dict(session), 'cookies': dict(request.cookies)}})
+
     # Check authentication
     if 'user_id' not in session:
-        print(f"[DEBUG] No user_id in session - returning 401")
         return jsonify({'error': 'Please login to view history'}), 401
 
     user_id = session['user_id']
-    print(f"[DEBUG] Fetching predictions for user_id: {user_id}")
-    
-    # Get only the logged-in user's predictions
-    predictions = Prediction.query.filter_by(user_id=user_id).order_by(Prediction.id.desc()).all()
-    print(f"[DEBUG] Found {len(predictions)} predictions for user {user_id}")
-    
-    if predictions:
-        print(f"[DEBUG] First prediction: {predictions[0].to_dict()}")
-    
-    result = [p.to_dict() for p in predictions]
-    print(f"[DEBUG] Returning {len(result)} predictions")
-    return jsonify(result)
+
+    try:
+        limit = min(max(int(request.args.get('limit', HISTORY_DEFAULT_LIMIT)), 1), HISTORY_MAX_LIMIT)
+        # Not type=int: that turns a malformed cursor into None, i.e. the first page
+        before_id = int(request.args['before_id']) if 'before_id' in request.args else None
+        since = parse_since(request.args['since']) if request.args.get('since') else None
+    except ValueError:
+        metrics.count_error('history', 'invalid_parameters')
+        return jsonify({'error': 'Invalid limit, before_id or since parameter'}), 400
+
+    # Read-your-writes: the user's own predictions still in the write queue go in first
+    if not history_writer.flush(user_id=user_id, timeout=HISTORY_FLUSH_TIMEOUT):
+        logger.warning("History read before the user's queued rows were written", extra={'fields': {'user_id': user_id}})
+
+    # Keyset pagination on the primary key: each page is an index range scan
+    with metrics.span('history', 'query'):
+        query = db.session.query(*HISTORY_COLUMNS).filter(Prediction.user_id == user_id)
+        if before_id is not None:
+            query = query.filter(Prediction.id < before_id)
+        if since is not None:
+            query = query.filter(Prediction.created_at >= since)
+        rows = query.order_by(Prediction.id.desc()).limit(limit + 1).all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    with metrics.span('history', 'serialize'):
+        result = [{
+            'id': row.id,
+            'brand': row.brand,
+            'processor_speed': row.processor_speed,
+            'ram_size': row.ram_size,
+            'storage_capacity': row.storage_capacity,
+            'screen_size': row.screen_size,
+            'weight': row.weight,
+            'predicted_price': row.predicted_price,
+            'created_at': row.created_at.isoformat()
+        } for row in rows]
+        response = jsonify(result)
+
+    logger.debug("History page served", extra={'fields': {'user_id': user_id, 'rows': len(result)}})
+
+    if has_more:
+        next_before_id = rows[-1].id
+        response.headers['X-Next-Before-Id'] = str(next_before_id)
+        response.headers['Link'] = f'</history?limit={limit}&before_id={next_before_id}>; rel="next"'
+    return response
+
+@app.route('/history/export', methods=['GET'])
+def history_export():
+    """Download the whole history, oldest first, streamed in chunks.
+
+    Query params: format (csv, ndjson or columnar; default csv), since (date/datetime).
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Please login to export history'}), 401
+
+    user_id = session['user_id']
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        metrics.count_error('history_export', 'invalid_format')
+        return jsonify({'error': f"Unknown format: {export_format}. Use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    try:
+        since = parse_since(request.args['since']) if request.args.get('since') else None
+    except ValueError:
+        metrics.count_error('history_export', 'invalid_parameters')
+        return jsonify({'error': 'Invalid since parameter'}), 400
+
+    # The user's rows still queued by the history writer are included (bounded wait)
+    history_writer.flush(user_id=user_id, timeout=HISTORY_FLUSH_TIMEOUT)
+    statement = db.select(*HISTORY_COLUMNS).where(Prediction.user_id == user_id)
+    if since is not None:
+        statement = statement.where(Prediction.created_at >= since)
+    statement = statement.order_by(Prediction.id)
+
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    body = EXPORT_ENCODERS[export_format](stream_rows(db.engine, statement))
+    return Response(body, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename=history-{user_id}.{extension}',
+        'X-Accel-Buffering': 'no',
+    })
+
+@app.route('/history/stats', methods=['GET'])
+def history_stats():
+    """Prediction count and average/min/max price - overall, per brand and per day.
+
+    Query params: scope (user or global; default user), days (per-day window,
+    default 30, max 366). Served from the aggregates in prediction_stats.py.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Please login to view stats'}), 401
+
+    scope = request.args.get('scope', 'user').lower()
+    if scope not in ('user', 'global'):
+        metrics.count_error('history_stats', 'invalid_parameters')
+        return jsonify({'error': 'scope must be user or global'}), 400
+    try:
+        days = min(max(int(request.args.get('days', STATS_DEFAULT_DAYS)), 1), STATS_MAX_DAYS)
+    except ValueError:
+        metrics.count_error('history_stats', 'invalid_parameters')
+        return jsonify({'error': 'Invalid days parameter'}), 400
+
+    # The user's own queued predictions are counted (bounded wait); global stats
+    # show what has been written so far
+    if scope == 'user':
+        history_writer.flush(user_id=session['user_id'], timeout=HISTORY_FLUSH_TIMEOUT)
+    with metrics.span('history_stats', 'query'):
+        user_id = session['user_id'] if scope == 'user' else GLOBAL_USER_ID
+        result = prediction_stats.read(db.session.connection(), user_id, days)
+    result['scope'] = scope
+    result['days'] = days
+    return jsonify(result), 200
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -0,0 +1,135 @@
+"""
+Logging setup - leveled, structured (JSON) logs written off the request thread.
+
+Request threads only put records on an in-memory queue; a QueueListener
+thread formats them and writes to stdout. DEBUG records are sampled so a
+busy route can log at debug level without flooding the output.
+
+Environment:
+    LOG_LEVEL              DEBUG / INFO (default) / WARNING / ERROR
+    LOG_FORMAT             json (default) or text
+    LOG_ASYNC              1 to write from a background thread (default; off on Vercel)
+    LOG_DEBUG_SAMPLE_RATE  fraction of DEBUG records kept (default 1.0)
+
+Attach structured fields with extra={'fields': {...}}.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+
+LOGGER_NAME = 'laptop_price'
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json').lower()
+LOG_ASYNC = os.environ.get('LOG_ASYNC', '0' if os.environ.get('VERCEL') else '1').lower() in ('1', 'true', 'yes')
+LOG_DEBUG_SAMPLE_RATE = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 1.0))
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        return line
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of DEBUG records (records may set extra={'sample_rate': x})"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        rate = getattr(record, 'sample_rate', self.rate if record.levelno <= logging.DEBUG else 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Resolve the message in the caller's thread but leave formatting to the listener"""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Tracebacks reference frames that may change once the request moves on
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_listener = None
+
+
+def setup_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, use_queue=LOG_ASYNC, sample_rate=LOG_DEBUG_SAMPLE_RATE,
+                  stream=None):
+    """Configure the 'laptop_price' logger tree once; returns the root app logger"""
+    global _listener
+    logger = logging.getLogger(LOGGER_NAME)
+    if getattr(logger, '_configured', False):
+        return logger
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if fmt == 'json' else TextFormatter())
+
+    if use_queue:
+        log_queue = queue.SimpleQueue()
+        handler = _QueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+        _listener.start()
+        atexit.register(stop_logging)
+    else:
+        handler = output
+
+    handler.addFilter(SamplingFilter(sample_rate))
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    logger._configured = True
+    return logger
+
+
+def stop_logging():
+    """Flush queued records (called automatically at exit)"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name=None):
+    return logging.getLogger(f'{LOGGER_NAME}.{name}' if name else LOGGER_NAME)
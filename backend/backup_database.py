@@ -0,0 +1,192 @@
+"""
+Hot backup and restore of the SQLite database with SQLite's online backup API.
+
+The backup copies PAGES_PER_STEP pages at a time and sleeps between steps,
+releasing its lock so the app's writers can commit. A write from another
+connection makes SQLite restart the copy; after MAX_RESTARTS restarts the
+rest is copied in one step (a single read transaction - in WAL mode that
+still doesn't block writers). Either way the result is a consistent
+snapshot. It is then checked with PRAGMA integrity_check and optionally
+gzip-compressed.
+
+Restore checks the backup the same way and copies it into the live database
+with the backup API in one step, so connections the app holds stay valid
+(a file copy over a database in WAL mode would corrupt it).
+
+Usage:
+    python backup_database.py backup [--db laptop_price.db] [--output FILE] [--compress]
+    python backup_database.py restore BACKUP [--db laptop_price.db]
+Backups default to backups/<db name>-<UTC timestamp>.db[.gz].
+"""
+import argparse
+import gzip
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime
+
+from db_config import database_url
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+backup_dir = os.path.join(base_dir, 'backups')
+
+PAGES_PER_STEP = int(os.environ.get('BACKUP_PAGES_PER_STEP', 1024))
+STEP_SLEEP_SECONDS = float(os.environ.get('BACKUP_STEP_SLEEP_SECONDS', 0.005))
+MAX_RESTARTS = 10
+COPY_CHUNK_BYTES = 1 << 20
+
+
+class BackupError(Exception):
+    """A backup (or the file offered for restore) failed its integrity check"""
+
+
+class _Restarted(Exception):
+    pass
+
+
+def default_db_path():
+    """The database app.py uses (DATABASE_URL), when it is a SQLite file"""
+    url = database_url(base_dir)
+    if not url.startswith('sqlite:///'):
+        raise SystemExit(f"[ERROR] {url.split(':', 1)[0]} databases are backed up with their own tools")
+    return url[len('sqlite:///'):]
+
+
+def integrity_check(path):
+    conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+    try:
+        result = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+    except sqlite3.DatabaseError as e:
+        result = [str(e)]
+    finally:
+        conn.close()
+    if result != ['ok']:
+        raise BackupError(f'{path} failed the integrity check: {"; ".join(result[:5])}')
+
+
+def _copy_pages(source, target, pages, sleep):
+    """Online-backup source into target; returns the number of restarts"""
+    stats = {'restarts': 0, 'remaining': None}
+
+    def progress(status, remaining, total):
+        # remaining goes back up when another connection's write restarted the copy
+        if stats['remaining'] is not None and remaining >= stats['remaining']:
+            stats['restarts'] += 1
+            if stats['restarts'] > MAX_RESTARTS:
+                raise _Restarted()
+        stats['remaining'] = remaining
+
+    try:
+        source.backup(target, pages=pages, progress=progress, sleep=sleep)
+    except _Restarted:
+        source.backup(target, pages=-1)
+    return stats['restarts']
+
+
+def backup(db_path, output_path=None, compress=False, pages=PAGES_PER_STEP, sleep=STEP_SLEEP_SECONDS):
+    """Write a checked (and optionally gzipped) snapshot of db_path; returns a summary dict"""
+    if output_path is None:
+        name = os.path.splitext(os.path.basename(db_path))[0]
+        output_path = os.path.join(backup_dir, f"{name}-{datetime.utcnow():%Y%m%d-%H%M%S}.db" + ('.gz' if compress else ''))
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    start = time.perf_counter()
+    fd, snapshot = tempfile.mkstemp(suffix='.db', dir=os.path.dirname(os.path.abspath(output_path)))
+    os.close(fd)
+    try:
+        source = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+        target = sqlite3.connect(snapshot)
+        try:
+            restarts = _copy_pages(source, target, pages, sleep)
+            # The copy keeps the source's WAL flag; a backup should be one self-contained file
+            target.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            target.close()
+            source.close()
+        copied = time.perf_counter()
+        integrity_check(snapshot)
+        checked = time.perf_counter()
+
+        if compress:
+            with open(snapshot, 'rb') as f_in, gzip.open(output_path + '.tmp', 'wb', compresslevel=6) as f_out:
+                shutil.copyfileobj(f_in, f_out, COPY_CHUNK_BYTES)
+            os.replace(output_path + '.tmp', output_path)
+        else:
+            os.replace(snapshot, output_path)
+    finally:
+        if os.path.exists(snapshot):
+            os.remove(snapshot)
+
+    return {
+        'path': output_path,
+        'bytes': os.path.getsize(output_path),
+        'source_bytes': os.path.getsize(db_path),
+        'restarts': restarts,
+        'copy_seconds': copied - start,
+        'check_seconds': checked - copied,
+        'seconds': time.perf_counter() - start,
+    }
+
+
+def restore(backup_path, db_path):
+    """Replace db_path's contents with a checked backup; returns a summary dict"""
+    start = time.perf_counter()
+    target_dir = os.path.dirname(os.path.abspath(db_path))
+    os.makedirs(target_dir, exist_ok=True)
+    snapshot = backup_path
+    if backup_path.endswith('.gz'):
+        fd, snapshot = tempfile.mkstemp(suffix='.db', dir=target_dir)
+        with os.fdopen(fd, 'wb') as f_out, gzip.open(backup_path, 'rb') as f_in:
+            shutil.copyfileobj(f_in, f_out, COPY_CHUNK_BYTES)
+    try:
+        integrity_check(snapshot)
+        if os.path.exists(db_path):
+            # Through the backup API: one exclusive step, open connections see the new content
+            source = sqlite3.connect(f'file:{snapshot}?mode=ro', uri=True)
+            target = sqlite3.connect(db_path, timeout=30)
+            try:
+                source.backup(target, pages=-1)
+            finally:
+                target.close()
+                source.close()
+        elif snapshot is backup_path:
+            shutil.copyfile(snapshot, db_path)
+        else:
+            os.replace(snapshot, db_path)
+    finally:
+        if snapshot is not backup_path and os.path.exists(snapshot):
+            os.remove(snapshot)
+    return {'path': db_path, 'bytes': os.path.getsize(db_path), 'seconds': time.perf_counter() - start}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Hot backup / restore of the SQLite database')
+    commands = parser.add_subparsers(dest='command', required=True)
+    backup_parser = commands.add_parser('backup', help='write a consistent, checked copy')
+    backup_parser.add_argument('--db', help='database file (default: the one DATABASE_URL points at)')
+    backup_parser.add_argument('--output', help='backup file (default: backups/<name>-<timestamp>.db[.gz])')
+    backup_parser.add_argument('--compress', action='store_true', help='gzip the backup')
+    backup_parser.add_argument('--pages', type=int, default=PAGES_PER_STEP, help='pages copied per step')
+    restore_parser = commands.add_parser('restore', help='check a backup and copy it into the database')
+    restore_parser.add_argument('backup', help='.db or .db.gz backup file')
+    restore_parser.add_argument('--db', help='database file (default: the one DATABASE_URL points at)')
+    args = parser.parse_args()
+
+    db_path = args.db or default_db_path()
+    try:
+        if args.command == 'backup':
+            if not os.path.exists(db_path):
+                raise SystemExit(f"[ERROR] Database not found at {db_path}")
+            summary = backup(db_path, args.output, args.compress, args.pages)
+            print(f"[OK] Backed up {db_path} ({summary['source_bytes'] / 1024:.1f} KB) -> {summary['path']} "
+                  f"({summary['bytes'] / 1024:.1f} KB) in {summary['seconds']:.2f}s, integrity ok")
+            if summary['restarts']:
+                print(f"[WARNING] Concurrent writes restarted the copy {summary['restarts']} times")
+        else:
+            summary = restore(args.backup, db_path)
+            print(f"[OK] Restored {args.backup} -> {db_path} ({summary['bytes'] / 1024:.1f} KB) "
+                  f"in {summary['seconds']:.2f}s, integrity ok")
+    except BackupError as e:
+        raise SystemExit(f"[ERROR] {e}")
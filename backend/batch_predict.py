@@ -0,0 +1,104 @@
+"""
+Batch prediction helpers - parse a list of laptop configurations and
+price them with one encoder/scaler/model call per chunk
+"""
+import csv
+import io
+import json
+import math
+
+FEATURE_FIELDS = ('brand', 'processor_speed', 'ram_size', 'storage_capacity', 'screen_size', 'weight')
+
+MAX_BATCH_ROWS = 10000  # Hard limit on rows accepted in one request
+BATCH_CHUNK_SIZE = 1000  # Rows sent to the model per call
+
+
+def parse_batch_body(body, content_type):
+    """Parse a JSON array, NDJSON or CSV request body into a list of dicts"""
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    text = body.decode('utf-8-sig') if isinstance(body, bytes) else body
+
+    if content_type in ('text/csv', 'application/csv'):
+        return [dict(row) for row in csv.DictReader(io.StringIO(text))]
+
+    if content_type in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    data = json.loads(text)
+    # Accept either a bare array or {"items": [...]}
+    if isinstance(data, dict):
+        data = data.get('items')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of laptop configurations')
+    return data
+
+
+def normalize_row(row):
+    """Coerce one configuration the same way /predict does, or raise ValueError"""
+    if not isinstance(row, dict):
+        raise ValueError('Row must be an object')
+    missing = [field for field in FEATURE_FIELDS if row.get(field) in (None, '')]
+    if missing:
+        raise ValueError(f"Missing fields: {', '.join(missing)}")
+    try:
+        numbers = [float(row[field]) for field in FEATURE_FIELDS[1:]]
+        # inf/nan parse as floats (and int(inf) overflows) - reject them per row
+        if not all(math.isfinite(number) for number in numbers):
+            raise ValueError
+        processor_speed, ram_size, storage_capacity, screen_size, weight = numbers
+        return (
+            str(row['brand']).strip(),
+            processor_speed,
+            int(ram_size),
+            int(storage_capacity),
+            screen_size,
+            weight,
+        )
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError('Numeric fields must be finite numbers')
+
+
+def predict_batch(rows, engine, chunk_size=BATCH_CHUNK_SIZE):
+    """Price every row; returns one result dict per input row, in order.
+
+    Rows that fail validation or use an unknown brand get an 'error' entry
+    instead of a 'price' and never abort the rest of the batch. `engine` is
+    any inference engine from inference.py.
+    """
+    import numpy as np  # Imported here so app.py can load without numpy until it predicts
+
+    results = [None] * len(rows)
+    known_brands = set(engine.classes_)
+    valid = []  # (index, normalized tuple)
+
+    for index, row in enumerate(rows):
+        try:
+            values = normalize_row(row)
+        except ValueError as e:
+            results[index] = {'index': index, 'error': str(e)}
+            continue
+        if values[0] not in known_brands:
+            results[index] = {
+                'index': index,
+                'error': f'Unknown brand: {values[0]}. Available brands: {engine.classes_}'
+            }
+            continue
+        valid.append((index, values))
+
+    for start in range(0, len(valid), chunk_size):
+        chunk = valid[start:start + chunk_size]
+        brands = [values[0] for _, values in chunk]
+        features = np.empty((len(chunk), len(FEATURE_FIELDS)), dtype=np.float64)
+        features[:, 0] = engine.encode(brands)
+        features[:, 1:] = [values[1:] for _, values in chunk]
+
+        prices = engine.predict(features)
+
+        for (index, values), price in zip(chunk, prices):
+            results[index] = {
+                'index': index,
+                'values': dict(zip(FEATURE_FIELDS, values)),
+                'price': float(price)
+            }
+
+    return results
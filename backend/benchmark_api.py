@@ -0,0 +1,297 @@
+"""
+API load benchmark - drives signup -> signin -> verify-otp -> predict -> history
+flows with N concurrent virtual users and reports p50/p95/p99 latency and
+requests/sec per endpoint.
+
+Two targets:
+    inprocess  Flask test client inside this process (no network, no gunicorn)
+    gunicorn   a local gunicorn server started on a free port
+
+Both run against a throwaway SQLite database with OTP_DEV_MODE=1; OTP codes
+are read back from that database, so no email is sent.
+
+Usage:
+    python benchmark_api.py --mode inprocess --users 20 --concurrency 8 --predictions 20
+    python benchmark_api.py --mode gunicorn --workers 4 --users 50 --concurrency 16
+    python benchmark_api.py --compare results/a.json results/b.json
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+LAPTOPS = [
+    {'brand': 'HP', 'processor_speed': 3.5, 'ram_size': 8, 'storage_capacity': 512, 'screen_size': 15.6, 'weight': 2.0},
+    {'brand': 'Dell', 'processor_speed': 2.4, 'ram_size': 16, 'storage_capacity': 1000, 'screen_size': 14.0, 'weight': 1.6},
+    {'brand': 'Lenovo', 'processor_speed': 2.8, 'ram_size': 32, 'storage_capacity': 512, 'screen_size': 16.0, 'weight': 2.3},
+    {'brand': 'Asus', 'processor_speed': 3.1, 'ram_size': 8, 'storage_capacity': 256, 'screen_size': 13.3, 'weight': 1.2},
+]
+
+
+class Recorder:
+    """Collects (endpoint, latency, ok) samples from all threads"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, endpoint, seconds, ok):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((seconds, ok))
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(int(round(fraction * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def summarize(recorder, wall_seconds):
+    report = {}
+    for endpoint, samples in sorted(recorder.samples.items()):
+        latencies = sorted(seconds * 1000 for seconds, _ in samples)
+        report[endpoint] = {
+            'requests': len(samples),
+            'errors': sum(1 for _, ok in samples if not ok),
+            'p50_ms': percentile(latencies, 0.50),
+            'p95_ms': percentile(latencies, 0.95),
+            'p99_ms': percentile(latencies, 0.99),
+            'max_ms': latencies[-1],
+            'rps': len(samples) / wall_seconds if wall_seconds else 0.0,
+        }
+    return report
+
+
+class InProcessClient:
+    """One virtual user on the Flask test client"""
+
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self.client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HTTPClient:
+    """One virtual user talking HTTP to a running server (keeps its own cookies)"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'})
+        try:
+            with self.opener.open(req, timeout=60) as response:
+                return response.status, json.loads(response.read() or b'null')
+        except urllib.error.HTTPError as e:
+            return e.code, None
+
+
+def latest_otp(db_path, user_id):
+    """Read the pending OTP straight from the benchmark database (DEV_MODE capture)"""
+    conn = sqlite3.connect(db_path, timeout=30)
+    try:
+        row = conn.execute(
+            "SELECT otp_code FROM otp WHERE user_id = ? AND is_verified = 0 ORDER BY id DESC LIMIT 1", (user_id,)
+        ).fetchone()
+        return row[0] if row else None
+    finally:
+        conn.close()
+
+
+def run_flow(make_client, db_path, recorder, predictions, history_calls):
+    """signup -> signin -> verify-otp -> predict x N -> history x M for one virtual user"""
+    client = make_client()
+
+    def timed(endpoint, method, path, body=None, expect=(200,)):
+        start = time.perf_counter()
+        try:
+            status, payload = client.request(method, path, body)
+        except Exception:
+            status, payload = None, None
+        recorder.record(endpoint, time.perf_counter() - start, status in expect)
+        return status, payload
+
+    name = f'bench_{uuid.uuid4().hex[:12]}'
+    password = 'benchmark-pass'
+    status, payload = timed('signup', 'POST', '/api/signup',
+                            {'username': name, 'email': f'{name}@example.com', 'password': password}, expect=(201,))
+    if status != 201:
+        return
+    user_id = payload['user']['id']
+
+    status, _ = timed('signin', 'POST', '/api/signin', {'username': name, 'password': password})
+    if status != 200:
+        return
+    otp_code = latest_otp(db_path, user_id)
+    status, _ = timed('verify-otp', 'POST', '/api/verify-otp', {'otp': otp_code})
+    if status != 200:
+        return
+
+    for i in range(predictions):
+        timed('predict', 'POST', '/predict', LAPTOPS[i % len(LAPTOPS)])
+    for _ in range(history_calls):
+        timed('history', 'GET', '/history')
+    timed('check-auth', 'GET', '/api/check-auth')
+
+
+def free_port():
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+def benchmark_env(db_path, hash_method):
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + db_path, OTP_DEV_MODE='1')
+    if hash_method:
+        env['PASSWORD_HASH_METHOD'] = hash_method
+    return env
+
+
+def start_gunicorn(db_path, workers, hash_method):
+    port = free_port()
+    env = benchmark_env(db_path, hash_method)
+    # In-process sessions aren't shared between workers
+    env.setdefault('SESSION_BACKEND', 'sqlite')
+    env['SESSION_SQLITE_PATH'] = os.path.join(os.path.dirname(db_path), 'sessions.db')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'],
+        cwd=base_dir, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return process, f'http://127.0.0.1:{port}'
+        except OSError:
+            if process.poll() is not None:
+                raise RuntimeError('gunicorn exited during startup')
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError('gunicorn did not start within 60s')
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=base_dir, text=True).strip()
+    except Exception:
+        return 'unknown'
+
+
+def run_benchmark(args):
+    tmp_dir = tempfile.mkdtemp(prefix='laptop_price_bench_')
+    db_path = os.path.join(tmp_dir, 'bench.db')
+    server = None
+
+    if args.mode == 'inprocess':
+        os.environ.update(benchmark_env(db_path, args.hash_method))
+        sys.path.insert(0, base_dir)
+        from app import app
+        make_client = lambda: InProcessClient(app)  # noqa: E731
+    else:
+        # Create the schema once so gunicorn workers don't race on create_all
+        subprocess.run([sys.executable, '-c', 'import app'], cwd=base_dir,
+                       env=benchmark_env(db_path, args.hash_method), check=True, capture_output=True)
+        server, base_url = start_gunicorn(db_path, args.workers, args.hash_method)
+        make_client = lambda: HTTPClient(base_url)  # noqa: E731
+
+    recorder = Recorder()
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            futures = [pool.submit(run_flow, make_client, db_path, recorder, args.predictions, args.history)
+                       for _ in range(args.users)]
+            for future in futures:
+                future.result()
+        wall_seconds = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.utcnow().isoformat(),
+        'config': vars(args),
+        'wall_seconds': wall_seconds,
+        'endpoints': summarize(recorder, wall_seconds),
+    }
+
+
+def print_report(result):
+    print("=" * 86)
+    config = result['config']
+    print(f"API BENCHMARK  commit={result['commit']}  mode={config['mode']}  users={config['users']}  "
+          f"concurrency={config['concurrency']}  wall={result['wall_seconds']:.2f}s")
+    print("=" * 86)
+    print(f"{'endpoint':<12}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'req/s':>10}")
+    for endpoint, stats in result['endpoints'].items():
+        print(f"{endpoint:<12}{stats['requests']:>10}{stats['errors']:>8}{stats['p50_ms']:>10.2f}"
+              f"{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}{stats['rps']:>10.1f}")
+
+
+def compare(old_path, new_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"Comparing {old['commit']} -> {new['commit']}")
+    print(f"{'endpoint':<12}{'p50 ms':>18}{'p99 ms':>18}{'req/s':>18}")
+    for endpoint, stats in new['endpoints'].items():
+        before = old['endpoints'].get(endpoint)
+        if not before:
+            continue
+        cells = [f"{before[key]:.1f}->{stats[key]:.1f}" for key in ('p50_ms', 'p99_ms', 'rps')]
+        print(f"{endpoint:<12}" + ''.join(f"{cell:>18}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-test the Flask API')
+    parser.add_argument('--mode', choices=('inprocess', 'gunicorn'), default='inprocess')
+    parser.add_argument('--users', type=int, default=20, help='virtual users (one full flow each)')
+    parser.add_argument('--concurrency', type=int, default=8, help='flows running at once')
+    parser.add_argument('--predictions', type=int, default=20, help='/predict calls per user')
+    parser.add_argument('--history', type=int, default=5, help='/history calls per user')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers (gunicorn mode)')
+    parser.add_argument('--hash-method', default='', help='PASSWORD_HASH_METHOD for the target app')
+    parser.add_argument('--output', help='where to save the JSON result (default: benchmark_results/)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'), help='compare two saved results')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    result = run_benchmark(args)
+    print_report(result)
+
+    output = args.output or os.path.join(
+        base_dir, 'benchmark_results', f"api-{result['commit']}-{datetime.utcnow():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f"\n[OK] Results saved to {output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+"""
+Backup benchmark - on a synthetic database (default one million predictions,
+WAL mode like the app) compares export_to_sql.py's iterdump() dump with
+backup_database.py: time and size of each backup, time to restore it, and
+the slowest commit of a writer that keeps inserting while the backup runs.
+
+Usage: python benchmark_backup.py [--rows 1000000] [--write-interval-ms 10]
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from backup_database import backup, integrity_check, restore
+from benchmark_html_export import build_database
+
+
+class Writer(threading.Thread):
+    """Commits one prediction row every interval and records the slowest commit"""
+
+    def __init__(self, db_path, interval):
+        super().__init__(daemon=True)
+        self.conn = sqlite3.connect(db_path, timeout=60, check_same_thread=False)
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.commits = 0
+        self.max_seconds = 0.0
+
+    def run(self):
+        while not self.stop_event.is_set():
+            start = time.perf_counter()
+            self.conn.execute("INSERT INTO prediction (user_id, brand, predicted_price, created_at) "
+                              "VALUES (1, 'HP', 50000.0, datetime('now'))")
+            self.conn.commit()
+            self.max_seconds = max(self.max_seconds, time.perf_counter() - start)
+            self.commits += 1
+            time.sleep(self.interval)
+
+    def stop(self):
+        self.stop_event.set()
+        self.join()
+        self.conn.close()
+
+
+def dump_with_iterdump(db_path, output_path):
+    """What export_to_sql.py does"""
+    conn = sqlite3.connect(db_path)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for line in conn.iterdump():
+            f.write(f'{line}\n')
+    conn.close()
+
+
+def restore_from_dump(dump_path, db_path):
+    conn = sqlite3.connect(db_path)
+    with open(dump_path, encoding='utf-8') as f:
+        conn.executescript(f.read())
+    conn.close()
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare iterdump() with online-backup-API backups')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--write-interval-ms', type=float, default=10,
+                        help='concurrent writer pace during backups (0 disables the writer)')
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='laptop_price_backup_')
+    db_path = os.path.join(work_dir, 'bench.db')
+    build_database(db_path, args.rows, args.users)
+    mb = 2 ** 20
+    print(f"[OK] Synthetic database: {args.rows} predictions, {os.path.getsize(db_path) / mb:.1f} MB at {work_dir}\n")
+
+    results = []
+
+    def run_backup(function):
+        writer = Writer(db_path, args.write_interval_ms / 1000) if args.write_interval_ms else None
+        if writer:
+            writer.start()
+        start = time.perf_counter()
+        output = function()
+        elapsed = time.perf_counter() - start
+        if writer:
+            writer.stop()
+        return output, elapsed, (writer.max_seconds * 1000 if writer else None)
+
+    dump_path = os.path.join(work_dir, 'dump.sql')
+    _, seconds, stall = run_backup(lambda: dump_with_iterdump(db_path, dump_path))
+    restore_seconds = timed(restore_from_dump, dump_path, os.path.join(work_dir, 'from_dump.db'))
+    results.append(('iterdump .sql', seconds, os.path.getsize(dump_path), restore_seconds, stall, ''))
+
+    for compress in (False, True):
+        output = os.path.join(work_dir, 'backup.db' + ('.gz' if compress else ''))
+        summary, seconds, stall = run_backup(lambda: backup(db_path, output, compress))
+        restore_seconds = timed(restore, output, os.path.join(work_dir, f'restored_{int(compress)}.db'))
+        integrity_check(os.path.join(work_dir, f'restored_{int(compress)}.db'))
+        note = f"{summary['restarts']} restarts" if summary['restarts'] else ''
+        results.append(('backup API' + (' + gzip' if compress else ''), seconds, summary['bytes'],
+                        restore_seconds, stall, note))
+
+    print(f"{'method':<20} {'backup s':>9} {'size MB':>8} {'restore s':>10} {'max write ms':>13}")
+    for name, seconds, size, restore_seconds, stall, note in results:
+        stall_text = f'{stall:.1f}' if stall is not None else '-'
+        print(f"{name:<20} {seconds:>9.2f} {size / mb:>8.1f} {restore_seconds:>10.2f} {stall_text:>13}  {note}")
@@ -0,0 +1,109 @@
+"""
+Concurrent-write benchmark - several processes (like gunicorn workers) commit
+single prediction rows to one SQLite file while also reading history pages,
+once with SQLAlchemy's defaults and once with the db_config.py settings.
+
+Usage: python benchmark_db_writes.py [--workers 4] [--writes 300] [--reads-per-write 1]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+from multiprocessing import Pool
+
+from sqlalchemy import create_engine, text
+
+from db_config import engine_options, install_sqlite_pragmas
+
+CREATE_TABLE = """
+CREATE TABLE prediction (
+    id INTEGER PRIMARY KEY,
+    user_id INTEGER,
+    brand VARCHAR(50) NOT NULL,
+    processor_speed FLOAT NOT NULL,
+    ram_size INTEGER NOT NULL,
+    storage_capacity INTEGER NOT NULL,
+    screen_size FLOAT NOT NULL,
+    weight FLOAT NOT NULL,
+    predicted_price FLOAT NOT NULL,
+    created_at DATETIME
+)"""
+INSERT = text(
+    "INSERT INTO prediction (user_id, brand, processor_speed, ram_size, storage_capacity, screen_size, "
+    "weight, predicted_price, created_at) VALUES (:user_id, 'HP', 3.5, 8, 512, 15.6, 2.0, 40000.0, :created_at)"
+)
+HISTORY_PAGE = text("SELECT * FROM prediction WHERE user_id = :user_id ORDER BY id DESC LIMIT 50")
+
+
+def make_engine(url, tuned):
+    if not tuned:
+        return create_engine(url)
+    engine = create_engine(url, **engine_options(url))
+    install_sqlite_pragmas(engine)
+    return engine
+
+
+def run_worker(args):
+    url, tuned, worker_id, writes, reads_per_write = args
+    engine = make_engine(url, tuned)
+    commits = errors = 0
+    start = time.perf_counter()
+    for _ in range(writes):
+        try:
+            with engine.begin() as conn:
+                conn.execute(INSERT, {'user_id': worker_id, 'created_at': datetime.utcnow()})
+            commits += 1
+        except Exception:
+            errors += 1
+        for _ in range(reads_per_write):
+            try:
+                with engine.connect() as conn:
+                    conn.execute(HISTORY_PAGE, {'user_id': worker_id}).fetchall()
+            except Exception:
+                errors += 1
+    elapsed = time.perf_counter() - start
+    engine.dispose()
+    return commits, errors, elapsed
+
+
+def run(tuned, workers, writes, reads_per_write):
+    db_path = os.path.join(tempfile.mkdtemp(prefix='laptop_price_writes_'), 'bench.db')
+    url = 'sqlite:///' + db_path
+    setup = make_engine(url, tuned)
+    with setup.begin() as conn:
+        conn.execute(text(CREATE_TABLE))
+        conn.execute(text("CREATE INDEX ix_prediction_user_id_id ON prediction (user_id, id)"))
+    setup.dispose()
+
+    start = time.perf_counter()
+    with Pool(workers) as pool:
+        results = pool.map(run_worker, [(url, tuned, i, writes, reads_per_write) for i in range(workers)])
+    wall = time.perf_counter() - start
+    commits = sum(r[0] for r in results)
+    errors = sum(r[1] for r in results)
+    return commits, errors, wall
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent SQLite write throughput, default vs tuned')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--writes', type=int, default=300, help='commits per worker')
+    parser.add_argument('--reads-per-write', type=int, default=1, help='history reads after each commit')
+    args = parser.parse_args()
+
+    print("=" * 70)
+    print(f"CONCURRENT WRITES  workers={args.workers}  writes/worker={args.writes}  "
+          f"reads/write={args.reads_per_write}")
+    print("=" * 70)
+    baseline = None
+    for label, tuned in (('default', False), ('tuned', True)):
+        commits, errors, wall = run(tuned, args.workers, args.writes, args.reads_per_write)
+        rate = commits / wall
+        note = f"  ({rate / baseline:.1f}x)" if baseline else ''
+        print(f"{label:<8} {commits:>7} commits  {errors:>5} errors  {wall:7.2f}s  {rate:9.1f} commits/s{note}")
+        baseline = baseline or rate
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+HTML export benchmark - builds a synthetic SQLite database (default one
+million predictions) and times export_database_html.py against the old
+approach (fetchall() of every row, then one HTML string in memory).
+
+Each exporter runs in a fresh process so its peak RSS is its own.
+
+Usage: python benchmark_html_export.py [--rows 1000000] [--users 1000] [--rows-per-page 5000] [--skip-legacy]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import resource
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from export_database_html import export_to_html, prediction_row
+
+BRANDS = ('HP', 'Dell', 'Lenovo', 'Asus', 'Acer', 'Apple', 'MSI')
+INSERT_BATCH = 50000
+
+
+def build_database(path, rows, users):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(80), email VARCHAR(120), created_at DATETIME)')
+    conn.execute('''
+        CREATE TABLE prediction (
+            id INTEGER PRIMARY KEY, user_id INTEGER, brand VARCHAR(50), processor_speed FLOAT,
+            ram_size INTEGER, storage_capacity INTEGER, screen_size FLOAT, weight FLOAT,
+            predicted_price FLOAT, created_at DATETIME
+        )''')
+    start = datetime(2024, 1, 1)
+    conn.executemany('INSERT INTO user VALUES (?, ?, ?, ?)', [
+        (i, f'user{i}', f'user{i}@example.com', str(start)) for i in range(1, users + 1)])
+
+    rng = random.Random(42)
+    for offset in range(0, rows, INSERT_BATCH):
+        conn.executemany('INSERT INTO prediction VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?)', [
+            (rng.randint(1, users), rng.choice(BRANDS), round(rng.uniform(1.5, 4.0), 1),
+             rng.choice((4, 8, 16, 32)), rng.choice((256, 512, 1024)), rng.choice((13.3, 14.0, 15.6)),
+             round(rng.uniform(1.0, 3.0), 1), rng.uniform(20000, 150000),
+             str(start + timedelta(seconds=30 * i)))
+            for i in range(offset, min(offset + INSERT_BATCH, rows))
+        ])
+    conn.commit()
+    conn.close()
+
+
+def legacy_export(db_path, output_path):
+    """The pre-streaming exporter: every row fetched, then one string built and written"""
+    conn = sqlite3.connect(db_path)
+    users = conn.execute('SELECT id, username, email, created_at FROM user ORDER BY id').fetchall()
+    conn.execute('''SELECT brand, COUNT(*), AVG(predicted_price), MIN(predicted_price), MAX(predicted_price)
+                    FROM prediction GROUP BY brand ORDER BY 2 DESC''').fetchall()
+    predictions = conn.execute('''
+        SELECT p.id, u.username, p.brand, p.processor_speed, p.ram_size, p.storage_capacity,
+               p.screen_size, p.weight, p.predicted_price, p.created_at
+        FROM prediction p JOIN user u ON p.user_id = u.id ORDER BY p.id DESC''').fetchall()
+    conn.execute('SELECT COUNT(*) FROM prediction').fetchone()
+    conn.close()
+
+    html = ''.join(f'<tr><td>{user[0]}</td><td>{user[1]}</td></tr>' for user in users)
+    for pred in predictions:
+        html += prediction_row(pred)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+
+def run(args):
+    name, db_path, output_dir, rows_per_page = args
+    output_path = os.path.join(output_dir, name, 'database_view.html')
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    start = time.perf_counter()
+    if name == 'legacy':
+        legacy_export(db_path, output_path)
+    else:
+        export_to_html(db_path, output_path, rows_per_page=rows_per_page)
+    elapsed = time.perf_counter() - start
+    size = sum(os.path.getsize(os.path.join(os.path.dirname(output_path), entry))
+               for entry in os.listdir(os.path.dirname(output_path)))
+    # ru_maxrss is in KB on Linux
+    return elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, size
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the HTML export on a synthetic database')
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--rows-per-page', type=int, default=5000)
+    parser.add_argument('--skip-legacy', action='store_true', help="don't run the fetchall() exporter")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix='laptop_price_html_')
+    db_path = os.path.join(work_dir, 'bench.db')
+    start = time.perf_counter()
+    build_database(db_path, args.rows, args.users)
+    print(f"[OK] Built {args.rows} predictions / {args.users} users in {time.perf_counter() - start:.1f}s "
+          f"({os.path.getsize(db_path) / 2 ** 20:.0f} MB) at {db_path}")
+
+    names = ['streaming'] + ([] if args.skip_legacy else ['legacy'])
+    context = multiprocessing.get_context('spawn')
+    print(f"\n{'exporter':<10} {'seconds':>8} {'rows/s':>10} {'peak RSS MB':>12} {'output MB':>10}")
+    for name in names:
+        with context.Pool(1) as pool:
+            elapsed, peak_mb, size = pool.apply(run, ((name, db_path, work_dir, args.rows_per_page),))
+        print(f"{name:<10} {elapsed:>8.2f} {args.rows / elapsed:>10.0f} {peak_mb:>12.1f} {size / 2 ** 20:>10.1f}")
@@ -0,0 +1,57 @@
+"""
+Benchmark - single-row and batch latency of the sklearn path vs the compiled NumPy engine
+Usage: python benchmark_inference.py [iterations]
+"""
+import os
+import pickle
+import sys
+import time
+import warnings
+
+import numpy as np
+
+from inference import CompiledModel, SklearnPipeline
+
+warnings.filterwarnings('ignore')
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_pickle(name):
+    with open(os.path.join(base_dir, name), 'rb') as f:
+        return pickle.load(f)
+
+
+def time_per_call(fn, iterations):
+    fn()  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    model, scaler, encoder = load_pickle('model.pkl'), load_pickle('scaler.pkl'), load_pickle('encoder.pkl')
+    engines = {
+        'sklearn': SklearnPipeline(model, scaler, encoder),
+        'compiled': CompiledModel.from_sklearn(model, scaler, encoder),
+    }
+    row = ('HP', 3.5, 8, 512, 15.6, 2.0)
+    batch = np.tile([[3, 3.5, 8, 512, 15.6, 2.0]], (1000, 1))
+
+    print("=" * 60)
+    print(f"INFERENCE BENCHMARK ({type(model).__name__}, {iterations} iterations)")
+    print("=" * 60)
+    results = {}
+    for name, engine in engines.items():
+        single = time_per_call(lambda: engine.predict_one(*row), iterations)
+        batched = time_per_call(lambda: engine.predict(batch), max(iterations // 10, 1)) / len(batch)
+        results[name] = single
+        print(f"{name:<10} single row: {single:10.2f} us   batch of 1000: {batched:8.3f} us/row")
+
+    print("-" * 60)
+    print(f"Single-row speedup: {results['sklearn'] / results['compiled']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Query plan check - runs EXPLAIN QUERY PLAN on every hot query the app issues
+and fails if any of them falls back to a full table scan.
+
+Usage: python check_query_plans.py
+(uses DATABASE_URL like app.py; run migrate_database.py first on old databases)
+"""
+import sys
+from datetime import datetime
+
+from sqlalchemy import delete, select
+
+from app import app, db, User, OTP, Prediction, HISTORY_COLUMNS
+
+
+def hot_queries():
+    """The statements behind the busiest routes, with representative parameters"""
+    now = datetime.utcnow()
+    return {
+        'signin: user by username': select(User).where(User.username == 'someone').limit(1),
+        'signup: user by email': select(User).where(User.email == 'someone@example.com').limit(1),
+        'check-auth: user by id': select(User).where(User.id == 1),
+        'signin: delete unverified OTPs': delete(OTP).where(OTP.user_id == 1, OTP.is_verified == False),  # noqa: E712
+        'verify-otp: valid OTP': select(OTP).where(
+            OTP.user_id == 1, OTP.otp_code == '123456', OTP.is_verified == False, OTP.expires_at > now  # noqa: E712
+        ).limit(1),
+        'otp sweeper: expired batch': select(OTP.id).where(OTP.expires_at < now).limit(500),
+        'history: first page': select(*HISTORY_COLUMNS).where(
+            Prediction.user_id == 1
+        ).order_by(Prediction.id.desc()).limit(501),
+        'history: next page': select(*HISTORY_COLUMNS).where(
+            Prediction.user_id == 1, Prediction.id < 1000
+        ).order_by(Prediction.id.desc()).limit(501),
+    }
+
+
+def explain(connection, statement):
+    """Return the EXPLAIN QUERY PLAN detail lines for a SQLAlchemy statement"""
+    compiled = statement.compile(dialect=connection.dialect)
+    params = compiled.construct_params()
+    positional = tuple(params[name] for name in compiled.positiontup)
+    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), positional).fetchall()
+    return [row[-1] for row in rows]
+
+
+def is_table_scan(detail):
+    # "SCAN prediction" / "SCAN TABLE prediction" with no index is a full scan;
+    # "SCAN ... USING INDEX" walks an index and is fine
+    return detail.startswith('SCAN') and 'INDEX' not in detail
+
+
+def check_query_plans():
+    """Print each plan; returns the names of queries that scan a table"""
+    failures = []
+    with app.app_context():
+        if db.engine.dialect.name != 'sqlite':
+            print(f"[WARNING] Query plan check only supports SQLite (got {db.engine.dialect.name})")
+            return failures
+        with db.engine.connect() as connection:
+            for name, statement in hot_queries().items():
+                details = explain(connection, statement)
+                scanned = any(is_table_scan(detail) for detail in details)
+                print(f"{'[ERROR]' if scanned else '[OK]'} {name}")
+                for detail in details:
+                    print(f"    {detail}")
+                if scanned:
+                    failures.append(name)
+    return failures
+
+
+if __name__ == '__main__':
+    failures = check_query_plans()
+    if failures:
+        print(f"\n{len(failures)} hot queries fall back to a table scan: {', '.join(failures)}")
+        print("Run migrate_database.py to add the missing indexes.")
+        sys.exit(1)
+    print("\nAll hot queries use an index.")
@@ -0,0 +1,86 @@
+"""
+Pytest setup - run the app against a throwaway SQLite database
+"""
+import os
+import tempfile
+import uuid
+import warnings
+
+import pytest
+
+# Must be set before app.py is imported so the real database is never touched
+_test_db_dir = tempfile.mkdtemp(prefix='laptop_price_test_')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_test_db_dir, 'test.db')
+os.environ['SESSION_SQLITE_PATH'] = os.path.join(_test_db_dir, 'sessions.db')
+
+# Never send real OTP emails from tests
+os.environ['OTP_DEV_MODE'] = '1'
+
+# The pickles were saved with a newer scikit-learn; the warning is just noise here
+warnings.filterwarnings('ignore', message='Trying to unpickle estimator')
+
+# Scripts that drive a live server on localhost or real SMTP - run them by hand
+collect_ignore = [
+    'test_email_direct.py',
+    'test_history.py',
+    'test_history_auto.py',
+    'test_history_direct.py',
+    'test_history_endpoint.py',
+    'test_history_flow_placeholder.py',
+    'test_otp.py',
+    'test_prediction.py',
+    'test_prediction_save.py',
+    'test_signup.py',
+]
+
+
+@pytest.fixture
+def make_user():
+    """make_user(prefix, **fields) creates a User and returns its id; the users and their rows go afterwards"""
+    from app import app, db, history_writer, OTP, Prediction, User
+    ids = []
+
+    def make(prefix='user', **fields):
+        name = f'{prefix}_{uuid.uuid4().hex[:8]}'
+        with app.app_context():
+            user = User(username=name, email=f'{name}@example.com', **fields)
+            user.set_password('secret123')
+            db.session.add(user)
+            db.session.commit()
+            ids.append(user.id)
+            return user.id
+
+    yield make
+    history_writer.flush(timeout=5)
+    with app.app_context():
+        Prediction.query.filter(Prediction.user_id.in_(ids)).delete()
+        OTP.query.filter(OTP.user_id.in_(ids)).delete()
+        for user_id in ids:
+            user = db.session.get(User, user_id)
+            if user is not None:
+                db.session.delete(user)
+        db.session.commit()
+
+
+@pytest.fixture
+def user(make_user):
+    """Id of a fresh user"""
+    return make_user()
+
+
+@pytest.fixture
+def login():
+    """login(user_id) returns a test client whose session is logged in as that user"""
+    from app import app
+
+    def make(user_id):
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user_id
+        return client
+    return make
+
+
+@pytest.fixture
+def logged_in_client(user, login):
+    return login(user)
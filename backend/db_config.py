@@ -0,0 +1,92 @@
+"""
+Database configuration - connection URL, pool settings and SQLite PRAGMAs.
+
+SQLite connections are opened in WAL mode with synchronous=NORMAL, a busy
+timeout and a larger page cache, so commits from several gunicorn workers
+wait for the write lock instead of failing with "database is locked", and
+readers never block writers. Postgres (DATABASE_URL=postgresql://...) gets a
+sized, pre-pinged, recycled connection pool instead.
+
+Environment:
+    DATABASE_URL           defaults to sqlite:///instance/laptop_price.db
+    SQLITE_JOURNAL_MODE    WAL (default) / DELETE / ...
+    SQLITE_SYNCHRONOUS     NORMAL (default) / FULL / OFF
+    DB_BUSY_TIMEOUT_MS     how long a writer waits for the lock (default 5000)
+    DB_CACHE_SIZE_KB       SQLite page cache per connection (default 20000)
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_RECYCLE   pool settings
+"""
+import os
+
+from sqlalchemy import event
+
+SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+CACHE_SIZE_KB = int(os.environ.get('DB_CACHE_SIZE_KB', 20000))
+POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+
+
+def database_url(base_dir):
+    url = os.environ.get('DATABASE_URL', 'sqlite:///' + os.path.join(base_dir, 'instance', 'laptop_price.db'))
+    # Some hosts still hand out the old postgres:// scheme, which SQLAlchemy 1.4+ rejects
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def is_sqlite(url):
+    return url.startswith('sqlite')
+
+
+def engine_options(url):
+    """create_engine() keyword arguments for the given URL"""
+    if is_sqlite(url):
+        # sqlite3's own lock wait; busy_timeout below covers the same for each statement
+        options = {'connect_args': {'timeout': BUSY_TIMEOUT_MS / 1000, 'check_same_thread': False}}
+        if url not in ('sqlite://', 'sqlite:///:memory:'):
+            # In-memory databases use a single shared connection (StaticPool) instead
+            options.update(pool_size=POOL_SIZE, max_overflow=MAX_OVERFLOW)
+        return options
+    return {
+        'pool_size': POOL_SIZE,
+        'max_overflow': MAX_OVERFLOW,
+        'pool_recycle': POOL_RECYCLE,
+        'pool_pre_ping': True,
+    }
+
+
+def sqlite_pragmas():
+    return (
+        f'PRAGMA journal_mode={SQLITE_JOURNAL_MODE}',
+        f'PRAGMA synchronous={SQLITE_SYNCHRONOUS}',
+        f'PRAGMA busy_timeout={BUSY_TIMEOUT_MS}',
+        f'PRAGMA cache_size=-{CACHE_SIZE_KB}',
+        'PRAGMA temp_store=MEMORY',
+    )
+
+
+def install_sqlite_pragmas(engine, pragmas=None):
+    """Run the PRAGMAs on every new DBAPI connection of a SQLite engine"""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = pragmas if pragmas is not None else sqlite_pragmas()
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
+
+
+def configure_app(app, base_dir):
+    """Set the URL and engine options on a Flask app before SQLAlchemy(app)"""
+    url = database_url(base_dir)
+    app.config['SQLALCHEMY_DATABASE_URI'] = url
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(url)
+    return url
@@ -1,113 +1,84 @@
 """
-Export Database to HTML - Creates a viewable HTML file with all database contents
+Export Database to HTML - Creates viewable HTML files with all database contents
+
+Rows are read from the cursor in chunks and written out as they arrive, so
+memory stays flat however large the database is. Predictions are split
+into pages of --rows-per-page rows (database_view_predictions_0001.html,
+...) linked from the index page (database_view.html), which holds the
+totals, the users and the per-brand statistics.
+
+Usage:
+    python export_database_html.py [--db laptop_price.db] [--output database_view.html]
+                                   [--rows-per-page 5000] [--limit N]
+                                   [--since 2024-01-01] [--until 2024-02-01]
 """
-import sqlite3
+import argparse
+import glob
 import os
+import sqlite3
+import time
 from datetime import datetime
+from html import escape
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 db_path = os.path.join(base_dir, 'laptop_price.db')
 output_path = os.path.join(base_dir, 'database_view.html')
 
-def export_to_html():
-    """Export database contents to an HTML file"""
-    
-    if not os.path.exists(db_path):
-        print("❌ Database file not found!")
-        return
-    
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Get data
-    cursor.execute('SELECT id, username, email, created_at FROM user ORDER BY id')
-    users = cursor.fetchall()
-    
-    cursor.execute('''
-        SELECT brand, COUNT(*) as count, 
-               AVG(predicted_price) as avg_price,
-               MIN(predicted_price) as min_price,
-               MAX(predicted_price) as max_price
-        FROM prediction 
-        GROUP BY brand 
-        ORDER BY count DESC
-    ''')
-    brand_stats = cursor.fetchall()
-    
-    cursor.execute('''
-        SELECT p.id, u.username, p.brand, 
-               p.processor_speed, p.ram_size, p.storage_capacity,
-               p.screen_size, p.weight, p.predicted_price, p.created_at
-        FROM prediction p
-        JOIN user u ON p.user_id = u.id
-        ORDER BY p.id DESC
-    ''')
-    predictions = cursor.fetchall()
-    
-    cursor.execute('SELECT COUNT(*) FROM prediction')
-    total_predictions = cursor.fetchone()[0]
-    
-    conn.close()
-    
-    # Generate HTML
-    html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Database Viewer - Laptop Price Prediction</title>
-    <style>
-        * {{
+CHUNK_ROWS = 1000
+ROWS_PER_PAGE = 5000
+
+STYLE = """    <style>
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
         
-        body {{
+        body {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             padding: 20px;
             color: #333;
-        }}
+        }
         
-        .container {{
+        .container {
             max-width: 1400px;
             margin: 0 auto;
             background: white;
             border-radius: 15px;
             padding: 30px;
             box-shadow: 0 10px 40px rgba(0,0,0,0.2);
-        }}
+        }
         
-        h1 {{
+        h1 {
             color: #667eea;
             text-align: center;
             margin-bottom: 10px;
             font-size: 2.5em;
-        }}
+        }
         
-        .subtitle {{
+        .subtitle {
             text-align: center;
             color: #666;
             margin-bottom: 30px;
             font-size: 1.1em;
-        }}
+        }
         
-        .section {{
+        .section {
             margin: 30px 0;
             padding: 20px;
             background: #f8f9fa;
             border-radius: 10px;
             border-left: 5px solid #667eea;
-        }}
+        }
         
-        h2 {{
+        h2 {
             color: #667eea;
             margin-bottom: 20px;
             font-size: 1.8em;
-        }}
+        }
         
-        table {{
+        table {
             width: 100%;
             border-collapse: collapse;
             margin: 20px 0;
@@ -115,9 +86,9 @@ def export_to_html():
             border-radius: 8px;
             overflow: hidden;
             box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
+        }
         
-        th {{
+        th {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             padding: 15px;
@@ -126,22 +97,22 @@ def export_to_html():
             text-transform: uppercase;
             font-size: 0.85em;
             letter-spacing: 0.5px;
-        }}
+        }
         
-        td {{
+        td {
             padding: 12px 15px;
             border-bottom: 1px solid #e9ecef;
-        }}
+        }
         
-        tr:hover {{
+        tr:hover {
             background: #f8f9fa;
-        }}
+        }
         
-        tr:last-child td {{
+        tr:last-child td {
             border-bottom: none;
-        }}
+        }
         
-        .stat-card {{
+        .stat-card {
             display: inline-block;
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
@@ -150,48 +121,268 @@ def export_to_html():
             margin: 10px;
             min-width: 200px;
             box-shadow: 0 4px 15px rgba(102, 126, 234, 0.3);
-        }}
+        }
         
-        .stat-label {{
+        .stat-label {
             font-size: 0.9em;
             opacity: 0.9;
             margin-bottom: 5px;
-        }}
+        }
         
-        .stat-value {{
+        .stat-value {
             font-size: 2em;
             font-weight: bold;
-        }}
+        }
         
-        .price {{
+        .price {
             color: #28a745;
             font-weight: 600;
-        }}
+        }
         
-        .timestamp {{
+        .timestamp {
             color: #666;
             font-size: 0.9em;
-        }}
+        }
         
-        .footer {{
+        .footer {
             text-align: center;
             margin-top: 40px;
             padding-top: 20px;
             border-top: 2px solid #e9ecef;
             color: #666;
-        }}
+        }
+
+        .pager {
+            margin-top: 10px;
+            font-size: 1.1em;
+        }
+
+        .pager a {
+            color: #667eea;
+            font-weight: 600;
+            text-decoration: none;
+        }
     </style>
-</head>
+"""
+
+PREDICTION_HEADER = """
+        <div class="section">
+            <h2>📋 Predictions</h2>
+            <table>
+                <thead>
+                    <tr>
+                        <th>ID</th>
+                        <th>User</th>
+                        <th>Brand</th>
+                        <th>CPU (GHz)</th>
+                        <th>RAM (GB)</th>
+                        <th>Storage (GB)</th>
+                        <th>Screen (in)</th>
+                        <th>Weight (kg)</th>
+                        <th>Predicted Price</th>
+                        <th>Date</th>
+                    </tr>
+                </thead>
+                <tbody>
+"""
+
+TABLE_END = """
+                </tbody>
+            </table>
+        </div>
+"""
+
+
+def page_start(title):
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{escape(title)} - Laptop Price Prediction</title>
+{STYLE}</head>
 <body>
     <div class="container">
-        <h1>💻 Database Viewer</h1>
+        <h1>💻 {escape(title)}</h1>
         <p class="subtitle">Laptop Price Prediction Application</p>
         <p class="subtitle">Generated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}</p>
-        
+"""
+
+
+def page_end(footer):
+    return f"""
+        <div class="footer">
+            {footer}
+            <p style="margin-top: 10px;">This is a read-only view. Use the Flask application to modify data.</p>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+
+def _number(value, spec):
+    return '' if value is None else format(value, spec)
+
+
+def _price(value):
+    return '' if value is None else f'₹{value:,.2f}'
+
+
+def prediction_row(pred):
+    return f"""
+                    <tr>
+                        <td>{pred[0]}</td>
+                        <td>{escape(str(pred[1] or ''))}</td>
+                        <td><strong>{escape(str(pred[2] or ''))}</strong></td>
+                        <td>{_number(pred[3], '.1f')}</td>
+                        <td>{_number(pred[4], '.0f')}</td>
+                        <td>{_number(pred[5], '.0f')}</td>
+                        <td>{_number(pred[6], '.1f')}</td>
+                        <td>{_number(pred[7], '.1f')}</td>
+                        <td class="price">{_price(pred[8])}</td>
+                        <td class="timestamp">{escape(str(pred[9] or ''))}</td>
+                    </tr>
+"""
+
+
+def iter_chunks(cursor, chunk_size):
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield rows
+
+
+def date_filter(since, until):
+    """WHERE clause and parameters for a created_at range (since inclusive, until exclusive)"""
+    clauses, params = [], []
+    if since is not None:
+        clauses.append('p.created_at >= ?')
+        params.append(since.isoformat(sep=' '))
+    if until is not None:
+        clauses.append('p.created_at < ?')
+        params.append(until.isoformat(sep=' '))
+    return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), params
+
+
+def brand_stats(conn, where, params):
+    """Per-brand count/avg/min/max, computed from the prediction table.
+
+    Not from the /history/stats aggregates: they keep counting deleted rows
+    and skip rows without a price, so totals here would drift from the pages.
+    """
+    return conn.execute(f'''
+        SELECT p.brand, COUNT(*) as count,
+               AVG(p.predicted_price) as avg_price,
+               MIN(p.predicted_price) as min_price,
+               MAX(p.predicted_price) as max_price
+        FROM prediction p{where}
+        GROUP BY p.brand
+        ORDER BY count DESC
+    ''', params).fetchall()
+
+
+def page_path(index_path, number):
+    stem, extension = os.path.splitext(index_path)
+    return f'{stem}_predictions_{number:04d}{extension}'
+
+
+def write_prediction_pages(conn, index_path, where, params, limit, rows_per_page, chunk_size):
+    """Stream predictions, newest first, into numbered pages; returns [(path, rows, first_id, last_id)]"""
+    query = f'''
+        SELECT p.id, u.username, p.brand,
+               p.processor_speed, p.ram_size, p.storage_capacity,
+               p.screen_size, p.weight, p.predicted_price, p.created_at
+        FROM prediction p
+        LEFT JOIN user u ON p.user_id = u.id{where}
+        ORDER BY p.id DESC
+    '''
+    if limit is not None:
+        query += ' LIMIT ?'
+        params = params + [limit]
+
+    pages = []
+
+    def link(number, label):
+        return f'<a href="{escape(os.path.basename(page_path(index_path, number)))}">{label}</a>'
+
+    def close_page(f, number, rows, first_id, last_id, has_next):
+        links = [f'<a href="{escape(os.path.basename(index_path))}">Index</a>']
+        if number > 1:
+            links.insert(0, link(number - 1, '&laquo; Newer'))
+        if has_next:
+            links.append(link(number + 1, 'Older &raquo;'))
+        f.write(TABLE_END)
+        f.write(page_end(f'<p class="pager">{" | ".join(links)}</p>'))
+        f.close()
+        pages.append((page_path(index_path, number), rows, first_id, last_id))
+
+    f = None
+    for chunk in iter_chunks(conn.execute(query, params), chunk_size):
+        for pred in chunk:
+            # A page is closed when the first row of the next one arrives, so it knows to link on
+            if f is not None and rows == rows_per_page:
+                close_page(f, number, rows, first_id, last_id, has_next=True)
+                f = None
+            if f is None:
+                number = len(pages) + 1
+                f = open(page_path(index_path, number), 'w', encoding='utf-8')
+                f.write(page_start(f'Predictions - page {number}'))
+                f.write(PREDICTION_HEADER)
+                rows, first_id = 0, pred[0]
+            f.write(prediction_row(pred))
+            rows += 1
+            last_id = pred[0]
+    if f is not None:
+        close_page(f, number, rows, first_id, last_id, has_next=False)
+    return pages
+
+
+def remove_stale_pages(index_path, pages):
+    """Delete pages left over from an earlier, longer export"""
+    current = {path for path, _, _, _ in pages}
+    stem, extension = os.path.splitext(index_path)
+    for path in glob.glob(glob.escape(stem) + '_predictions_*' + extension):
+        if path not in current:
+            os.remove(path)
+
+
+def export_to_html(db_path=db_path, output_path=output_path, rows_per_page=ROWS_PER_PAGE,
+                   limit=None, since=None, until=None, chunk_size=CHUNK_ROWS):
+    """Export the database to an index page plus prediction pages; returns a summary dict"""
+    if not os.path.exists(db_path):
+        print("❌ Database file not found!")
+        return None
+
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        where, params = date_filter(since, until)
+        pages = write_prediction_pages(conn, output_path, where, params, limit, rows_per_page, chunk_size)
+        remove_stale_pages(output_path, pages)
+        stats = brand_stats(conn, where, params)
+        exported = sum(rows for _, rows, _, _ in pages)
+        total_predictions = sum(stat[1] for stat in stats)
+        user_count = conn.execute('SELECT COUNT(*) FROM user').fetchone()[0]
+
+        with open(output_path, 'w', encoding='utf-8') as f:
+            f.write(page_start('Database Viewer'))
+            scope = []
+            if since is not None:
+                scope.append(f'from {since:%Y-%m-%d %H:%M}')
+            if until is not None:
+                scope.append(f'until {until:%Y-%m-%d %H:%M}')
+            if limit is not None:
+                scope.append(f'newest {limit} rows')
+            if scope:
+                f.write(f'        <p class="subtitle">Predictions {escape(", ".join(scope))}</p>\n')
+            f.write(f"""
         <div style="text-align: center; margin: 30px 0;">
             <div class="stat-card">
                 <div class="stat-label">Total Users</div>
-                <div class="stat-value">{len(users)}</div>
+                <div class="stat-value">{user_count}</div>
             </div>
             <div class="stat-card">
                 <div class="stat-label">Total Predictions</div>
@@ -199,40 +390,34 @@ def export_to_html():
             </div>
             <div class="stat-card">
                 <div class="stat-label">Brands</div>
-                <div class="stat-value">{len(brand_stats)}</div>
+                <div class="stat-value">{len(stats)}</div>
             </div>
         </div>
-        
-        <!-- Users Table -->
+
+        <!-- Prediction Pages -->
         <div class="section">
-            <h2>👥 Users</h2>
+            <h2>📋 Predictions ({exported} rows, {len(pages)} pages)</h2>
             <table>
                 <thead>
                     <tr>
-                        <th>ID</th>
-                        <th>Username</th>
-                        <th>Email</th>
-                        <th>Created At</th>
+                        <th>Page</th>
+                        <th>Rows</th>
+                        <th>IDs</th>
                     </tr>
                 </thead>
                 <tbody>
-"""
-    
-    for user in users:
-        html += f"""
+""")
+            for number, (path, rows, first_id, last_id) in enumerate(pages, 1):
+                f.write(f"""
                     <tr>
-                        <td>{user[0]}</td>
-                        <td><strong>{user[1]}</strong></td>
-                        <td>{user[2]}</td>
-                        <td class="timestamp">{user[3]}</td>
+                        <td><a href="{escape(os.path.basename(path))}">Page {number}</a></td>
+                        <td>{rows}</td>
+                        <td>{first_id} &ndash; {last_id}</td>
                     </tr>
-"""
-    
-    html += """
-                </tbody>
-            </table>
-        </div>
-        
+""")
+            f.write(TABLE_END)
+
+            f.write("""
         <!-- Brand Statistics -->
         <div class="section">
             <h2>📊 Predictions by Brand</h2>
@@ -247,90 +432,83 @@ def export_to_html():
                     </tr>
                 </thead>
                 <tbody>
-"""
-    
-    for stat in brand_stats:
-        html += f"""
+""")
+            for stat in stats:
+                f.write(f"""
                     <tr>
-                        <td><strong>{stat[0]}</strong></td>
+                        <td><strong>{escape(str(stat[0] or ''))}</strong></td>
                         <td>{stat[1]}</td>
-                        <td class="price">₹{stat[2]:,.2f}</td>
-                        <td class="price">₹{stat[3]:,.2f}</td>
-                        <td class="price">₹{stat[4]:,.2f}</td>
+                        <td class="price">{_price(stat[2])}</td>
+                        <td class="price">{_price(stat[3])}</td>
+                        <td class="price">{_price(stat[4])}</td>
                     </tr>
-"""
-    
-    html += """
-                </tbody>
-            </table>
-        </div>
-        
-        <!-- All Predictions -->
+""")
+            f.write(TABLE_END)
+
+            f.write("""
+        <!-- Users Table -->
         <div class="section">
-            <h2>📋 All Predictions</h2>
+            <h2>👥 Users</h2>
             <table>
                 <thead>
                     <tr>
                         <th>ID</th>
-                        <th>User</th>
-                        <th>Brand</th>
-                        <th>CPU (GHz)</th>
-                        <th>RAM (GB)</th>
-                        <th>Storage (GB)</th>
-                        <th>Screen (in)</th>
-                        <th>Weight (kg)</th>
-                        <th>Predicted Price</th>
-                        <th>Date</th>
+                        <th>Username</th>
+                        <th>Email</th>
+                        <th>Created At</th>
                     </tr>
                 </thead>
                 <tbody>
-"""
-    
-    for pred in predictions:
-        html += f"""
+""")
+            cursor = conn.execute('SELECT id, username, email, created_at FROM user ORDER BY id')
+            for chunk in iter_chunks(cursor, chunk_size):
+                f.writelines(f"""
                     <tr>
-                        <td>{pred[0]}</td>
-                        <td>{pred[1]}</td>
-                        <td><strong>{pred[2]}</strong></td>
-                        <td>{pred[3]:.1f}</td>
-                        <td>{pred[4]:.0f}</td>
-                        <td>{pred[5]:.0f}</td>
-                        <td>{pred[6]:.1f}</td>
-                        <td>{pred[7]:.1f}</td>
-                        <td class="price">₹{pred[8]:,.2f}</td>
-                        <td class="timestamp">{pred[9]}</td>
+                        <td>{user[0]}</td>
+                        <td><strong>{escape(str(user[1]))}</strong></td>
+                        <td>{escape(str(user[2]))}</td>
+                        <td class="timestamp">{escape(str(user[3] or ''))}</td>
                     </tr>
-"""
-    
-    html += f"""
-                </tbody>
-            </table>
-        </div>
-        
-        <div class="footer">
-            <p><strong>Database File:</strong> {db_path}</p>
-            <p><strong>Size:</strong> {os.path.getsize(db_path) / 1024:.2f} KB</p>
-            <p style="margin-top: 10px;">This is a read-only view. Use the Flask application to modify data.</p>
-        </div>
-    </div>
-</body>
-</html>
-"""
-    
-    # Write HTML file
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(html)
-    
-    print("=" * 80)
-    print("✓ Database exported to HTML successfully!")
-    print("=" * 80)
-    print(f"\nFile saved: {output_path}")
-    print(f"File size: {os.path.getsize(output_path) / 1024:.2f} KB")
-    print(f"\n📂 Open this file in your web browser to view the database!")
-    print("\nYou can:")
-    print("  1. Double-click the file to open it")
-    print("  2. Right-click → Open with → Your web browser")
-    print("=" * 80)
+""" for user in chunk)
+            f.write(TABLE_END)
+            f.write(page_end(f"""<p><strong>Database File:</strong> {escape(db_path)}</p>
+            <p><strong>Size:</strong> {os.path.getsize(db_path) / 1024:.2f} KB</p>"""))
+    finally:
+        conn.close()
+
+    return {
+        'users': user_count,
+        'predictions': exported,
+        'pages': len(pages),
+        'seconds': time.perf_counter() - start,
+        'bytes': os.path.getsize(output_path) + sum(os.path.getsize(path) for path, _, _, _ in pages),
+    }
+
+
+def parse_date(value):
+    return datetime.fromisoformat(value)
+
 
 if __name__ == '__main__':
-    export_to_html()
+    parser = argparse.ArgumentParser(description='Export the database to browsable HTML pages')
+    parser.add_argument('--db', default=db_path, help='SQLite database file')
+    parser.add_argument('--output', default=output_path, help='index page; prediction pages are written next to it')
+    parser.add_argument('--rows-per-page', type=int, default=ROWS_PER_PAGE)
+    parser.add_argument('--limit', type=int, help='export only the newest N predictions')
+    parser.add_argument('--since', type=parse_date, help='first date/datetime to include (YYYY-MM-DD[ HH:MM])')
+    parser.add_argument('--until', type=parse_date, help='date/datetime to stop before')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_ROWS, help='rows fetched from the cursor at a time')
+    args = parser.parse_args()
+    if args.rows_per_page < 1 or args.chunk_size < 1:
+        parser.error('--rows-per-page and --chunk-size must be positive')
+
+    summary = export_to_html(args.db, args.output, args.rows_per_page, args.limit, args.since, args.until, args.chunk_size)
+    if summary is not None:
+        print("=" * 80)
+        print("✓ Database exported to HTML successfully!")
+        print("=" * 80)
+        print(f"\nIndex page: {args.output}")
+        print(f"Predictions: {summary['predictions']} rows on {summary['pages']} pages")
+        print(f"Total size: {summary['bytes'] / 1024:.2f} KB in {summary['seconds']:.2f}s")
+        print(f"\n📂 Open the index page in your web browser to view the database!")
+        print("=" * 80)
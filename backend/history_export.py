@@ -0,0 +1,182 @@
+"""
+Streaming history export - rows are read from a server-side cursor in
+fixed-size chunks and encoded chunk by chunk, so memory stays flat no
+matter how long a user's history is.
+
+Formats:
+    csv       header + one line per prediction
+    ndjson    one JSON object per line
+    columnar  compact binary, one column block per chunk (see below);
+              read it back with read_columnar()
+
+Columnar layout (all integers little-endian):
+    b'LPHCOL1\\n', uint32 header length, JSON header {"columns": [{"name", "type"}]}
+    per chunk: uint32 row count, then each column in order:
+        int64 / timestamp   n x int64 (timestamp = microseconds since the Unix epoch)
+        float64             n x float64
+        string              uint16 dictionary size, per entry uint16 length + UTF-8,
+                            then n x uint16 dictionary codes
+    a chunk with row count 0 ends the stream
+Nulls are INT64_MIN for int64/timestamp, NaN for float64 and an empty string.
+"""
+import csv
+import io
+import json
+import math
+import struct
+import sys
+from array import array
+from datetime import datetime, timedelta
+
+EXPORT_CHUNK_ROWS = 1000
+
+COLUMNAR_MAGIC = b'LPHCOL1\n'
+INT64_NULL = -2 ** 63
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'columnar': ('application/octet-stream', 'lphcol'),
+}
+
+# (name, columnar type) in export order - matches HISTORY_COLUMNS in app.py
+COLUMNS = (
+    ('id', 'int64'),
+    ('brand', 'string'),
+    ('processor_speed', 'float64'),
+    ('ram_size', 'int64'),
+    ('storage_capacity', 'int64'),
+    ('screen_size', 'float64'),
+    ('weight', 'float64'),
+    ('predicted_price', 'float64'),
+    ('created_at', 'timestamp'),
+)
+COLUMN_NAMES = [name for name, _ in COLUMNS]
+
+
+def stream_rows(engine, statement, chunk_size=EXPORT_CHUNK_ROWS):
+    """Yield lists of row tuples from a dedicated connection with a server-side cursor.
+
+    The connection is separate from the request's session, so the export
+    keeps reading after the view returns; on SQLite in WAL mode the open
+    read transaction does not block writers.
+    """
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=chunk_size).execute(statement)
+        for partition in result.partitions(chunk_size):
+            yield [tuple(row) for row in partition]
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def encode_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMN_NAMES)
+    for rows in chunks:
+        writer.writerows(row[:-1] + (_iso(row[-1]) or '',) for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def encode_ndjson(chunks):
+    for rows in chunks:
+        yield ''.join(
+            json.dumps(dict(zip(COLUMN_NAMES, row[:-1] + (_iso(row[-1]),)))) + '\n' for row in rows
+        )
+
+
+def _packed(typecode, values):
+    packed = array(typecode, values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def _encode_column(kind, values):
+    if kind == 'int64':
+        return _packed('q', [INT64_NULL if value is None else value for value in values])
+    if kind == 'timestamp':
+        return _packed('q', [INT64_NULL if value is None else (value - EPOCH) // MICROSECOND for value in values])
+    if kind == 'float64':
+        return _packed('d', [math.nan if value is None else value for value in values])
+
+    codes, dictionary = [], {}
+    for value in values:
+        codes.append(dictionary.setdefault(value or '', len(dictionary)))
+    if len(dictionary) > 0xFFFF:
+        raise ValueError('Too many distinct strings in one chunk')
+    parts = [struct.pack('<H', len(dictionary))]
+    for text in dictionary:
+        data = text.encode('utf-8')
+        parts.append(struct.pack('<H', len(data)) + data)
+    parts.append(_packed('H', codes))
+    return b''.join(parts)
+
+
+def encode_columnar(chunks):
+    header = json.dumps({'columns': [{'name': name, 'type': kind} for name, kind in COLUMNS]}).encode('utf-8')
+    yield COLUMNAR_MAGIC + struct.pack('<I', len(header)) + header
+    for rows in chunks:
+        if not rows:
+            continue
+        parts = [struct.pack('<I', len(rows))]
+        for position, (_, kind) in enumerate(COLUMNS):
+            parts.append(_encode_column(kind, [row[position] for row in rows]))
+        yield b''.join(parts)
+    yield struct.pack('<I', 0)
+
+
+ENCODERS = {'csv': encode_csv, 'ndjson': encode_ndjson, 'columnar': encode_columnar}
+
+
+def _read_exact(stream, size):
+    data = stream.read(size)
+    if len(data) != size:
+        raise ValueError('Truncated columnar export')
+    return data
+
+
+def _unpack(typecode, data):
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def read_columnar(stream):
+    """Decode a columnar export; yields one {column: list of values} dict per chunk"""
+    if _read_exact(stream, len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+        raise ValueError('Not a columnar history export')
+    (length,) = struct.unpack('<I', _read_exact(stream, 4))
+    columns = json.loads(_read_exact(stream, length))['columns']
+    while True:
+        (count,) = struct.unpack('<I', _read_exact(stream, 4))
+        if count == 0:
+            return
+        chunk = {}
+        for column in columns:
+            kind = column['type']
+            if kind in ('int64', 'timestamp'):
+                values = [None if value == INT64_NULL else value for value in _unpack('q', _read_exact(stream, 8 * count))]
+                if kind == 'timestamp':
+                    values = [None if value is None else EPOCH + value * MICROSECOND for value in values]
+            elif kind == 'float64':
+                values = [None if math.isnan(value) else value for value in _unpack('d', _read_exact(stream, 8 * count))]
+            else:
+                (size,) = struct.unpack('<H', _read_exact(stream, 2))
+                dictionary = []
+                for _ in range(size):
+                    (text_length,) = struct.unpack('<H', _read_exact(stream, 2))
+                    dictionary.append(_read_exact(stream, text_length).decode('utf-8'))
+                values = [dictionary[code] for code in _unpack('H', _read_exact(stream, 2 * count))]
+            chunk[column['name']] = values
+        yield chunk
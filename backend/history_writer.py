@@ -0,0 +1,280 @@
+"""
+Write-behind queue for prediction history.
+
+In async mode /predict hands its Prediction row to the queue and returns
+the price straight away; a background thread inserts queued rows in bulk
+every BATCH_SIZE rows or FLUSH_INTERVAL_MS milliseconds, whichever comes
+first. Durable mode inserts before the response, like the old code path.
+
+Rows are not dropped silently: a full queue makes write() wait up to
+ENQUEUE_TIMEOUT_MS and then insert the rest in the caller (an error there
+reaches the caller), and a batch whose commit fails with a database
+error is retried with backoff. Only a row that fails on its own with a
+data error (e.g. a constraint) is dropped and logged.
+
+Every queued row gets a sequence number, so flush() waits for the rows
+queued before it was called - optionally only up to one user's last row,
+which is how the history routes read their own writes - never for rows
+that keep arriving after it. flush() takes over the rows the background
+thread is holding for its batch, so it doesn't sit out FLUSH_INTERVAL_MS.
+
+PREDICTION_WRITE_MODE=async|durable picks the mode. It defaults to durable
+on Vercel, where background threads are frozen between requests.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy.exc import OperationalError
+
+from app_logging import get_logger
+
+DEFAULT_MODE = os.environ.get('PREDICTION_WRITE_MODE', 'durable' if os.environ.get('VERCEL') else 'async')
+BATCH_SIZE = int(os.environ.get('PREDICTION_WRITE_BATCH_SIZE', 200))
+FLUSH_INTERVAL_MS = int(os.environ.get('PREDICTION_WRITE_INTERVAL_MS', 250))
+MAX_QUEUE = int(os.environ.get('PREDICTION_WRITE_MAX_QUEUE', 10000))
+ENQUEUE_TIMEOUT_MS = int(os.environ.get('PREDICTION_WRITE_ENQUEUE_TIMEOUT_MS', 1000))
+RETRY_DELAY_SECONDS = 0.1
+MAX_RETRY_DELAY_SECONDS = 5.0
+STOP_RETRIES = 3  # while shutting down, give up on an unreachable database after this many attempts
+USER_SEQ_PRUNE_SIZE = 1024
+
+logger = get_logger('history_writer')
+
+
+class HistoryWriter:
+    """Buffers prediction rows and inserts them in bulk"""
+
+    def __init__(self, app, db, table, mode=DEFAULT_MODE, batch_size=BATCH_SIZE,
+                 flush_interval_ms=FLUSH_INTERVAL_MS, max_queue=MAX_QUEUE, on_insert=None,
+                 enqueue_timeout_ms=ENQUEUE_TIMEOUT_MS):
+        self.app = app
+        self.db = db
+        self.table = table
+        self.on_insert = on_insert  # on_insert(connection, rows) runs in the insert's transaction
+        self.durable = mode == 'durable'
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.enqueue_timeout = enqueue_timeout_ms / 1000.0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._flush_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        # Sequence numbers of queued rows not yet committed (or given up on), and each user's newest one
+        self._done = threading.Condition()
+        self._last_seq = 0
+        self._outstanding = set()
+        self._user_last_seq = {}
+        self._held = []  # rows the background thread took off the queue for its next batch
+        self._held_lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+        self.queued = 0
+        self.flushed = 0
+        self.inline = 0
+        self.retries = 0
+        self.dropped = 0
+        self.flushes = 0
+
+    def write(self, rows):
+        """Persist a list of row dicts (column name -> value).
+
+        Durable mode inserts them now using the caller's session; async mode
+        queues them, inserting in the caller whatever does not fit in the
+        queue within the enqueue timeout. Returns the number of rows written
+        or queued; database errors of an inline insert propagate.
+        """
+        now = datetime.utcnow()
+        for row in rows:
+            row.setdefault('created_at', now)
+
+        if self.durable:
+            self._insert(rows)
+            self._count(flushed=len(rows), flushes=1)
+            return len(rows)
+
+        self._ensure_started()
+        deadline = time.monotonic() + self.enqueue_timeout
+        for position, row in enumerate(rows):
+            with self._done:
+                self._last_seq += 1
+                seq = self._last_seq
+                self._outstanding.add(seq)
+                self._user_last_seq[row.get('user_id')] = seq
+            try:
+                self._queue.put((seq, row), timeout=max(deadline - time.monotonic(), 0))
+            except queue.Full:
+                self._finish([(seq, row)])
+                rest = rows[position:]
+                logger.warning("History queue full, inserting %d rows inline", len(rest))
+                self._count(queued=position)
+                self._insert(rest)
+                self._count(flushed=len(rest), inline=len(rest), flushes=1)
+                return len(rows)
+        self._count(queued=len(rows))
+        return len(rows)
+
+    def flush(self, user_id=None, timeout=None):
+        """Wait until the rows queued before this call are in the database.
+
+        With user_id, only up to that user's newest queued row (returns at
+        once if it has none pending). Rows queued after the call are not
+        waited for. Returns False if timeout (seconds) ran out first.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._done:
+            target = self._last_seq if user_id is None else self._user_last_seq.get(user_id)
+            if target is None or not self._pending_through(target):
+                return True
+
+        # Help the background thread: insert queued rows up to the target here
+        if self._flush_lock.acquire(timeout=-1 if deadline is None else max(deadline - time.monotonic(), 0)):
+            try:
+                # Older than anything still queued: the rows the background thread is batching
+                with self._held_lock:
+                    items, self._held = self._held, []
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    items.append(item)
+                    if len(items) >= self.batch_size or item[0] >= target:
+                        self._flush_rows(items)
+                        items = []
+                        if item[0] >= target:
+                            break
+                if items:
+                    self._flush_rows(items)
+            finally:
+                self._flush_lock.release()
+
+        # Rows the background thread had already taken off the queue
+        with self._done:
+            while self._pending_through(target):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._done.wait(remaining)
+        return True
+
+    def stop(self):
+        """Stop the background thread and flush what is left"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self.flush()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        return {
+            'mode': 'durable' if self.durable else 'async',
+            'queued': self.queued,
+            'flushed': self.flushed,
+            'inline': self.inline,
+            'retries': self.retries,
+            'dropped': self.dropped,
+            'pending': self.pending(),
+            'flushes': self.flushes,
+        }
+
+    def _pending_through(self, target):
+        """Whether any row with sequence number <= target is still outstanding (call with _done held)"""
+        return any(seq <= target for seq in self._outstanding)
+
+    def _finish(self, items):
+        with self._done:
+            for seq, _ in items:
+                self._outstanding.discard(seq)
+            # A user's entry can go once nothing at or before it is outstanding
+            if not self._outstanding:
+                self._user_last_seq.clear()
+            elif len(self._user_last_seq) > USER_SEQ_PRUNE_SIZE:
+                oldest = min(self._outstanding)
+                self._user_last_seq = {user: seq for user, seq in self._user_last_seq.items() if seq >= oldest}
+            self._done.notify_all()
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def _run(self):
+        while not self._stopping.is_set():
+            deadline = None
+            while len(self._held) < self.batch_size:
+                timeout = self.flush_interval if deadline is None else deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                with self._held_lock:
+                    self._held.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            with self._flush_lock:
+                # flush() may have taken (and inserted) the held rows in the meantime
+                with self._held_lock:
+                    items, self._held = self._held, []
+                if items:
+                    self._flush_rows(items)
+
+    def _flush_rows(self, items):
+        """Insert (seq, row) items, retrying database errors; a row that fails alone on its data is dropped"""
+        rows = [row for _, row in items]
+        delay, attempts = RETRY_DELAY_SECONDS, 0
+        try:
+            while True:
+                attempts += 1
+                try:
+                    with self.app.app_context():
+                        self._insert(rows)
+                    self._count(flushed=len(rows), flushes=1)
+                    return
+                except OperationalError:
+                    # Locked or unreachable database: keep the rows and try again
+                    if self._stopping.is_set() and attempts >= STOP_RETRIES:
+                        self._count(dropped=len(rows))
+                        logger.exception("History flush failed at shutdown, dropped %d rows", len(rows))
+                        return
+                    self._count(retries=1)
+                    logger.warning("History flush failed, retrying %d rows in %.1fs", len(rows), delay)
+                    time.sleep(delay)
+                    delay = min(delay * 2, MAX_RETRY_DELAY_SECONDS)
+                except Exception:
+                    if len(items) > 1:
+                        # Insert row by row so one bad row doesn't take the batch with it
+                        for item in items:
+                            self._flush_rows([item])
+                        return
+                    self._count(dropped=1)
+                    logger.exception("History row rejected by the database, dropped it")
+                    return
+        finally:
+            self._finish(items)
+
+    def _count(self, **increments):
+        with self._stats_lock:
+            for name, value in increments.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def _insert(self, rows):
+        try:
+            self.db.session.execute(self.table.insert(), rows)
+            if self.on_insert is not None:
+                self.on_insert(self.db.session.connection(), rows)
+            self.db.session.commit()
+        except Exception:
+            self.db.session.rollback()
+            raise
@@ -0,0 +1,212 @@
+"""
+Inference engines for the price model.
+
+SklearnPipeline calls the fitted encoder/scaler/model objects directly.
+CompiledModel pulls the fitted parameters out of those objects once and
+evaluates them with plain NumPy, skipping sklearn's per-call input
+validation. Both expose the same interface:
+
+    engine.classes_              list of known brands
+    engine.encode(brands)        brand names -> codes (ValueError if unknown)
+    engine.predict(features)     raw (n, 6) feature matrix -> prices
+    engine.predict_one(brand, processor_speed, ram_size, storage_capacity, screen_size, weight)
+"""
+import numpy as np
+
+from app_logging import get_logger
+
+N_FEATURES = 6
+
+logger = get_logger('inference')
+
+
+class SklearnPipeline:
+    """Reference engine - the encoder/scaler/model exactly as pickled"""
+
+    kind = 'sklearn'
+
+    def __init__(self, model, scaler, encoder):
+        self.model = model
+        self.scaler = scaler
+        self.encoder = encoder
+        self.classes_ = [str(brand) for brand in encoder.classes_]
+
+    def encode(self, brands):
+        return self.encoder.transform(brands)
+
+    def predict(self, features):
+        return self.model.predict(self.scaler.transform(features))
+
+    def predict_one(self, brand, *values):
+        features = np.array([[self.encode([brand])[0], *values]])
+        return float(self.predict(features)[0])
+
+
+class CompiledModel:
+    """Pure-NumPy evaluation of a fitted linear model or tree ensemble"""
+
+    def __init__(self, kind, classes, params):
+        self.kind = kind
+        self.classes_ = [str(brand) for brand in classes]
+        self.params = params
+        self._codes = {brand: code for code, brand in enumerate(self.classes_)}
+
+        if kind == 'linear':
+            self._weights = params['weights']
+            self._bias = float(params['bias'])
+            self._weights_list = [float(w) for w in self._weights]
+        elif kind == 'trees':
+            self._mean = params['mean']
+            self._scale = params['scale']
+            self._feature = params['feature']
+            self._threshold = params['threshold']
+            self._left = params['left']
+            self._right = params['right']
+            self._value = params['value']
+            self._roots = params['roots']
+            self._depth = int(params['depth'])
+            self._tree_weight = float(params['tree_weight'])
+            self._base = float(params['base'])
+        else:
+            raise ValueError(f'Unknown compiled model kind: {kind}')
+
+    @classmethod
+    def from_sklearn(cls, model, scaler, encoder):
+        """Extract parameters from fitted sklearn objects.
+
+        Raises TypeError for model types that have no compiled equivalent,
+        so callers can fall back to SklearnPipeline.
+        """
+        mean, scale = _scaler_params(scaler)
+
+        if hasattr(model, 'coef_') and hasattr(model, 'intercept_'):
+            coef = np.asarray(model.coef_, dtype=np.float64).reshape(-1)
+            if coef.shape[0] != N_FEATURES:
+                raise TypeError(f'Expected {N_FEATURES} coefficients, got {coef.shape[0]}')
+            # coef . ((x - mean) / scale) + b  ==  (coef / scale) . x + (b - coef . (mean / scale))
+            weights = coef / scale
+            bias = float(np.asarray(model.intercept_).reshape(-1)[0]) - float(np.dot(coef, mean / scale))
+            params = {'weights': weights, 'bias': np.float64(bias)}
+            return cls('linear', encoder.classes_, params)
+
+        trees, tree_weight, base = _ensemble_trees(model)
+        params = _flatten_trees(trees)
+        params.update({
+            'mean': mean,
+            'scale': scale,
+            'tree_weight': np.float64(tree_weight),
+            'base': np.float64(base),
+        })
+        return cls('trees', encoder.classes_, params)
+
+    def encode(self, brands):
+        try:
+            return np.array([self._codes[brand] for brand in brands], dtype=np.float64)
+        except KeyError as e:
+            raise ValueError(f'y contains previously unseen labels: {e.args[0]}')
+
+    def predict(self, features):
+        features = np.asarray(features, dtype=np.float64)
+        if self.kind == 'linear':
+            return features @ self._weights + self._bias
+        return self._predict_trees(features)
+
+    def predict_one(self, brand, *values):
+        code = self._codes.get(brand)
+        if code is None:
+            raise ValueError(f'y contains previously unseen labels: {brand}')
+        if self.kind == 'linear':
+            # Six multiply-adds are cheaper in plain Python than a NumPy round trip
+            w = self._weights_list
+            return (self._bias + w[0] * code + w[1] * values[0] + w[2] * values[1]
+                    + w[3] * values[2] + w[4] * values[3] + w[5] * values[4])
+        return float(self._predict_trees(np.array([[code, *values]], dtype=np.float64))[0])
+
+    def _predict_trees(self, features):
+        # sklearn trees compare float32 copies of the scaled features
+        scaled = ((features - self._mean) / self._scale).astype(np.float32).astype(np.float64)
+        rows = np.arange(scaled.shape[0])[:, None]
+        nodes = np.broadcast_to(self._roots, (scaled.shape[0], self._roots.shape[0]))
+        # Leaves point to themselves, so walking max-depth steps lands every row on a leaf
+        for _ in range(self._depth):
+            go_left = scaled[rows, self._feature[nodes]] <= self._threshold[nodes]
+            nodes = np.where(go_left, self._left[nodes], self._right[nodes])
+        return self._base + self._tree_weight * self._value[nodes].sum(axis=1)
+
+
+def _scaler_params(scaler):
+    mean = getattr(scaler, 'mean_', None)
+    scale = getattr(scaler, 'scale_', None)
+    mean = np.zeros(N_FEATURES) if mean is None else np.asarray(mean, dtype=np.float64)
+    scale = np.ones(N_FEATURES) if scale is None else np.asarray(scale, dtype=np.float64)
+    return mean, scale
+
+
+def _ensemble_trees(model):
+    """Return (fitted tree_ objects, per-tree weight, base value) for supported models"""
+    name = type(model).__name__
+
+    if name in ('DecisionTreeRegressor', 'ExtraTreeRegressor'):
+        return [model.tree_], 1.0, 0.0
+
+    if name in ('RandomForestRegressor', 'ExtraTreesRegressor'):
+        trees = [estimator.tree_ for estimator in model.estimators_]
+        return trees, 1.0 / len(trees), 0.0
+
+    if name == 'GradientBoostingRegressor':
+        init = model.init_
+        if init == 'zero':
+            base = 0.0
+        elif type(init).__name__ == 'DummyRegressor':
+            base = float(np.asarray(init.constant_).reshape(-1)[0])
+        else:
+            raise TypeError(f'Unsupported GradientBoosting init estimator: {type(init).__name__}')
+        trees = [estimator.tree_ for estimator in model.estimators_[:, 0]]
+        return trees, float(model.learning_rate), base
+
+    raise TypeError(f'No compiled equivalent for model type: {name}')
+
+
+def _flatten_trees(trees):
+    """Concatenate node arrays of several trees into one set of flat arrays"""
+    features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+    offset = 0
+    depth = 0
+
+    for tree in trees:
+        n_nodes = tree.node_count
+        index = np.arange(n_nodes) + offset
+        is_leaf = tree.children_left == -1
+
+        feature = np.where(is_leaf, 0, tree.feature)
+        threshold = np.where(is_leaf, np.inf, tree.threshold)
+        left = np.where(is_leaf, index, tree.children_left + offset)
+        right = np.where(is_leaf, index, tree.children_right + offset)
+
+        features.append(feature)
+        thresholds.append(threshold)
+        lefts.append(left)
+        rights.append(right)
+        values.append(tree.value[:, 0, 0])
+        roots.append(offset)
+        depth = max(depth, tree.max_depth)
+        offset += n_nodes
+
+    return {
+        'feature': np.concatenate(features).astype(np.intp),
+        'threshold': np.concatenate(thresholds).astype(np.float64),
+        'left': np.concatenate(lefts).astype(np.intp),
+        'right': np.concatenate(rights).astype(np.intp),
+        'value': np.concatenate(values).astype(np.float64),
+        'roots': np.array(roots, dtype=np.intp),
+        'depth': np.int64(depth),
+    }
+
+
+def build_engine(model, scaler, encoder):
+    """Compile the model if possible, otherwise fall back to calling sklearn"""
+    try:
+        return CompiledModel.from_sklearn(model, scaler, encoder)
+    except (TypeError, AttributeError) as e:
+        logger.warning("Using sklearn inference path: %s", e)
+        return SklearnPipeline(model, scaler, encoder)
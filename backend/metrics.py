@@ -0,0 +1,172 @@
+"""
+In-process metrics - stage timings, request counts and error counts,
+rendered in Prometheus text format for /metrics.
+
+    with metrics.span('predict', 'inference'):
+        ...
+
+METRICS_ENABLED=0 turns every span into a shared no-op context manager,
+so instrumented code pays one attribute lookup and a function call.
+"""
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1').lower() not in ('0', 'false', 'no')
+
+# Upper bounds in seconds - from sub-millisecond inference up to slow SMTP/KDF work
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ('metrics', 'labels', 'start')
+
+    def __init__(self, metrics, labels):
+        self.metrics = metrics
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe('app_stage_seconds', self.labels, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """Thread-safe histograms, counters and gauge callbacks"""
+
+    HELP = {
+        'app_stage_seconds': ('histogram', 'Time spent in each stage of a request handler'),
+        'app_request_seconds': ('histogram', 'Time spent handling a request, by endpoint'),
+        'app_requests_total': ('counter', 'Requests handled, by endpoint, method and status'),
+        'app_errors_total': ('counter', 'Errors raised in request handlers, by route and type'),
+    }
+
+    def __init__(self, enabled=METRICS_ENABLED, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._counters = {}    # (name, labels) -> value
+        self._gauge_sources = []  # (prefix, callable returning a dict)
+        self._info_sources = []   # (name, callable returning a dict of labels)
+
+    def span(self, route, stage):
+        """Context manager that times one stage of a route"""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return _Span(self, (('route', route), ('stage', stage)))
+
+    def observe(self, name, labels, seconds):
+        if not self.enabled:
+            return
+        key = (name, labels)
+        with self._lock:
+            entry = self._histograms.get(key)
+            if entry is None:
+                entry = self._histograms[key] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    entry[index] += 1
+                    break
+            entry[-2] += seconds
+            entry[-1] += 1
+
+    def increment(self, name, labels, amount=1):
+        if not self.enabled:
+            return
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def count_error(self, route, error):
+        """Count an error by route and type (an exception or a short string)"""
+        error_type = error if isinstance(error, str) else type(error).__name__
+        self.increment('app_errors_total', (('route', route), ('type', error_type)))
+
+    def register_gauges(self, prefix, source):
+        """Expose every numeric value of source() as a gauge named <prefix>_<key>"""
+        self._gauge_sources.append((prefix, source))
+
+    def register_info(self, name, source):
+        """Expose source() as the labels of a constant-1 gauge (e.g. the active model version)"""
+        self._info_sources.append((name, source))
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        with self._lock:
+            histograms = {key: list(value) for key, value in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        for name in sorted({name for name, _ in histograms} | {name for name, _ in counters}):
+            kind, help_text = self.HELP.get(name, ('untyped', name))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'histogram':
+                for (metric, labels), entry in sorted(histograms.items()):
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(self.buckets, entry):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_labels(labels, le=repr(bound))} {cumulative}')
+                    lines.append(f'{name}_bucket{_labels(labels, le="+Inf")} {entry[-1]}')
+                    lines.append(f'{name}_sum{_labels(labels)} {entry[-2]}')
+                    lines.append(f'{name}_count{_labels(labels)} {entry[-1]}')
+            else:
+                for (metric, labels), value in sorted(counters.items()):
+                    if metric == name:
+                        lines.append(f'{name}{_labels(labels)} {value}')
+
+        for prefix, source in self._gauge_sources:
+            try:
+                values = source()
+            except Exception:
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, bool):
+                    value = int(value)
+                if isinstance(value, (int, float)):
+                    lines.append(f'# TYPE {prefix}_{key} gauge')
+                    lines.append(f'{prefix}_{key} {value}')
+
+        for name, source in self._info_sources:
+            try:
+                labels = tuple((key, value) for key, value in source().items() if value is not None)
+            except Exception:
+                continue
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name}{_labels(labels)} 1')
+
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def _labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    if not pairs:
+        return ''
+    body = ','.join(f'{key}="{_escape(value)}"' for key, value in pairs)
+    return '{' + body + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
@@ -1,138 +1,392 @@
 """
-Script to migrate the database schema by adding the missing user_id column.
-This uses raw SQL to alter the table without deleting existing data.
+Versioned schema migrations for the SQLite database.
+
+Each migration in MIGRATIONS runs once per database; applied versions are
+recorded in the schema_migrations table. Steps are idempotent, so a
+migration interrupted part-way is simply run again from its first step.
+
+Tables that need a new schema are rebuilt online (RebuildTable): the new
+table is filled from the old one in id-ordered batches, each batch a short
+transaction that also records how far the copy got. Triggers on the old
+table mirror writes made while the copy runs, the app keeps reading (WAL)
+and writing between batches, and an interrupted copy resumes from its
+checkpoint. Only the final swap - drop the old table, rename the new one,
+recreate its indexes - takes the write lock for longer than one batch.
+
+Usage:
+    python migrate_database.py [path/to/database.db ...]   apply pending migrations
+    python migrate_database.py --status [path ...]          list applied/pending versions
+Options: --batch-size 5000, --pause 0.05 (seconds between batches),
+--max-batches N (copy at most N batches now and resume on the next run),
+--target VERSION (stop after that version).
+With no path, migrates instance/laptop_price.db and laptop_price.db if present.
 """
-import sqlite3
+import argparse
 import os
+import sqlite3
+import time
+from datetime import datetime
 
 # Get the directory where this script is located
 base_dir = os.path.dirname(os.path.abspath(__file__))
-db_path = os.path.join(base_dir, 'laptop_price.db')
-
-print(f"Looking for database at: {db_path}")
-
-if not os.path.exists(db_path):
-    print("Database doesn't exist. It will be created when you run the Flask app.")
-    exit(0)
-
-try:
-    # Connect to the database
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Check if prediction table exists
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='prediction'")
-    table_exists = cursor.fetchone()
-    
-    if not table_exists:
-        print("Prediction table doesn't exist. It will be created when you run the Flask app.")
-        conn.close()
-        exit(0)
-    
-    # Check existing columns
-    cursor.execute("PRAGMA table_info(prediction)")
-    columns = cursor.fetchall()
-    column_names = [col[1] for col in columns]
-    
-    print(f"Existing columns in prediction table: {column_names}")
-    
-    if 'user_id' in column_names:
-        print("✓ user_id column already exists! No migration needed.")
+
+BATCH_SIZE = 5000
+PAUSE_SECONDS = 0.05
+BUSY_TIMEOUT_MS = 30000
+
+# Indexes declared on the models in app.py: (name, table, columns)
+INDEXES = [
+    ('ix_prediction_user_id_id', 'prediction', 'user_id, id'),
+    ('ix_otp_user_verified_code_expires', 'otp', 'user_id, is_verified, otp_code, expires_at'),
+    ('ix_otp_expires_at', 'otp', 'expires_at'),
+]
+
+PREDICTION_COLUMNS = ['id', 'user_id', 'brand', 'processor_speed', 'ram_size', 'storage_capacity',
+                      'screen_size', 'weight', 'predicted_price', 'created_at']
+
+
+def table_exists(conn, table):
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table,)).fetchone() is not None
+
+
+def table_columns(conn, table):
+    return [row[1] for row in conn.execute(f'PRAGMA table_info("{table}")')]
+
+
+class Sql:
+    """Run idempotent statements (CREATE ... IF NOT EXISTS, etc.) in one transaction"""
+
+    def __init__(self, *statements):
+        self.statements = statements
+
+    def run(self, conn, context):
+        conn.execute('BEGIN IMMEDIATE')
+        for statement in self.statements:
+            conn.execute(statement)
+        conn.execute('COMMIT')
+        return True
+
+
+class AddColumn:
+    """ALTER TABLE ... ADD COLUMN, skipped when the column (or the table) is not missing it"""
+
+    def __init__(self, table, column, definition):
+        self.table = table
+        self.column = column
+        self.definition = definition
+
+    def run(self, conn, context):
+        if table_exists(conn, self.table) and self.column not in table_columns(conn, self.table):
+            conn.execute(f'ALTER TABLE "{self.table}" ADD COLUMN {self.column} {self.definition}')
+            context.log(f"✓ Added {self.table}.{self.column}")
+        return True
+
+
+class CreateIndexes:
+    """CREATE INDEX IF NOT EXISTS for every index whose table exists, then ANALYZE"""
+
+    def __init__(self, indexes):
+        self.indexes = indexes
+
+    def run(self, conn, context):
+        for name, table, columns in self.indexes:
+            if not table_exists(conn, table):
+                context.log(f"  - Skipping {name}: table {table} doesn't exist yet")
+                continue
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})")
+            context.log(f"✓ Index {name} on {table} ({columns})")
+        # Refresh planner statistics so the new indexes are picked up
+        conn.execute('ANALYZE')
+        return True
+
+
+class RebuildTable:
+    """Rebuild a table with a new schema, copying its rows online in checkpointed batches.
+
+    create_sql is the new CREATE TABLE with {table} for its name; columns
+    lists the new table's columns and defaults maps the ones the old table
+    lacks to a function(conn) returning an SQL expression. when(conn)
+    decides whether the rebuild is needed at all.
+    """
+
+    def __init__(self, table, create_sql, columns, defaults=None, when=None):
+        self.table = table
+        self.new_table = table + '__new'
+        self.create_sql = create_sql
+        self.columns = columns
+        self.defaults = defaults or {}
+        self.when = when
+
+    def _expressions(self, conn, prefix=''):
+        old_columns = set(table_columns(conn, self.table))
+        return ', '.join(prefix + column if column in old_columns else self.defaults[column](conn)
+                         for column in self.columns)
+
+    def _trigger_names(self):
+        return [f'{self.new_table}_{event}' for event in ('insert', 'update', 'delete')]
+
+    def _create_triggers(self, conn):
+        """Mirror every write to the old table into the new one while the copy runs"""
+        columns = ', '.join(self.columns)
+        upsert = f'INSERT OR REPLACE INTO "{self.new_table}" ({columns}) VALUES ({self._expressions(conn, "NEW.")});'
+        delete = f'DELETE FROM "{self.new_table}" WHERE id = OLD.id;'
+        insert_name, update_name, delete_name = self._trigger_names()
+        for name, event, body in ((insert_name, 'INSERT', upsert),
+                                  (update_name, 'UPDATE', delete + ' ' + upsert),
+                                  (delete_name, 'DELETE', delete)):
+            conn.execute(f'DROP TRIGGER IF EXISTS "{name}"')
+            conn.execute(f'CREATE TRIGGER "{name}" AFTER {event} ON "{self.table}" BEGIN {body} END')
+
+    def run(self, conn, context):
+        if not table_exists(conn, self.table) or (self.when is not None and not self.when(conn)):
+            return True
+
+        last_id = context.checkpoint(conn)
+        if last_id is None or not table_exists(conn, self.new_table):
+            # New table, triggers and checkpoint appear together, so a resume finds all three
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute(f'DROP TABLE IF EXISTS "{self.new_table}"')
+            conn.execute(self.create_sql.format(table=f'"{self.new_table}"'))
+            self._create_triggers(conn)
+            last_id = 0
+            context.save_checkpoint(conn, last_id)
+            conn.execute('COMMIT')
+            context.log(f"✓ Created {self.new_table}, copying {self.table} in batches of {context.batch_size}")
+        else:
+            context.log(f"✓ Resuming copy of {self.table} after id {last_id}")
+
+        columns = ', '.join(self.columns)
+        copy_values = self._expressions(conn)
+        batches = 0
+        while True:
+            if context.max_batches is not None and batches >= context.max_batches:
+                context.log(f"  - Paused after {batches} batches at id {last_id}; run again to resume")
+                return False
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(f'SELECT MAX(id) FROM (SELECT id FROM "{self.table}" WHERE id > ? ORDER BY id LIMIT ?)',
+                               (last_id, context.batch_size)).fetchone()
+            if row[0] is None:
+                conn.execute('COMMIT')
+                break
+            # OR IGNORE: a row the triggers already mirrored is newer than the one read here
+            conn.execute(f'INSERT OR IGNORE INTO "{self.new_table}" ({columns}) '
+                         f'SELECT {copy_values} FROM "{self.table}" WHERE id > ? AND id <= ?', (last_id, row[0]))
+            last_id = row[0]
+            context.save_checkpoint(conn, last_id)
+            conn.execute('COMMIT')
+            batches += 1
+            if context.pause:
+                time.sleep(context.pause)  # let the app's writers in between batches
+
+        indexes = [sql for (sql,) in conn.execute(
+            "SELECT sql FROM sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL", (self.table,))]
+        conn.execute('BEGIN IMMEDIATE')
+        for name in self._trigger_names():
+            conn.execute(f'DROP TRIGGER IF EXISTS "{name}"')
+        conn.execute(f'DROP TABLE "{self.table}"')
+        conn.execute(f'ALTER TABLE "{self.new_table}" RENAME TO "{self.table}"')
+        for sql in indexes:
+            conn.execute(sql)
+        context.save_checkpoint(conn, None)
+        conn.execute('COMMIT')
+        context.log(f"✓ Swapped in the rebuilt {self.table} (copied up to id {last_id})")
+        return True
+
+
+class Migration:
+    def __init__(self, version, name, steps):
+        self.version = version
+        self.name = name
+        self.steps = steps
+
+
+def default_user_id(conn):
+    """Owner for predictions saved before they had one: the first user, or a placeholder user"""
+    (user_id,) = conn.execute('SELECT MIN(id) FROM user').fetchone()
+    if user_id is None:
+        user_id = conn.execute(
+            "INSERT INTO user (username, email, password_hash, created_at) "
+            "VALUES ('default_user', 'default@example.com', 'pbkdf2:sha256:600000$default', datetime('now'))"
+        ).lastrowid
+    return str(int(user_id))
+
+
+# The schema app.py's models create, in the DDL SQLAlchemy emits for SQLite
+CREATE_USER = """
+    CREATE TABLE IF NOT EXISTS user (
+        id INTEGER NOT NULL,
+        username VARCHAR(80) NOT NULL,
+        email VARCHAR(120) NOT NULL,
+        phone VARCHAR(15),
+        password_hash VARCHAR(200) NOT NULL,
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        UNIQUE (username),
+        UNIQUE (email)
+    )"""
+CREATE_OTP = """
+    CREATE TABLE IF NOT EXISTS otp (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        otp_code VARCHAR(6) NOT NULL,
+        otp_type VARCHAR(10) NOT NULL,
+        created_at DATETIME,
+        expires_at DATETIME NOT NULL,
+        is_verified BOOLEAN,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES user (id)
+    )"""
+CREATE_PREDICTION = """
+    CREATE TABLE {table} (
+        id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        brand VARCHAR(50),
+        processor_speed FLOAT,
+        ram_size INTEGER,
+        storage_capacity INTEGER,
+        screen_size FLOAT,
+        weight FLOAT,
+        predicted_price FLOAT,
+        created_at DATETIME,
+        PRIMARY KEY (id),
+        FOREIGN KEY(user_id) REFERENCES user (id)
+    )"""
+
+MIGRATIONS = [
+    Migration(1, 'create core tables', [
+        Sql(CREATE_USER, CREATE_OTP, CREATE_PREDICTION.format(table='IF NOT EXISTS prediction')),
+    ]),
+    Migration(2, 'add user phone for SMS OTP', [
+        AddColumn('user', 'phone', 'VARCHAR(15)'),
+    ]),
+    Migration(3, 'add prediction.user_id', [
+        RebuildTable('prediction', CREATE_PREDICTION, PREDICTION_COLUMNS,
+                     defaults={'user_id': default_user_id, 'created_at': lambda conn: "datetime('now')"},
+                     when=lambda conn: 'user_id' not in table_columns(conn, 'prediction')),
+    ]),
+    Migration(4, 'add query indexes', [
+        CreateIndexes(INDEXES),
+    ]),
+]
+
+
+class MigrationContext:
+    """What a step needs from the runner: its checkpoint, batch settings and a logger"""
+
+    def __init__(self, version, step, batch_size, pause, max_batches, log):
+        self.version = version
+        self.step = step
+        self.batch_size = batch_size
+        self.pause = pause
+        self.max_batches = max_batches
+        self.log = log
+
+    def checkpoint(self, conn):
+        row = conn.execute('SELECT last_id FROM migration_checkpoint WHERE version = ? AND step = ?',
+                           (self.version, self.step)).fetchone()
+        return row[0] if row else None
+
+    def save_checkpoint(self, conn, last_id):
+        """Record progress (None clears it); call inside the transaction that made the progress"""
+        if last_id is None:
+            conn.execute('DELETE FROM migration_checkpoint WHERE version = ? AND step = ?', (self.version, self.step))
+        else:
+            conn.execute('INSERT OR REPLACE INTO migration_checkpoint (version, step, last_id, updated_at) '
+                         'VALUES (?, ?, ?, ?)', (self.version, self.step, last_id, datetime.utcnow()))
+
+
+def connect(db_path):
+    # Autocommit mode: every step manages its own (short) transactions
+    conn = sqlite3.connect(db_path, isolation_level=None, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.execute('PRAGMA journal_mode = WAL')  # readers are never blocked by the copy
+    conn.execute('PRAGMA foreign_keys = OFF')  # tables are dropped and renamed under their references
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            applied_at DATETIME NOT NULL,
+            seconds FLOAT
+        )""")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS migration_checkpoint (
+            version INTEGER NOT NULL,
+            step INTEGER NOT NULL,
+            last_id INTEGER,
+            updated_at DATETIME,
+            PRIMARY KEY (version, step)
+        )""")
+    return conn
+
+
+def applied_versions(conn):
+    return {version: applied_at for version, applied_at in conn.execute('SELECT version, applied_at FROM schema_migrations')}
+
+
+def migrate(db_path, target=None, batch_size=BATCH_SIZE, pause=PAUSE_SECONDS, max_batches=None,
+            migrations=MIGRATIONS, log=print):
+    """Apply pending migrations in order; returns the versions applied (stops early if a copy pauses)"""
+    conn = connect(db_path)
+    try:
+        applied = applied_versions(conn)
+        done = []
+        for migration in migrations:
+            if migration.version in applied or (target is not None and migration.version > target):
+                continue
+            log(f"Applying {migration.version}: {migration.name}")
+            start = time.perf_counter()
+            for step_number, step in enumerate(migration.steps):
+                context = MigrationContext(migration.version, step_number, batch_size, pause, max_batches, log)
+                if not step.run(conn, context):
+                    return done
+            conn.execute('INSERT INTO schema_migrations (version, name, applied_at, seconds) VALUES (?, ?, ?, ?)',
+                         (migration.version, migration.name, datetime.utcnow(), time.perf_counter() - start))
+            done.append(migration.version)
+        return done
+    finally:
         conn.close()
-        exit(0)
-    
-    print("\nStarting migration...")
-    
-    # Begin transaction
-    cursor.execute("BEGIN TRANSACTION")
-    
-    # Rename old table
-    cursor.execute("ALTER TABLE prediction RENAME TO prediction_old")
-    print("✓ Renamed old table to prediction_old")
-    
-    # Create new table with correct schema
-    cursor.execute("""
-        CREATE TABLE prediction (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            brand VARCHAR(50),
-            processor_speed FLOAT,
-            ram_size INTEGER,
-            storage_capacity INTEGER,
-            screen_size FLOAT,
-            weight FLOAT,
-            predicted_price FLOAT,
-            created_at DATETIME,
-            FOREIGN KEY (user_id) REFERENCES user(id)
-        )
-    """)
-    print("✓ Created new prediction table with user_id column")
-    
-    # Check if we need to create a default user
-    cursor.execute("SELECT COUNT(*) FROM user")
-    user_count = cursor.fetchone()[0]
-    
-    if user_count == 0:
-        # Create a default user for old predictions
-        cursor.execute("""
-            INSERT INTO user (username, email, password_hash, created_at)
-            VALUES ('default_user', 'default@example.com', 'pbkdf2:sha256:600000$default', datetime('now'))
-        """)
-        default_user_id = cursor.lastrowid
-        print(f"✓ Created default user with ID {default_user_id} for old predictions")
-    else:
-        # Use the first user
-        cursor.execute("SELECT id FROM user LIMIT 1")
-        default_user_id = cursor.fetchone()[0]
-        print(f"✓ Using existing user with ID {default_user_id} for old predictions")
-    
-    # Check if old table has created_at column
-    cursor.execute("PRAGMA table_info(prediction_old)")
-    old_columns = cursor.fetchall()
-    old_column_names = [col[1] for col in old_columns]
-    has_created_at = 'created_at' in old_column_names
-    
-    # Copy data from old table to new table with default user_id
-    if has_created_at:
-        cursor.execute(f"""
-            INSERT INTO prediction (id, user_id, brand, processor_speed, ram_size, 
-                                   storage_capacity, screen_size, weight, predicted_price, created_at)
-            SELECT id, {default_user_id}, brand, processor_speed, ram_size, 
-                   storage_capacity, screen_size, weight, predicted_price, created_at
-            FROM prediction_old
-        """)
-    else:
-        cursor.execute(f"""
-            INSERT INTO prediction (id, user_id, brand, processor_speed, ram_size, 
-                                   storage_capacity, screen_size, weight, predicted_price, created_at)
-            SELECT id, {default_user_id}, brand, processor_speed, ram_size, 
-                   storage_capacity, screen_size, weight, predicted_price, datetime('now')
-            FROM prediction_old
-        """)
-    
-    rows_migrated = cursor.rowcount
-    print(f"✓ Migrated {rows_migrated} predictions to new table")
-    
-    # Drop old table
-    cursor.execute("DROP TABLE prediction_old")
-    print("✓ Dropped old table")
-    
-    # Commit transaction
-    conn.commit()
-    print("\n✓ Migration completed successfully!")
-    print(f"  - All {rows_migrated} existing predictions have been assigned to user_id {default_user_id}")
-    print("  - New predictions will use the correct user_id from sessions")
-    
-except sqlite3.Error as e:
-    print(f"✗ Database error: {e}")
-    if conn:
-        conn.rollback()
-        print("✗ Changes rolled back")
-except Exception as e:
-    print(f"✗ Error: {e}")
-    import traceback
-    traceback.print_exc()
-finally:
-    if conn:
+
+
+def status(db_path, migrations=MIGRATIONS):
+    """[(version, name, applied_at or None)] for every known migration"""
+    conn = connect(db_path)
+    try:
+        applied = applied_versions(conn)
+        return [(m.version, m.name, applied.get(m.version)) for m in migrations]
+    finally:
         conn.close()
-        print("\nDatabase connection closed.")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Apply versioned schema migrations')
+    parser.add_argument('databases', nargs='*', help='SQLite files (default: instance/laptop_price.db and laptop_price.db)')
+    parser.add_argument('--status', action='store_true', help='list applied and pending migrations')
+    parser.add_argument('--target', type=int, help='stop after this version')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--pause', type=float, default=PAUSE_SECONDS, help='seconds to sleep between copy batches')
+    parser.add_argument('--max-batches', type=int, help='copy at most this many batches, then stop (resumable)')
+    args = parser.parse_args()
+
+    db_paths = args.databases or [os.path.join(base_dir, 'instance', 'laptop_price.db'),
+                                  os.path.join(base_dir, 'laptop_price.db')]
+    for db_path in db_paths:
+        print(f"Database: {db_path}")
+        if not os.path.exists(db_path):
+            print("  - Not found (the Flask app creates it on first start)\n")
+            continue
+        if args.status:
+            for version, name, applied_at in status(db_path):
+                print(f"  {'[OK]     ' if applied_at else '[PENDING]'} {version}: {name}"
+                      + (f" (applied {applied_at})" if applied_at else ''))
+            print()
+            continue
+        try:
+            done = migrate(db_path, args.target, args.batch_size, args.pause, args.max_batches)
+        except sqlite3.Error as e:
+            print(f"[ERROR] Database error: {e} - completed batches are kept, run again to resume\n")
+            continue
+        pending = [version for version, _, applied_at in status(db_path) if applied_at is None
+                   and (args.target is None or version <= args.target)]
+        if pending:
+            print(f"[WARNING] Applied {done or 'nothing'}; still pending: {pending}\n")
+        else:
+            print(f"[OK] Up to date (applied now: {done or 'none'})\n")
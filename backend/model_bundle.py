@@ -0,0 +1,204 @@
+"""
+Model bundle - the encoder, scaler and model compiled into one checksummed,
+versioned file that loads with a single mmap and no pickle.
+
+Layout:
+    8 bytes   magic b'LPMBNDL1'
+    8 bytes   manifest length (little-endian uint64)
+    manifest  UTF-8 JSON: format version, library versions, feature order,
+              brand classes, model kind, the hash of the pickles it was
+              built from, and dtype/shape/offset/sha256 of every array
+    payload   raw little-endian arrays, each aligned to 64 bytes
+
+The loader refuses a bundle whose format, feature order, manifest id or
+array checksums don't match, and check_components() refuses to combine an
+encoder, scaler and model that were not fitted for the same features
+(e.g. an encoder re-fitted alone by update_encoder.py with other brands).
+"""
+import hashlib
+import json
+import mmap
+import os
+import platform
+import struct
+from datetime import datetime
+
+MAGIC = b'LPMBNDL1'
+FORMAT_VERSION = 1
+ALIGN = 64
+BUNDLE_FILE = 'model.bundle'
+FEATURE_ORDER = ('brand', 'processor_speed', 'ram_size', 'storage_capacity', 'screen_size', 'weight')
+
+# Portable dtypes for the payload (intp differs between platforms)
+_DTYPES = {'f': '<f8', 'i': '<i8', 'u': '<i8', 'b': '<i8'}
+
+
+class BundleError(ValueError):
+    """The bundle (or the components it is built from) is corrupt or inconsistent"""
+
+
+def check_components(model, scaler, encoder):
+    """Refuse an encoder/scaler/model trio that was not fitted together"""
+    classes = [str(brand) for brand in getattr(encoder, 'classes_', [])]
+    if not classes or len(set(classes)) != len(classes):
+        raise BundleError('Encoder has no (or duplicate) brand classes')
+
+    for name, component in (('model', model), ('scaler', scaler)):
+        n_features = getattr(component, 'n_features_in_', len(FEATURE_ORDER))
+        if n_features != len(FEATURE_ORDER):
+            raise BundleError(f'{name} expects {n_features} features, not {len(FEATURE_ORDER)}')
+
+    names = getattr(scaler, 'feature_names_in_', None)
+    if names is not None and [str(name).lower() for name in names] != list(FEATURE_ORDER):
+        raise BundleError(f'Scaler was fitted on columns {list(names)}, expected {list(FEATURE_ORDER)}')
+
+    # The scaler saw the brand codes the model was trained on - their mean must be a valid code
+    mean = getattr(scaler, 'mean_', None)
+    if mean is not None and not 0 <= float(mean[0]) <= len(classes) - 1:
+        raise BundleError(f'Scaler brand-code mean {float(mean[0]):.3f} does not fit '
+                          f'{len(classes)} encoder classes - was the encoder re-fitted alone?')
+    return classes
+
+
+def _canonical(manifest):
+    return json.dumps(manifest, sort_keys=True, separators=(',', ':')).encode('utf-8')
+
+
+def _bundle_id(manifest):
+    body = {key: value for key, value in manifest.items() if key != 'bundle_id'}
+    return hashlib.sha256(_canonical(body)).hexdigest()
+
+
+def write_bundle(path, model, scaler, encoder, source_hash=None):
+    """Validate the components, compile them and write a bundle; returns the manifest"""
+    import numpy as np
+    from inference import CompiledModel
+
+    classes = check_components(model, scaler, encoder)
+    compiled = CompiledModel.from_sklearn(model, scaler, encoder)
+
+    arrays, specs, offset = [], {}, 0
+    for name in sorted(compiled.params):
+        value = np.asarray(compiled.params[name])
+        value = np.ascontiguousarray(value, dtype=_DTYPES[value.dtype.kind])
+        offset = -(-offset // ALIGN) * ALIGN
+        specs[name] = {
+            'dtype': value.dtype.str,
+            'shape': list(value.shape),
+            'offset': offset,
+            'nbytes': value.nbytes,
+            'sha256': hashlib.sha256(value.tobytes()).hexdigest(),
+        }
+        arrays.append((offset, value))
+        offset += value.nbytes
+
+    try:
+        import sklearn
+        sklearn_version = sklearn.__version__
+    except ImportError:
+        sklearn_version = None
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'created_at': datetime.utcnow().isoformat(),
+        'versions': {'python': platform.python_version(), 'numpy': np.__version__, 'sklearn': sklearn_version},
+        'model': {'kind': compiled.kind, 'type': type(model).__name__},
+        'feature_order': list(FEATURE_ORDER),
+        'brand_classes': classes,
+        'source_hash': source_hash,
+        'arrays': specs,
+    }
+    manifest['bundle_id'] = _bundle_id(manifest)
+
+    header = _canonical(manifest)
+    payload_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<Q', len(header)) + header)
+        for array_offset, value in arrays:
+            f.seek(payload_start + array_offset)
+            f.write(value.tobytes())
+    os.replace(tmp_path, path)  # a watcher never sees a half-written bundle
+    return manifest
+
+
+# What a truncated or hand-edited bundle raises while being parsed
+_MALFORMED = (struct.error, KeyError, IndexError, TypeError, AttributeError, ValueError)
+
+
+def _read_header(f):
+    if f.read(len(MAGIC)) != MAGIC:
+        raise BundleError('Not a model bundle (bad magic)')
+    try:
+        (length,) = struct.unpack('<Q', f.read(8))
+    except struct.error:
+        raise BundleError('Bundle header is truncated')
+    try:
+        manifest = json.loads(f.read(length).decode('utf-8'))
+    except ValueError:
+        raise BundleError('Bundle manifest is not valid JSON')
+    if not isinstance(manifest, dict):
+        raise BundleError('Bundle manifest is not a JSON object')
+    payload_start = -(-(len(MAGIC) + 8 + length) // ALIGN) * ALIGN
+    return manifest, payload_start
+
+
+def read_manifest(path):
+    with open(path, 'rb') as f:
+        return _read_header(f)[0]
+
+
+def load_bundle(path, verify=True):
+    """Map a bundle and return (CompiledModel, manifest); raises BundleError if it is inconsistent"""
+    try:
+        return _load_bundle(path, verify)
+    except BundleError:
+        raise
+    except _MALFORMED as e:
+        # Missing manifest keys, wrong types, shapes that don't fit the payload...
+        raise BundleError(f'Malformed bundle: {type(e).__name__}: {e}')
+
+
+def _load_bundle(path, verify):
+    import numpy as np
+    from inference import CompiledModel
+
+    with open(path, 'rb') as f:
+        manifest, payload_start = _read_header(f)
+        if manifest.get('format_version') != FORMAT_VERSION:
+            raise BundleError(f"Unsupported bundle format {manifest.get('format_version')}")
+        if manifest.get('feature_order') != list(FEATURE_ORDER):
+            raise BundleError(f"Bundle feature order {manifest.get('feature_order')} != {list(FEATURE_ORDER)}")
+        if manifest.get('bundle_id') != _bundle_id(manifest):
+            raise BundleError('Bundle manifest does not match its id')
+        # The arrays are views of the mapping; it stays open as long as they do
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    params = {}
+    for name, spec in manifest['arrays'].items():
+        start = payload_start + spec['offset']
+        if start + spec['nbytes'] > len(mapped):
+            raise BundleError(f'Bundle is truncated (array {name})')
+        if verify and hashlib.sha256(mapped[start:start + spec['nbytes']]).hexdigest() != spec['sha256']:
+            raise BundleError(f'Checksum mismatch for array {name}')
+        dtype = np.dtype(spec['dtype'])
+        count = spec['nbytes'] // dtype.itemsize
+        params[name] = np.frombuffer(mapped, dtype=dtype, count=count, offset=start).reshape(spec['shape'])
+
+    engine = CompiledModel(manifest['model']['kind'], manifest['brand_classes'], params)
+    _check_shapes(engine, manifest)
+    return engine, manifest
+
+
+def _check_shapes(engine, manifest):
+    """The payload must fit the manifest's feature count and brand classes"""
+    n_features = len(manifest['feature_order'])
+    params = engine.params
+    if engine.kind == 'linear':
+        if params['weights'].shape != (n_features,):
+            raise BundleError(f"Linear weights have shape {params['weights'].shape}, expected ({n_features},)")
+    else:
+        for name in ('mean', 'scale'):
+            if params[name].shape != (n_features,):
+                raise BundleError(f'Tree {name} has shape {params[name].shape}, expected ({n_features},)')
+        if len(params['feature']) and int(params['feature'].max()) >= n_features:
+            raise BundleError('Tree splits on a feature outside the feature order')
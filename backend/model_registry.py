@@ -0,0 +1,281 @@
+"""
+Model registry - loads the price model on first use instead of at import time.
+
+Routes that never predict (/, /api/check-auth, /api/signin, ...) no longer
+pay for unpickling or importing numpy/sklearn. When model.bundle exists and
+was built from the current pickles (or the pickles aren't deployed at all),
+it is loaded instead of the pickles so the predict path never imports
+scikit-learn. See model_bundle.py for the format and its consistency checks.
+
+Replacing the artifacts of a running app is picked up by a watcher thread
+(MODEL_RELOAD_INTERVAL_SECONDS) without a restart.
+
+Rebuild the bundle after retraining with:
+    python model_registry.py
+"""
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+from app_logging import get_logger
+from model_bundle import BUNDLE_FILE, BundleError, check_components, load_bundle, read_manifest, write_bundle
+
+ARTIFACT_FILES = ('model.pkl', 'encoder.pkl', 'scaler.pkl')
+
+# Poll the artifacts for changes this often; 0 disables hot reload (Vercel default -
+# background threads are frozen between requests there)
+RELOAD_INTERVAL_SECONDS = float(os.environ.get('MODEL_RELOAD_INTERVAL_SECONDS', 0 if os.environ.get('VERCEL') else 30))
+RELOAD_SETTLE_SECONDS = 1.0
+
+# Typical configurations priced for every brand before a reloaded model goes live
+SMOKE_CONFIGS = (
+    (2.5, 8, 512, 15.6, 2.0),
+    (3.5, 16, 1000, 14.0, 1.5),
+    (1.8, 4, 256, 13.3, 1.2),
+)
+
+logger = get_logger('model_registry')
+
+
+def artifact_hash(base_dir):
+    """SHA-256 over the three pickles - changes whenever any of them is replaced"""
+    digest = hashlib.sha256()
+    for name in ARTIFACT_FILES:
+        with open(os.path.join(base_dir, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+class ModelRegistry:
+    """Thread-safe holder for the inference engine, loaded on first use and hot-reloaded.
+
+    A watcher thread polls the artifact files' mtimes every reload_interval
+    seconds. When they change (and the content hash differs), the new
+    artifacts are loaded off the request path, checked on a smoke batch and
+    swapped in with a single reference assignment - a request keeps the
+    engine it fetched, so it never mixes two model versions. Each engine
+    carries its own .version, which keys the prediction cache and price grid.
+    """
+
+    def __init__(self, base_dir, bundle_path=None, reload_interval=RELOAD_INTERVAL_SECONDS):
+        self.base_dir = base_dir
+        self.bundle_path = bundle_path or os.environ.get('MODEL_BUNDLE', os.path.join(base_dir, BUNDLE_FILE))
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._engine = None
+        self._loaded = False
+        self._fingerprint = None
+        self._watcher = None
+        self._stop = threading.Event()
+        self.version = None
+        self.source = None
+        self.load_seconds = None
+        self.load_error = None
+        self.loaded_at = None
+        self.reloads = 0
+        self.reload_failures = 0
+        self.reload_error = None
+
+    def get(self):
+        """Return the active inference engine, loading it on the first call (None if loading failed)"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+                    self._loaded = True
+            if self.reload_interval > 0:
+                self._start_watcher()
+        return self._engine
+
+    def _fingerprint_now(self):
+        """(path, mtime, size) of every artifact - cheap to poll, unlike hashing"""
+        paths = [os.path.join(self.base_dir, name) for name in ARTIFACT_FILES] + [self.bundle_path]
+        fingerprint = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+                fingerprint.append((path, stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                fingerprint.append((path, None, None))
+        return tuple(fingerprint)
+
+    def _pickles_present(self):
+        return all(os.path.exists(os.path.join(self.base_dir, name)) for name in ARTIFACT_FILES)
+
+    def _current_version(self):
+        """Version of the artifacts on disk: the pickles' hash, or the bundle's if it is deployed alone"""
+        if self._pickles_present():
+            return artifact_hash(self.base_dir)
+        manifest = read_manifest(self.bundle_path)
+        return manifest.get('source_hash') or manifest['bundle_id']
+
+    def _build(self):
+        """Load an engine from the current files; returns (engine, source, seconds)"""
+        start = time.perf_counter()
+        pickles_present = self._pickles_present()
+        source_hash = artifact_hash(self.base_dir) if pickles_present else None
+
+        engine = self._load_bundle(source_hash, required=not pickles_present)
+        source = 'bundle'
+        if engine is None:
+            from inference import build_engine
+            model = load_pickle(os.path.join(self.base_dir, 'model.pkl'))
+            encoder = load_pickle(os.path.join(self.base_dir, 'encoder.pkl'))
+            scaler = load_pickle(os.path.join(self.base_dir, 'scaler.pkl'))
+            check_components(model, scaler, encoder)
+            engine = build_engine(model, scaler, encoder)
+            engine.version = source_hash
+            source = 'pickle'
+        return engine, source, time.perf_counter() - start
+
+    def _activate(self, engine, source, seconds, fingerprint):
+        # One reference assignment - readers see either the old engine or the new one
+        self._engine = engine
+        self.version = engine.version
+        self.source = source
+        self.load_seconds = seconds
+        self.loaded_at = time.time()
+        self._fingerprint = fingerprint
+
+    def _load(self):
+        fingerprint = self._fingerprint_now()
+        try:
+            self._activate(*self._build(), fingerprint)
+        except Exception as e:
+            logger.exception("Error loading models")
+            self._engine = None
+            self.load_error = str(e)
+            self._fingerprint = fingerprint
+            return
+        logger.info("Model loaded", extra={'fields': {
+            'source': self.source, 'version': self.version[:12], 'load_ms': round(self.load_seconds * 1000, 1)}})
+
+    def reload(self, force=False):
+        """Load and swap in changed artifacts; returns True if a new version went live"""
+        with self._reload_lock:
+            fingerprint = self._fingerprint_now()
+            if not force and fingerprint == self._fingerprint:
+                return False
+            try:
+                if not force and self._current_version() == self.version:
+                    self._fingerprint = fingerprint  # touched, not changed
+                    return False
+                engine, source, seconds = self._build()
+                validate_engine(engine)
+            except Exception as e:
+                # Keep serving the current model; don't retry until the files change again
+                self.reload_failures += 1
+                self.reload_error = str(e)
+                self._fingerprint = fingerprint
+                logger.exception("Model reload failed, keeping version %s", (self.version or '')[:12])
+                return False
+
+            previous = self.version
+            self._activate(engine, source, seconds, fingerprint)
+            self._loaded = True
+            self.load_error = None
+            self.reload_error = None
+            self.reloads += 1
+        logger.info("Model reloaded", extra={'fields': {
+            'source': source, 'version': engine.version[:12], 'previous_version': (previous or '')[:12],
+            'load_ms': round(seconds * 1000, 1)}})
+        return True
+
+    def _start_watcher(self):
+        with self._lock:
+            if self._watcher is None:
+                self._watcher = threading.Thread(target=self._watch, name='model-reload', daemon=True)
+                self._watcher.start()
+
+    def _watch(self):
+        while not self._stop.wait(self.reload_interval):
+            try:
+                if self._fingerprint_now() == self._fingerprint:
+                    continue
+                # Let a copy/rsync of the artifacts finish before loading them
+                settled = self._fingerprint_now()
+                if self._stop.wait(RELOAD_SETTLE_SECONDS) or self._fingerprint_now() != settled:
+                    continue
+                self.reload()
+            except Exception:
+                logger.exception("Model watcher error")
+
+    def stop(self):
+        self._stop.set()
+
+    def _load_bundle(self, source_hash, required):
+        """Load the bundle if present and built from the current pickles (None to use the pickles)"""
+        if not os.path.exists(self.bundle_path):
+            if required:
+                raise FileNotFoundError(f'Neither the model pickles nor {self.bundle_path} exist')
+            return None
+        try:
+            manifest = read_manifest(self.bundle_path)
+            if source_hash is not None and manifest.get('source_hash') != source_hash:
+                logger.warning("%s is stale (pickles changed); loading pickles instead", self.bundle_path)
+                return None
+            engine, manifest = load_bundle(self.bundle_path)
+        except BundleError:
+            if required:
+                raise
+            logger.exception("Refusing %s; loading pickles instead", self.bundle_path)
+            return None
+        engine.version = manifest.get('source_hash') or manifest['bundle_id']
+        return engine
+
+    def stats(self):
+        return {
+            'loaded': self._loaded and self._engine is not None,
+            'version': self.version,
+            'source': self.source,
+            'engine': getattr(self._engine, 'kind', None),
+            'load_seconds': self.load_seconds,
+            'loaded_at': self.loaded_at,
+            'load_error': self.load_error,
+            'reload_interval_seconds': self.reload_interval,
+            'reloads': self.reloads,
+            'reload_failures': self.reload_failures,
+            'reload_error': self.reload_error,
+        }
+
+
+def validate_engine(engine):
+    """Smoke-test a freshly loaded engine before it serves traffic (raises ValueError)"""
+    import numpy as np
+
+    if not len(engine.classes_):
+        raise ValueError('Model has no brand classes')
+    rows = [(brand,) + values for brand in engine.classes_ for values in SMOKE_CONFIGS]
+    features = np.array([[0.0, *row[1:]] for row in rows], dtype=np.float64)
+    features[:, 0] = engine.encode([row[0] for row in rows])
+    prices = np.asarray(engine.predict(features), dtype=np.float64)
+    if prices.shape != (len(rows),) or not np.all(np.isfinite(prices)):
+        raise ValueError('Smoke batch returned missing or non-finite prices')
+    # The single-row path must agree with the batch path
+    single = engine.predict_one(*rows[0])
+    if not np.isclose(single, prices[0], rtol=1e-6):
+        raise ValueError(f'predict_one disagrees with predict ({single} vs {prices[0]})')
+
+
+def build_bundle(base_dir, path=None):
+    """Check the three pickles belong together and compile them into model.bundle"""
+    path = path or os.path.join(base_dir, BUNDLE_FILE)
+    model = load_pickle(os.path.join(base_dir, 'model.pkl'))
+    encoder = load_pickle(os.path.join(base_dir, 'encoder.pkl'))
+    scaler = load_pickle(os.path.join(base_dir, 'scaler.pkl'))
+    write_bundle(path, model, scaler, encoder, source_hash=artifact_hash(base_dir))
+    return path
+
+
+if __name__ == '__main__':
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    path = build_bundle(base_dir)
+    print(f"[OK] Wrote {path} ({os.path.getsize(path)} bytes)")
@@ -0,0 +1,235 @@
+"""
+Background OTP email delivery.
+
+/api/signin and /api/resend-otp only persist the OTP and enqueue the email;
+worker threads drain the queue, each keeping one authenticated SMTP
+connection open and reusing it across messages. A failed send drops the
+connection, reconnects and retries with exponential backoff.
+
+OTP_DELIVERY_MODE=async|sync picks the mode. It defaults to sync on Vercel,
+where background threads are frozen between requests; sync mode still
+reuses the pooled connection.
+"""
+import atexit
+import os
+import queue
+import smtplib
+import threading
+import time
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+
+from app_logging import get_logger
+
+DEFAULT_MODE = os.environ.get('OTP_DELIVERY_MODE', 'sync' if os.environ.get('VERCEL') else 'async')
+WORKERS = int(os.environ.get('OTP_DELIVERY_WORKERS', 2))
+MAX_RETRIES = int(os.environ.get('OTP_DELIVERY_MAX_RETRIES', 3))
+BACKOFF_SECONDS = float(os.environ.get('OTP_DELIVERY_BACKOFF', 0.5))
+SMTP_TIMEOUT = 15
+
+logger = get_logger('otp_delivery')
+
+
+def build_otp_email(sender, email, otp_code, username, expiry_minutes):
+    """Build the HTML OTP message"""
+    msg = MIMEMultipart('alternative')
+    msg['From'] = sender
+    msg['To'] = email
+    msg['Subject'] = 'Your Login OTP - Laptop Price Predictor'
+
+    html_body = f"""
+        <html>
+        <body style="font-family: Arial, sans-serif; padding: 20px; background-color: #f4f4f4;">
+            <div style="max-width: 600px; margin: 0 auto; background: white; padding: 30px; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1);">
+                <h2 style="color: #667eea; text-align: center;">💻 Laptop Price Predictor</h2>
+                <h3 style="color: #333;">Hello {username}!</h3>
+                <p style="font-size: 16px; color: #555;">Your One-Time Password (OTP) for login is:</p>
+                <div style="background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; font-size: 32px; font-weight: bold; text-align: center; padding: 20px; border-radius: 8px; letter-spacing: 5px; margin: 20px 0;">
+                    {otp_code}
+                </div>
+                <p style="font-size: 14px; color: #666;">This OTP will expire in {expiry_minutes} minutes.</p>
+                <p style="font-size: 14px; color: #666;">If you didn't request this OTP, please ignore this email.</p>
+                <hr style="border: none; border-top: 1px solid #eee; margin: 20px 0;">
+                <p style="font-size: 12px; color: #999; text-align: center;">Laptop Price Prediction App</p>
+            </div>
+        </body>
+        </html>
+        """
+
+    msg.attach(MIMEText(html_body, 'html'))
+    return msg
+
+
+class SMTPConnection:
+    """One lazily opened, reused SMTP session"""
+
+    def __init__(self, server, port, username, password, use_tls=True, smtp_factory=smtplib.SMTP):
+        self.server = server
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.smtp_factory = smtp_factory
+        self._smtp = None
+        self.connects = 0
+
+    def send(self, msg):
+        if self._smtp is None:
+            self._connect()
+        self._smtp.send_message(msg)
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def reset(self):
+        """Drop a connection that failed; the next send reconnects"""
+        if self._smtp is not None:
+            try:
+                self._smtp.close()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def _connect(self):
+        smtp = self.smtp_factory(self.server, self.port, timeout=SMTP_TIMEOUT)
+        try:
+            if self.use_tls:
+                smtp.starttls()
+            if self.password:
+                smtp.login(self.username, self.password)
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+        self.connects += 1
+
+
+class OTPDeliveryService:
+    """Queue of OTP emails drained by worker threads with pooled SMTP connections"""
+
+    def __init__(self, server, port, sender, password, expiry_minutes, mode=DEFAULT_MODE,
+                 workers=WORKERS, max_retries=MAX_RETRIES, backoff_seconds=BACKOFF_SECONDS,
+                 use_tls=True, smtp_factory=smtplib.SMTP):
+        self.sender = sender
+        self.expiry_minutes = expiry_minutes
+        self.mode = mode
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._connection_args = (server, port, sender, password, use_tls, smtp_factory)
+        self._queue = queue.Queue()
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._sync_connection = None
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self.latency_last = 0.0
+
+    def submit(self, email, otp_code, username):
+        """Deliver an OTP email; returns without waiting in async mode"""
+        job = (email, otp_code, username, time.monotonic())
+        if self.mode == 'sync':
+            with self._sync_lock:
+                if self._sync_connection is None:
+                    self._sync_connection = SMTPConnection(*self._connection_args)
+                return self._deliver(self._sync_connection, job)
+        self._ensure_started()
+        self._queue.put(job)
+        return True
+
+    def wait(self, timeout=None):
+        """Block until every queued email has been handled (used by tests/benchmarks)"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self):
+        """Deliver what is queued, then close the worker connections"""
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=30)
+        self._threads = []
+        if self._sync_connection is not None:
+            self._sync_connection.close()
+
+    def stats(self):
+        delivered = self.sent + self.failed
+        return {
+            'mode': self.mode,
+            'queue_depth': self._queue.qsize(),
+            'sent': self.sent,
+            'failed': self.failed,
+            'retries': self.retries,
+            'latency_avg_seconds': self.latency_total / delivered if delivered else 0.0,
+            'latency_max_seconds': self.latency_max,
+            'latency_last_seconds': self.latency_last,
+        }
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._start_lock:
+            if not self._threads:
+                for index in range(self.workers):
+                    thread = threading.Thread(target=self._run, name=f'otp-delivery-{index}', daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+                atexit.register(self.stop)
+
+    def _run(self):
+        connection = SMTPConnection(*self._connection_args)
+        try:
+            while True:
+                job = self._queue.get()
+                try:
+                    if job is None:
+                        return
+                    self._deliver(connection, job)
+                finally:
+                    self._queue.task_done()
+        finally:
+            connection.close()
+
+    def _deliver(self, connection, job):
+        email, otp_code, username, queued_at = job
+        msg = build_otp_email(self.sender, email, otp_code, username, self.expiry_minutes)
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                connection.send(msg)
+                self._record(queued_at, sent=1)
+                logger.info("Email OTP sent", extra={'fields': {'email': email, 'attempts': attempt + 1}})
+                return True
+            except Exception as e:
+                connection.reset()
+                if attempt == self.max_retries:
+                    self._record(queued_at, failed=1)
+                    # Fallback to the log if email fails
+                    logger.error("Email error: %s", e, extra={'fields': {'email': email, 'otp_code': otp_code}})
+                    return False
+                with self._stats_lock:
+                    self.retries += 1
+                time.sleep(self.backoff_seconds * (2 ** attempt))
+
+    def _record(self, queued_at, sent=0, failed=0):
+        latency = time.monotonic() - queued_at
+        with self._stats_lock:
+            self.sent += sent
+            self.failed += failed
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            self.latency_last = latency
@@ -0,0 +1,137 @@
+"""
+Expired-OTP sweeper - deletes OTP rows whose expiry is older than the
+retention window, in small batches so no single transaction holds the
+SQLite write lock for long.
+
+Verified codes are never read again and unverified ones stop working at
+expires_at, so every row past expires_at + retention is garbage.
+
+Runs either as a background thread inside the app (OTP_SWEEP_INTERVAL_SECONDS > 0)
+or from cron:
+    python otp_sweeper.py [--retention-minutes 60] [--batch-size 500] [--vacuum]
+"""
+import argparse
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, Integer, bindparam, text
+
+from app_logging import get_logger
+
+RETENTION_MINUTES = int(os.environ.get('OTP_RETENTION_MINUTES', 60))
+SWEEP_INTERVAL_SECONDS = int(os.environ.get('OTP_SWEEP_INTERVAL_SECONDS', 0 if os.environ.get('VERCEL') else 900))
+BATCH_SIZE = int(os.environ.get('OTP_SWEEP_BATCH_SIZE', 500))
+BATCH_PAUSE_SECONDS = 0.01  # Gap between batches so request writers can take the lock
+
+logger = get_logger('otp_sweeper')
+
+DELETE_BATCH_SQL = text(
+    "DELETE FROM otp WHERE id IN ("
+    "SELECT id FROM otp WHERE expires_at < :cutoff LIMIT :batch_size)"
+).bindparams(bindparam('cutoff', type_=DateTime()), bindparam('batch_size', type_=Integer()))
+
+
+class OTPSweeper:
+    """Deletes expired OTPs in bounded batches and keeps reclaim stats"""
+
+    def __init__(self, app, db, retention_minutes=RETENTION_MINUTES, batch_size=BATCH_SIZE,
+                 interval_seconds=SWEEP_INTERVAL_SECONDS):
+        self.app = app
+        self.db = db
+        self.retention = timedelta(minutes=retention_minutes)
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.runs = 0
+        self.rows_reclaimed = 0
+        self.last_run_at = None
+        self.last_run_rows = 0
+        self.last_run_seconds = 0.0
+        self.last_error = None
+
+    def sweep(self, max_batches=None):
+        """Delete everything past the retention window; returns rows deleted"""
+        cutoff = datetime.utcnow() - self.retention
+        start = time.perf_counter()
+        deleted = 0
+        batches = 0
+        with self.app.app_context():
+            while max_batches is None or batches < max_batches:
+                # One short transaction per batch
+                with self.db.engine.begin() as connection:
+                    result = connection.execute(DELETE_BATCH_SQL, {'cutoff': cutoff, 'batch_size': self.batch_size})
+                batches += 1
+                deleted += result.rowcount
+                if result.rowcount < self.batch_size:
+                    break
+                time.sleep(BATCH_PAUSE_SECONDS)
+
+        self.runs += 1
+        self.rows_reclaimed += deleted
+        self.last_run_at = datetime.utcnow()
+        self.last_run_rows = deleted
+        self.last_run_seconds = time.perf_counter() - start
+        return deleted
+
+    def vacuum(self):
+        """Give the freed pages back to the filesystem (takes an exclusive lock - run off-peak)"""
+        with self.app.app_context():
+            with self.db.engine.connect() as connection:
+                connection.exec_driver_sql('VACUUM')
+
+    def ensure_started(self):
+        """Start the background thread once, if an interval is configured"""
+        if self._thread is not None or self.interval_seconds <= 0:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='otp-sweeper', daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.sweep()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                logger.exception("OTP sweep failed")
+
+    def stats(self):
+        return {
+            'retention_minutes': self.retention.total_seconds() / 60,
+            'interval_seconds': self.interval_seconds,
+            'runs': self.runs,
+            'rows_reclaimed': self.rows_reclaimed,
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'last_run_rows': self.last_run_rows,
+            'last_run_seconds': self.last_run_seconds,
+            'last_error': self.last_error,
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Delete expired OTPs in batches')
+    parser.add_argument('--retention-minutes', type=int, default=RETENTION_MINUTES)
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--vacuum', action='store_true', help='VACUUM afterwards to shrink the file')
+    args = parser.parse_args()
+
+    from app import app, db, OTP
+
+    sweeper = OTPSweeper(app, db, args.retention_minutes, args.batch_size, interval_seconds=0)
+    with app.app_context():
+        before = OTP.query.count()
+    deleted = sweeper.sweep()
+    print(f"[OK] Deleted {deleted} of {before} OTP rows in {sweeper.last_run_seconds:.2f}s "
+          f"(retention {args.retention_minutes} min, batch {args.batch_size})")
+    if args.vacuum:
+        sweeper.vacuum()
+        print("[OK] VACUUM complete")
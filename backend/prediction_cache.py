@@ -0,0 +1,98 @@
+"""
+Prediction cache - LRU + TTL cache of prices keyed on the normalized feature tuple.
+
+Entries belong to one model version (the registry's artifact hash); the
+first lookup with a different version drops everything, so a retrained
+model never serves old prices.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_SIZE = int(os.environ.get('PREDICTION_CACHE_SIZE', 1024))
+DEFAULT_TTL_SECONDS = float(os.environ.get('PREDICTION_CACHE_TTL', 3600))
+
+
+def cache_key(brand, processor_speed, ram_size, storage_capacity, screen_size, weight):
+    """Normalize a configuration so equivalent requests share one entry"""
+    return (
+        str(brand),
+        float(processor_speed),
+        int(ram_size),
+        int(storage_capacity),
+        float(screen_size),
+        float(weight),
+    )
+
+
+class PredictionCache:
+    """Thread-safe bounded cache; max_size=0 disables it"""
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (price, stored_at)
+        self._version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, key, version):
+        """Return the cached price, or None on a miss"""
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            price, stored_at = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return price
+
+    def put(self, key, price, version):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = (price, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
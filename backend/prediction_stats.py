@@ -0,0 +1,215 @@
+"""
+Prediction statistics - count, sum, min and max of the predicted price kept
+per (user, brand) and per (user, day), updated in the same transaction that
+inserts the predictions (see HistoryWriter's on_insert hook).
+
+/history/stats reads a few aggregate rows instead of scanning the
+prediction table. Every prediction is counted twice, under its user and
+under GLOBAL_USER_ID, so the global view is as cheap as a per-user one.
+Predictions without a brand are counted under brand ''. Predictions
+without a finite price (None, inf, nan) are not counted at all - one
+infinite price would otherwise stick in the sums and extremes for good.
+
+Deleting predictions does not subtract them - a minimum can't be taken
+back. Deleting a user drops that user's rows (so a reused id starts from
+zero) but leaves the global rows as they were; recompute after deletes with:
+    python prediction_stats.py --rebuild
+and compare the aggregates with a full scan with:
+    python prediction_stats.py --verify
+"""
+import argparse
+import math
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, literal, select
+
+GLOBAL_USER_ID = 0
+DEFAULT_DAYS = 30
+MAX_DAYS = 366
+
+
+def summarize(rows, key):
+    """Fold prediction row dicts into {key(row, user_id): [count, sum, min, max]}"""
+    totals = {}
+    for row in rows:
+        price = row.get('predicted_price')
+        if price is None or not math.isfinite(price):
+            continue
+        for user_id in (row['user_id'], GLOBAL_USER_ID):
+            group = key(row, user_id)
+            current = totals.get(group)
+            if current is None:
+                totals[group] = [1, price, price, price]
+            else:
+                current[0] += 1
+                current[1] += price
+                current[2] = min(current[2], price)
+                current[3] = max(current[3], price)
+    return totals
+
+
+def _brand_key(row, user_id):
+    return user_id, row.get('brand') or ''
+
+
+def _day_key(row, user_id):
+    return user_id, row['created_at'].date()
+
+
+def _summary(count, total, lowest, highest):
+    return {
+        'count': count,
+        'avg_price': round(total / count, 2) if count else None,
+        'min_price': lowest,
+        'max_price': highest,
+    }
+
+
+class PredictionStats:
+    """Incrementally maintained aggregates over the prediction table"""
+
+    def __init__(self, brand_table, day_table):
+        self.brand_table = brand_table
+        self.day_table = day_table
+
+    def apply(self, connection, rows):
+        """Add freshly inserted prediction rows to the aggregates (inside the inserting transaction)"""
+        for table, key, columns in ((self.brand_table, _brand_key, ('user_id', 'brand')),
+                                    (self.day_table, _day_key, ('user_id', 'day'))):
+            totals = summarize(rows, key)
+            if not totals:
+                continue
+            # Sorted so concurrent writers lock rows in the same order
+            values = [dict(zip(columns, group), count=count, sum_price=total, min_price=lowest, max_price=highest)
+                      for group, (count, total, lowest, highest) in sorted(totals.items())]
+            connection.execute(self._upsert(connection.dialect.name, table, columns), values)
+
+    def _upsert(self, dialect, table, columns):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+            lower, upper = func.min, func.max
+        elif dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+            lower, upper = func.least, func.greatest
+        else:
+            raise ValueError(f'Prediction stats need SQLite or PostgreSQL, not {dialect}')
+        statement = insert(table)
+        return statement.on_conflict_do_update(index_elements=list(columns), set_={
+            'count': table.c.count + statement.excluded.count,
+            'sum_price': table.c.sum_price + statement.excluded.sum_price,
+            'min_price': lower(table.c.min_price, statement.excluded.min_price),
+            'max_price': upper(table.c.max_price, statement.excluded.max_price),
+        })
+
+    def watch_deletes(self, model):
+        """Drop a user's aggregate rows when the given User model is deleted"""
+        def forget(mapper, connection, target):
+            for table in (self.brand_table, self.day_table):
+                connection.execute(table.delete().where(table.c.user_id == target.id))
+
+        event.listen(model, 'after_delete', forget)
+
+    def read(self, connection, user_id, days=DEFAULT_DAYS):
+        """Totals, per-brand and per-day (last `days` days) stats for one user or GLOBAL_USER_ID"""
+        brands = self.brand_table.c
+        brand_rows = connection.execute(
+            select(brands.brand, brands.count, brands.sum_price, brands.min_price, brands.max_price)
+            .where(brands.user_id == user_id)
+        ).all()
+
+        day_columns = self.day_table.c
+        first_day = datetime.utcnow().date() - timedelta(days=days - 1)
+        day_rows = connection.execute(
+            select(day_columns.day, day_columns.count, day_columns.sum_price, day_columns.min_price, day_columns.max_price)
+            .where(day_columns.user_id == user_id, day_columns.day >= first_day)
+            .order_by(day_columns.day)
+        ).all()
+
+        count = sum(row.count for row in brand_rows)
+        result = _summary(
+            count,
+            sum(row.sum_price for row in brand_rows),
+            min((row.min_price for row in brand_rows), default=None),
+            max((row.max_price for row in brand_rows), default=None),
+        )
+        result['by_brand'] = [
+            dict(brand=row.brand or None, **_summary(row.count, row.sum_price, row.min_price, row.max_price))
+            for row in sorted(brand_rows, key=lambda row: (-row.count, row.brand))
+        ]
+        result['by_day'] = [
+            dict(day=row.day.isoformat(), **_summary(row.count, row.sum_price, row.min_price, row.max_price))
+            for row in day_rows
+        ]
+        return result
+
+    def _scans(self, connection, prediction_table):
+        """(table, group columns, per-user select, global select) recomputing each aggregate from predictions"""
+        p = prediction_table.c
+        brand = func.coalesce(p.brand, '')
+        # SQLite stores dates as 'YYYY-MM-DD' text, which is what date() returns
+        day = func.date(p.created_at) if connection.dialect.name == 'sqlite' else p.created_at.cast(self.day_table.c.day.type)
+        aggregates = (func.count(), func.sum(p.predicted_price), func.min(p.predicted_price), func.max(p.predicted_price))
+        # Finite prices only, like summarize() (also excludes NULL, and NaN on PostgreSQL)
+        finite = p.predicted_price.between(-sys.float_info.max, sys.float_info.max)
+
+        scans = []
+        for table, column, group in ((self.brand_table, 'brand', brand), (self.day_table, 'day', day)):
+            per_user = select(p.user_id, group, *aggregates).where(finite).group_by(p.user_id, group)
+            overall = select(literal(GLOBAL_USER_ID), group, *aggregates).where(finite).group_by(group)
+            scans.append((table, ('user_id', column), per_user, overall))
+        return scans
+
+    def rebuild(self, connection, prediction_table):
+        """Recompute every aggregate row from the prediction table (full scans - not for the request path)"""
+        columns_out = ('count', 'sum_price', 'min_price', 'max_price')
+        for table, columns, per_user, overall in self._scans(connection, prediction_table):
+            connection.execute(table.delete())
+            for statement in (per_user, overall):
+                connection.execute(table.insert().from_select(list(columns) + list(columns_out), statement))
+
+    def verify(self, connection, prediction_table):
+        """Compare the aggregates with a full scan; returns a list of mismatch descriptions"""
+        mismatches = []
+        for table, columns, per_user, overall in self._scans(connection, prediction_table):
+            expected = {}
+            for statement in (per_user, overall):
+                for row in connection.execute(statement):
+                    expected[(row[0], str(row[1]))] = tuple(row[2:])
+            stored = {
+                (row[0], str(row[1])): tuple(row[2:])
+                for row in connection.execute(select(*(table.c[name] for name in columns),
+                                                     table.c.count, table.c.sum_price, table.c.min_price, table.c.max_price))
+            }
+            for group in sorted(expected.keys() | stored.keys()):
+                want, have = expected.get(group), stored.get(group)
+                if want is None or have is None or want[0] != have[0] or not all(
+                        math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-6) for a, b in zip(want[1:], have[1:])):
+                    mismatches.append(f'{table.name} {dict(zip(columns, group))}: expected {want}, stored {have}')
+        return mismatches
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Recompute or check the prediction stats aggregates')
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--rebuild', action='store_true', help='recompute every aggregate from the prediction table')
+    action.add_argument('--verify', action='store_true', help='compare the aggregates with a full scan')
+    args = parser.parse_args()
+
+    from app import app, db, prediction_stats, Prediction
+
+    start = time.perf_counter()
+    with app.app_context():
+        if args.rebuild:
+            with db.engine.begin() as connection:
+                prediction_stats.rebuild(connection, Prediction.__table__)
+            print(f"[OK] Rebuilt prediction stats in {time.perf_counter() - start:.2f}s")
+        else:
+            with db.engine.connect() as connection:
+                mismatches = prediction_stats.verify(connection, Prediction.__table__)
+            for mismatch in mismatches[:50]:
+                print(f"[ERROR] {mismatch}")
+            if mismatches:
+                raise SystemExit(f"[ERROR] {len(mismatches)} aggregate rows differ - run with --rebuild")
+            print(f"[OK] Prediction stats match the prediction table ({time.perf_counter() - start:.2f}s)")
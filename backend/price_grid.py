@@ -0,0 +1,173 @@
+"""
+Precomputed price grid - the model evaluated once over every combination of
+a set of discrete feature values, stored as a memory-mapped .npy table.
+
+/predict looks an exact grid hit up by its coordinates (one dict lookup per
+feature and one array read) and only runs the model for configurations
+off the grid. The grid records the model version it was built from and is
+ignored once the model changes.
+
+Build (or rebuild after retraining) with:
+    python price_grid.py [--axes axes.json]
+where axes.json maps feature names to value lists (see DEFAULT_AXES).
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+from app_logging import get_logger
+
+GRID_FILE = 'price_grid.npy'
+MANIFEST_FILE = 'price_grid.json'
+FEATURES = ('brand', 'processor_speed', 'ram_size', 'storage_capacity', 'screen_size', 'weight')
+BUILD_CHUNK_ROWS = 100000
+
+logger = get_logger('price_grid')
+
+
+def _steps(start, stop, step):
+    count = int(round((stop - start) / step)) + 1
+    return [round(start + i * step, 2) for i in range(count)]
+
+
+# brand=None means "every brand the model knows"
+DEFAULT_AXES = {
+    'brand': None,
+    'processor_speed': _steps(1.5, 4.0, 0.1),
+    'ram_size': [4, 8, 12, 16, 32, 64],
+    'storage_capacity': [128, 256, 512, 1000, 1024, 2000, 2048],
+    'screen_size': [11.6, 13.3, 14.0, 15.6, 16.0, 17.3],
+    'weight': _steps(1.0, 3.5, 0.1),
+}
+
+
+def build_grid(engine, version, directory, axes=None):
+    """Evaluate engine over the full grid and write the table + manifest; returns the shape"""
+    import numpy as np
+
+    axes = dict(DEFAULT_AXES, **(axes or {}))
+    axes['brand'] = list(axes['brand'] or engine.classes_)
+    values = [axes[name] for name in FEATURES]
+    shape = tuple(len(axis) for axis in values)
+
+    coordinates = [engine.encode(axes['brand'])] + [np.asarray(axis, dtype=np.float64) for axis in values[1:]]
+    mesh = np.meshgrid(*coordinates, indexing='ij')
+    features = np.stack([m.reshape(-1) for m in mesh], axis=1)
+
+    prices = np.empty(features.shape[0], dtype=np.float64)
+    for start in range(0, features.shape[0], BUILD_CHUNK_ROWS):
+        prices[start:start + BUILD_CHUNK_ROWS] = engine.predict(features[start:start + BUILD_CHUNK_ROWS])
+
+    # Write both files under temporary names so a running app never sees half a grid
+    grid_path = os.path.join(directory, GRID_FILE)
+    manifest_path = os.path.join(directory, MANIFEST_FILE)
+    with open(grid_path + '.tmp', 'wb') as f:
+        np.save(f, prices.reshape(shape))
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump({'model_version': version, 'features': list(FEATURES), 'axes': axes,
+                   'shape': list(shape), 'built_at': time.time()}, f)
+    os.replace(grid_path + '.tmp', grid_path)
+    os.replace(manifest_path + '.tmp', manifest_path)
+    return shape
+
+
+class PriceGrid:
+    """Read-only view of the grid for one model version"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._checked_version = None
+        self._flat = None
+        self._indexes = None
+        self._strides = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, version):
+        self._flat = None
+        manifest_path = os.path.join(self.directory, MANIFEST_FILE)
+        if not os.path.exists(manifest_path):
+            return
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get('model_version') != version:
+            logger.warning("Price grid was built for another model version; run price_grid.py to rebuild it")
+            return
+
+        import numpy as np
+        table = np.load(os.path.join(self.directory, GRID_FILE), mmap_mode='r')
+        axes = [manifest['axes'][name] for name in FEATURES]
+        self._indexes = [{value: i for i, value in enumerate(axis)} for axis in axes]
+        strides, stride = [], 1
+        for axis in reversed(axes):
+            strides.append(stride)
+            stride *= len(axis)
+        self._strides = strides[::-1]
+        self._flat = table.reshape(-1)
+        self.size = int(self._flat.shape[0])
+        logger.info("Price grid loaded", extra={'fields': {'configurations': self.size}})
+
+    def lookup(self, key, version):
+        """Price for a normalized cache_key() tuple, or None if it is off the grid"""
+        if version != self._checked_version:
+            with self._lock:
+                if version != self._checked_version:
+                    try:
+                        self._load(version)
+                    except Exception:
+                        logger.exception("Could not load price grid")
+                        self._flat = None
+                    self._checked_version = version
+        flat = self._flat
+        if flat is None:
+            return None
+
+        offset = 0
+        for index, value, stride in zip(self._indexes, key, self._strides):
+            position = index.get(value)
+            if position is None:
+                self.misses += 1
+                return None
+            offset += position * stride
+        self.hits += 1
+        return float(flat[offset])
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'loaded': self._flat is not None,
+            'configurations': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+if __name__ == '__main__':
+    from model_registry import ModelRegistry
+
+    parser = argparse.ArgumentParser(description='Precompute prices over a grid of configurations')
+    parser.add_argument('--axes', help='JSON file mapping feature names to value lists')
+    args = parser.parse_args()
+
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    axes = None
+    if args.axes:
+        with open(args.axes) as f:
+            axes = json.load(f)
+
+    registry = ModelRegistry(base_dir, reload_interval=0)
+    engine = registry.get()
+    if engine is None:
+        raise SystemExit(f"[ERROR] Could not load model: {registry.load_error}")
+    start = time.perf_counter()
+    shape = build_grid(engine, registry.version, base_dir, axes)
+    size = 1
+    for length in shape:
+        size *= length
+    print(f"[OK] Priced {size} configurations {shape} in {time.perf_counter() - start:.2f}s "
+          f"-> {os.path.join(base_dir, GRID_FILE)}")
@@ -0,0 +1,126 @@
+"""
+Price sweeps - vary one or two features of a base configuration and price
+the whole curve / surface with a single model call.
+
+Request body for /predict/sweep:
+    {
+        "base": {"brand": "HP", "processor_speed": 3.5, "ram_size": 8,
+                 "storage_capacity": 512, "screen_size": 15.6, "weight": 2.0},
+        "axes": [
+            {"feature": "ram_size", "values": [4, 8, 16, 32]},
+            {"feature": "storage_capacity", "start": 256, "stop": 2048, "step": 256}
+        ]
+    }
+An axis gives either explicit "values" or "start"/"stop" (inclusive) with
+"step" or "num" points. Brand can only be swept with explicit values.
+"""
+import math
+import os
+
+from batch_predict import FEATURE_FIELDS, normalize_row
+
+MAX_SWEEP_AXES = 2
+MAX_AXIS_POINTS = int(os.environ.get('SWEEP_MAX_AXIS_POINTS', 500))
+MAX_SWEEP_POINTS = int(os.environ.get('SWEEP_MAX_POINTS', 10000))
+
+_COERCE = {
+    'brand': lambda value: str(value).strip(),
+    'processor_speed': float,
+    'ram_size': lambda value: int(float(value)),
+    'storage_capacity': lambda value: int(float(value)),
+    'screen_size': float,
+    'weight': float,
+}
+
+
+def _finite(value, feature):
+    """float(value), rejecting inf/nan (they would overflow the int features)"""
+    try:
+        number = float(value)
+    except (TypeError, ValueError, OverflowError):
+        number = float('nan')
+    if not math.isfinite(number):
+        raise ValueError(f"Axis '{feature}' values must be finite numbers")
+    return number
+
+
+def _axis_values(spec):
+    """Expand one axis spec into its list of coerced values"""
+    if not isinstance(spec, dict) or spec.get('feature') not in FEATURE_FIELDS:
+        raise ValueError(f"Each axis needs a 'feature', one of: {', '.join(FEATURE_FIELDS)}")
+    feature = spec['feature']
+    coerce = _COERCE[feature]
+
+    try:
+        if 'values' in spec:
+            raw = spec['values']
+            if not isinstance(raw, list) or not raw:
+                raise ValueError(f"Axis '{feature}' values must be a non-empty list")
+            if len(raw) > MAX_AXIS_POINTS:
+                raise ValueError(f"Axis '{feature}' has {len(raw)} points (max {MAX_AXIS_POINTS})")
+            if feature == 'brand':
+                return feature, [coerce(value) for value in raw]
+            return feature, [coerce(_finite(value, feature)) for value in raw]
+
+        if feature == 'brand':
+            raise ValueError("Brand can only be swept with explicit 'values'")
+        start, stop = _finite(spec['start'], feature), _finite(spec['stop'], feature)
+        if 'num' in spec:
+            count = int(_finite(spec['num'], feature))
+            step = (stop - start) / (count - 1) if count > 1 else 0.0
+        else:
+            step = _finite(spec['step'], feature)
+            if step <= 0 or stop < start:
+                raise ValueError(f"Axis '{feature}' needs start <= stop and a positive step")
+            count = int((stop - start) / step + 1e-9) + 1
+    except (KeyError, TypeError):
+        raise ValueError(f"Axis '{feature}' needs 'values', or 'start'/'stop' with 'step' or 'num'")
+    except OverflowError:
+        # e.g. a range so wide that the point count itself overflows
+        raise ValueError(f"Axis '{feature}' range is too large")
+
+    # Check the size before building anything (the count can have hundreds of digits)
+    if count > MAX_AXIS_POINTS:
+        raise ValueError(f"Axis '{feature}' has more than {MAX_AXIS_POINTS} points")
+    if count < 1:
+        raise ValueError(f"Axis '{feature}' needs at least one point")
+    return feature, [coerce(round(start + i * step, 6)) for i in range(count)]
+
+
+def parse_sweep(data):
+    """Validate a sweep request; returns (base tuple, [(feature, values), ...])"""
+    if not isinstance(data, dict):
+        raise ValueError('Expected a JSON object with "base" and "axes"')
+    base = normalize_row(data.get('base'))
+    specs = data.get('axes')
+    if not isinstance(specs, list) or not 1 <= len(specs) <= MAX_SWEEP_AXES:
+        raise ValueError(f'"axes" must list 1 to {MAX_SWEEP_AXES} axes')
+
+    axes = [_axis_values(spec) for spec in specs]
+    if len({feature for feature, _ in axes}) != len(axes):
+        raise ValueError('Each feature can only be swept once')
+
+    points = 1
+    for _, values in axes:
+        points *= len(values)
+    if points > MAX_SWEEP_POINTS:
+        raise ValueError(f'Sweep has {points} points (max {MAX_SWEEP_POINTS})')
+    return base, axes
+
+
+def sweep_prices(base, axes, engine):
+    """Price every combination of the axis values in one call; returns an array shaped like the axes"""
+    import numpy as np
+
+    shape = tuple(len(values) for _, values in axes)
+    features = np.empty((int(np.prod(shape)), len(FEATURE_FIELDS)), dtype=np.float64)
+    features[:] = [engine.encode([base[0]])[0], *base[1:]]
+
+    # Lay each axis out along its own dimension, then flatten in C order
+    grids = np.meshgrid(*[np.arange(length) for length in shape], indexing='ij')
+    for (feature, values), positions in zip(axes, grids):
+        column = FEATURE_FIELDS.index(feature)
+        coded = engine.encode(values) if feature == 'brand' else np.asarray(values, dtype=np.float64)
+        features[:, column] = coded[positions.reshape(-1)]
+
+    return engine.predict(features).reshape(shape)
@@ -0,0 +1,219 @@
+"""
+Server-side sessions - the cookie carries only a random session id and the
+session data lives in a store, so requests don't decode and re-sign a
+cookie payload, and unchanged sessions send no Set-Cookie at all.
+
+Backends (SESSION_BACKEND):
+    sqlite   shared SQLite file (SESSION_SQLITE_PATH) - every gunicorn worker
+             sees the same sessions (default)
+    memory   in-process LRU - fastest, but only for a single worker: with
+             several, a login is unknown to the other workers
+    cookie   Flask's signed cookie sessions (default on Vercel, where
+             neither process memory nor local files outlive a request)
+
+The session id is replaced whenever the session's user_id changes (login,
+signup), so an id planted before authentication is worthless after it.
+
+Together with the profile cache (user_cache.py) this lets /api/check-auth
+answer without a database query.
+"""
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+from app_logging import get_logger
+
+DEFAULT_BACKEND = os.environ.get('SESSION_BACKEND', 'cookie' if os.environ.get('VERCEL') else 'sqlite')
+MEMORY_MAX_SESSIONS = int(os.environ.get('SESSION_MEMORY_MAX', 10000))
+SQLITE_PURGE_EVERY = 1000  # Writes between deletes of expired rows
+
+logger = get_logger('session_store')
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict that remembers its id and whether it was changed"""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+            self.accessed = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.user_id_at_open = self.get('user_id')
+        self.modified = False
+        self.accessed = False
+
+
+class MemorySessionBackend:
+    """Bounded LRU of session dicts with an idle timeout"""
+
+    def __init__(self, max_size=MEMORY_MAX_SESSIONS):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # sid -> (data, expires_at)
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, sid):
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None:
+                return None
+            data, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[sid]
+                return None
+            self._entries.move_to_end(sid)
+            return dict(data)
+
+    def set(self, sid, data, ttl_seconds):
+        with self._lock:
+            self._entries[sid] = (dict(data), time.time() + ttl_seconds)
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'sessions': len(self._entries), 'evictions': self.evictions}
+
+
+class SQLiteSessionBackend:
+    """Sessions as JSON rows in a SQLite file shared by every worker process"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_sessions_expires_at ON sessions (expires_at)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Autocommit; WAL lets readers in other workers proceed during a write
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, sid):
+        row = self._connection().execute(
+            "SELECT data FROM sessions WHERE sid = ? AND expires_at > ?", (sid, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, sid, data, ttl_seconds):
+        conn = self._connection()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (sid, data, expires_at) VALUES (?, ?, ?)",
+            (sid, json.dumps(data), now + ttl_seconds)
+        )
+        self._writes += 1
+        if self._writes % SQLITE_PURGE_EVERY == 0:
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+
+    def delete(self, sid):
+        self._connection().execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+
+    def stats(self):
+        count = self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        return {'backend': 'sqlite', 'sessions': count}
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface on top of a memory or SQLite backend"""
+
+    session_class = ServerSideSession
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def _ttl_seconds(self, app):
+        return int(app.permanent_session_lifetime.total_seconds())
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.backend.get(sid)
+            if data is not None:
+                return self.session_class(data, sid=sid)
+        return self.session_class(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.modified:
+                # Logged out (session.clear()) - drop the stored data and the cookie
+                self.backend.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not session.new and session.get('user_id') != session.user_id_at_open:
+            # Authenticated (or switched user) on an existing id: issue a new one
+            # and forget the old, so a fixated session id never gets logged in
+            self.backend.delete(session.sid)
+            session.sid = secrets.token_urlsafe(32)
+            session.modified = True
+
+        if session.accessed:
+            response.vary.add('Cookie')
+        if not self.should_set_cookie(app, session):
+            return
+
+        self.backend.set(session.sid, dict(session), self._ttl_seconds(app))
+        response.set_cookie(
+            name, session.sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+    def stats(self):
+        return self.backend.stats()
+
+
+def init_session_store(app, backend=DEFAULT_BACKEND, sqlite_path=None):
+    """Install the configured session interface on app; returns it (None for cookie sessions)"""
+    if backend == 'cookie':
+        return None
+    if backend == 'memory':
+        if int(os.environ.get('WEB_CONCURRENCY', 1)) > 1:
+            logger.warning("SESSION_BACKEND=memory keeps sessions per process but WEB_CONCURRENCY=%s: "
+                           "logins will be lost between workers, use SESSION_BACKEND=sqlite",
+                           os.environ['WEB_CONCURRENCY'])
+        store = MemorySessionBackend()
+    elif backend == 'sqlite':
+        sqlite_path = sqlite_path or os.environ.get(
+            'SESSION_SQLITE_PATH', os.path.join(app.instance_path, 'sessions.db'))
+        store = SQLiteSessionBackend(sqlite_path)
+    else:
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
+    app.session_interface = ServerSideSessionInterface(store)
+    return app.session_interface
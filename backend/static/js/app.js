@@ -329,13 +329,20 @@ const App = () => {
 
     const fetchHistory = async () => {
         try {
-            const res = await fetch('/history', {
-                credentials: 'include'
-            });
-            const data = await res.json();
-            if (res.ok) {
-                setHistory(data);
+            // /history is paged - follow the X-Next-Before-Id cursor so the
+            // analytics see the whole history, not just the newest page
+            let rows = [];
+            let url = '/history?limit=1000';
+            while (url) {
+                const res = await fetch(url, {
+                    credentials: 'include'
+                });
+                if (!res.ok) return;
+                rows = rows.concat(await res.json());
+                const nextBeforeId = res.headers.get('X-Next-Before-Id');
+                url = nextBeforeId ? `/history?limit=1000&before_id=${nextBeforeId}` : null;
             }
+            setHistory(rows);
         } catch (err) {
             console.error('Failed to fetch history', err);
         }
@@ -0,0 +1,62 @@
+"""
+Tests for the structured logging setup
+"""
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+from app_logging import JsonFormatter, SamplingFilter, _QueueHandler
+
+
+def make_record(level=logging.INFO, msg='hello %s', args=('world',), **extra):
+    record = logging.LogRecord('laptop_price.test', level, __file__, 1, msg, args, None)
+    for key, value in extra.items():
+        setattr(record, key, value)
+    return record
+
+
+def test_json_formatter_includes_fields():
+    line = JsonFormatter().format(make_record(fields={'user_id': 7, 'brand': 'HP'}))
+    entry = json.loads(line)
+    assert entry['level'] == 'INFO'
+    assert entry['logger'] == 'laptop_price.test'
+    assert entry['msg'] == 'hello world'
+    assert entry['user_id'] == 7 and entry['brand'] == 'HP'
+
+
+def test_sampling_only_drops_debug():
+    drop_all = SamplingFilter(0.0)
+    assert not drop_all.filter(make_record(logging.DEBUG))
+    assert drop_all.filter(make_record(logging.INFO))
+    assert drop_all.filter(make_record(logging.DEBUG, sample_rate=1.0))
+    assert SamplingFilter(1.0).filter(make_record(logging.DEBUG))
+
+
+def test_queue_handler_defers_formatting_to_listener():
+    log_queue = queue.SimpleQueue()
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, output)
+
+    logger = logging.getLogger('laptop_price.test_queue')
+    logger.propagate = False
+    logger.addHandler(_QueueHandler(log_queue))
+    try:
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            logger.exception("failed for %s", 'HP', extra={'fields': {'route': 'predict'}})
+        # Nothing is written until the listener drains the queue
+        assert stream.getvalue() == ''
+        listener.start()
+    finally:
+        listener.stop()
+        logger.handlers.clear()
+
+    entry = json.loads(stream.getvalue())
+    assert entry['msg'] == 'failed for HP'
+    assert entry['route'] == 'predict'
+    assert 'ValueError: boom' in entry['exc']
@@ -0,0 +1,78 @@
+"""
+Test backup_database.py - backups are consistent, checked snapshots and restore swaps them in
+"""
+import gzip
+import sqlite3
+
+import pytest
+
+from backup_database import MAX_RESTARTS, BackupError, _copy_pages, backup, restore
+
+
+def make_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute('CREATE TABLE prediction (id INTEGER PRIMARY KEY, brand TEXT, predicted_price FLOAT)')
+    conn.executemany('INSERT INTO prediction (brand, predicted_price) VALUES (?, ?)',
+                     [('HP', 1000.0 + i) for i in range(rows)])
+    conn.commit()
+    return conn
+
+
+def count(conn):
+    return conn.execute('SELECT COUNT(*) FROM prediction').fetchone()[0]
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_backup_and_restore_into_live_database(tmp_path, compress):
+    db_path = str(tmp_path / 'live.db')
+    live = make_db(db_path, 5000)
+    output = str(tmp_path / ('backup.db.gz' if compress else 'backup.db'))
+
+    summary = backup(db_path, output, compress=compress, pages=8, sleep=0)
+    assert summary['path'] == output
+    if compress:
+        with gzip.open(output) as f:
+            assert f.read(16) == b'SQLite format 3\x00'
+
+    live.execute('DELETE FROM prediction WHERE id > 10')
+    live.commit()
+    restore(output, db_path)
+    # A connection opened before the restore sees the restored rows
+    assert count(live) == 5000
+    live.close()
+
+
+def test_backup_survives_concurrent_writes(tmp_path):
+    db_path = str(tmp_path / 'live.db')
+    writer = make_db(db_path, 5000)
+
+    class WriteBetweenSteps(sqlite3.Connection):
+        """Another connection writes after every step, so every step restarts the copy"""
+        def backup(self, target, pages=-1, progress=None, sleep=0.25):
+            def write_then_report(status, remaining, total):
+                writer.execute("INSERT INTO prediction (brand, predicted_price) VALUES ('Dell', 1.0)")
+                writer.commit()
+                progress(status, remaining, total)
+            return super().backup(target, pages=pages, progress=write_then_report if progress else None, sleep=sleep)
+
+    source = sqlite3.connect(db_path, factory=WriteBetweenSteps)
+    target = sqlite3.connect(str(tmp_path / 'copy.db'))
+    # The stepped copy gives up on restarting and finishes in one step
+    assert _copy_pages(source, target, pages=8, sleep=0) > MAX_RESTARTS
+    assert count(target) == count(writer) > 5000
+    for conn in (source, target, writer):
+        conn.close()
+
+
+def test_restore_refuses_a_corrupt_backup(tmp_path):
+    db_path = str(tmp_path / 'live.db')
+    make_db(db_path, 10).close()
+    bad = tmp_path / 'bad.db'
+    bad.write_bytes(b'not a database' * 100)
+
+    with pytest.raises(BackupError):
+        restore(str(bad), db_path)
+    conn = sqlite3.connect(db_path)
+    assert count(conn) == 10
+    conn.close()
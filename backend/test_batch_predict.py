@@ -0,0 +1,89 @@
+"""
+Test /predict/batch - batch results must match single /predict calls
+"""
+import json
+
+import pytest
+
+from app import app, history_writer, Prediction
+
+LAPTOPS = [
+    {'brand': 'HP', 'processor_speed': 3.5, 'ram_size': 8, 'storage_capacity': 512, 'screen_size': 15.6, 'weight': 2.0},
+    {'brand': 'Dell', 'processor_speed': 2.4, 'ram_size': 16, 'storage_capacity': 1000, 'screen_size': 14.0, 'weight': 1.6},
+    {'brand': 'Apple', 'processor_speed': 3.0, 'ram_size': 8, 'storage_capacity': 256, 'screen_size': 13.3, 'weight': 1.3},
+    {'brand': 'Acer', 'processor_speed': 'fast', 'ram_size': 8, 'storage_capacity': 256, 'screen_size': 15.6, 'weight': 2.1},
+]
+
+
+def test_batch_matches_single_predictions(logged_in_client):
+    response = logged_in_client.post('/predict/batch', json=LAPTOPS)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['total'] == 4 and body['succeeded'] == 2 and body['failed'] == 2
+
+    results = body['results']
+    for laptop, result in zip(LAPTOPS[:2], results[:2]):
+        single = logged_in_client.post('/predict', json=laptop).get_json()
+        assert result['price'] == pytest.approx(single['price'])
+
+    assert 'Unknown brand: Apple' in results[2]['error']
+    assert 'error' in results[3]
+
+
+def test_batch_accepts_csv_and_ndjson(logged_in_client):
+    header = ','.join(LAPTOPS[0])
+    csv_body = header + '\n' + '\n'.join(','.join(str(v) for v in laptop.values()) for laptop in LAPTOPS[:2])
+    csv_response = logged_in_client.post('/predict/batch?save=false', data=csv_body, content_type='text/csv')
+    ndjson_body = '\n'.join(json.dumps(laptop) for laptop in LAPTOPS[:2])
+    ndjson_response = logged_in_client.post('/predict/batch?save=false', data=ndjson_body,
+                                            content_type='application/x-ndjson')
+
+    csv_prices = [r['price'] for r in csv_response.get_json()['results']]
+    ndjson_prices = [r['price'] for r in ndjson_response.get_json()['results']]
+    assert csv_prices == pytest.approx(ndjson_prices)
+
+
+def test_batch_saves_history(logged_in_client):
+    history_writer.flush()
+    with app.app_context():
+        before = Prediction.query.count()
+    logged_in_client.post('/predict/batch', json=LAPTOPS)
+    history_writer.flush()
+    with app.app_context():
+        assert Prediction.query.count() == before + 2
+
+
+def test_batch_rejects_bad_body(logged_in_client):
+    response = logged_in_client.post('/predict/batch', data='not json', content_type='application/json')
+    assert response.status_code == 400
+
+
+def test_batch_rejects_non_finite_numbers_per_row(logged_in_client):
+    body = '[' + ', '.join([
+        json.dumps(LAPTOPS[0]),
+        json.dumps(LAPTOPS[0]).replace('"ram_size": 8', '"ram_size": Infinity'),
+        json.dumps(dict(LAPTOPS[0], weight='nan')),
+        json.dumps(dict(LAPTOPS[0], storage_capacity=10 ** 400)),
+    ]) + ']'
+    response = logged_in_client.post('/predict/batch?save=false', data=body, content_type='application/json')
+    assert response.status_code == 200
+    results = response.get_json()['results']
+    assert 'price' in results[0]
+    assert all(result['error'] == 'Numeric fields must be finite numbers' for result in results[1:])
+
+
+@pytest.mark.parametrize('field, value', [
+    ('weight', 'Infinity'),
+    ('processor_speed', 'nan'),
+    ('ram_size', 'inf'),
+])
+def test_single_predict_rejects_non_finite_input(logged_in_client, user, field, value):
+    history_writer.flush()
+    with app.app_context():
+        before = Prediction.query.filter_by(user_id=user).count()
+    response = logged_in_client.post('/predict', json=dict(LAPTOPS[0], **{field: value}))
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Numeric fields must be finite numbers'}
+    history_writer.flush()
+    with app.app_context():
+        assert Prediction.query.filter_by(user_id=user).count() == before
@@ -0,0 +1,27 @@
+"""
+Test the database configuration - SQLite PRAGMAs and pool options per backend
+"""
+from app import app, db
+from db_config import database_url, engine_options
+
+
+def test_app_connections_use_wal_and_busy_timeout():
+    with app.app_context():
+        with db.engine.connect() as conn:
+            assert conn.exec_driver_sql('PRAGMA journal_mode').scalar().lower() == 'wal'
+            assert conn.exec_driver_sql('PRAGMA synchronous').scalar() == 1  # NORMAL
+            assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() > 0
+
+
+def test_postgres_url_and_pool_options(monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'postgres://user:pw@db.example.com/laptops')
+    url = database_url('/tmp')
+    assert url == 'postgresql://user:pw@db.example.com/laptops'
+    options = engine_options(url)
+    assert options['pool_pre_ping'] is True
+    assert 'connect_args' not in options
+
+
+def test_in_memory_sqlite_skips_pool_sizing():
+    assert 'pool_size' not in engine_options('sqlite://')
+    assert 'pool_size' in engine_options('sqlite:////tmp/laptops.db')
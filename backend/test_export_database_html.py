@@ -0,0 +1,77 @@
+"""
+Test export_database_html.py - predictions are paged, linked and filtered, and markup is escaped
+"""
+import os
+import sqlite3
+from datetime import datetime
+
+from export_database_html import export_to_html, page_path
+
+ROWS = 10
+
+
+def make_db(path):
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE user (id INTEGER PRIMARY KEY, username TEXT, email TEXT, created_at DATETIME)')
+    conn.execute('''CREATE TABLE prediction (id INTEGER PRIMARY KEY, user_id INTEGER, brand TEXT,
+                    processor_speed FLOAT, ram_size INTEGER, storage_capacity INTEGER, screen_size FLOAT,
+                    weight FLOAT, predicted_price FLOAT, created_at DATETIME)''')
+    conn.execute("INSERT INTO user VALUES (1, '<script>x</script>', 'a@example.com', '2024-01-01 00:00:00')")
+    conn.executemany('INSERT INTO prediction VALUES (?, 1, ?, 2.5, 8, 512, 15.6, 2.0, ?, ?)', [
+        (i, 'HP' if i % 2 else 'Dell', 1000.0 * i, f'2024-01-{i:02d} 12:00:00') for i in range(1, ROWS + 1)])
+    conn.commit()
+    conn.close()
+
+
+def read(path):
+    with open(path, encoding='utf-8') as f:
+        return f.read()
+
+
+def test_pages_and_index(tmp_path):
+    db_path = str(tmp_path / 'test.db')
+    make_db(db_path)
+    index = str(tmp_path / 'out' / 'view.html')
+
+    summary = export_to_html(db_path, index, rows_per_page=4, chunk_size=3)
+    assert (summary['predictions'], summary['pages']) == (ROWS, 3)
+    assert '<script>x</script>' not in read(index) and '&lt;script&gt;' in read(index)
+
+    first, last = read(page_path(index, 1)), read(page_path(index, 3))
+    assert first.count('<tr>') == 1 + 4 and last.count('<tr>') == 1 + 2
+    assert 'view_predictions_0002.html">Older' in first and 'Older' not in last
+    assert '<td>10</td>' in first  # newest first
+
+    # A shorter export removes the pages it no longer needs
+    summary = export_to_html(db_path, index, rows_per_page=4, limit=3)
+    assert summary['pages'] == 1
+    assert not os.path.exists(page_path(index, 2))
+
+
+def test_date_range(tmp_path):
+    db_path = str(tmp_path / 'test.db')
+    make_db(db_path)
+    index = str(tmp_path / 'view.html')
+
+    summary = export_to_html(db_path, index, since=datetime(2024, 1, 3), until=datetime(2024, 1, 6))
+    assert summary['predictions'] == 3
+    page = read(page_path(index, 1))
+    assert '<td>5</td>' in page and '<td>3</td>' in page and '<td>6</td>' not in page
+    # Brand stats cover the same range: 3 and 5 are HP, 4 is Dell
+    assert 'Total Predictions</div>\n                <div class="stat-value">3<' in read(index)
+
+
+def test_totals_come_from_the_table_not_stale_aggregates(tmp_path):
+    db_path = str(tmp_path / 'test.db')
+    make_db(db_path)
+    conn = sqlite3.connect(db_path)
+    # /history/stats aggregates still counting rows that were deleted since
+    conn.execute('CREATE TABLE prediction_brand_stat (user_id INTEGER, brand TEXT, count INTEGER, '
+                 'sum_price FLOAT, min_price FLOAT, max_price FLOAT)')
+    conn.execute("INSERT INTO prediction_brand_stat VALUES (0, 'HP', 60, 60000.0, 1.0, 9000.0)")
+    conn.commit()
+    conn.close()
+    index = str(tmp_path / 'view.html')
+
+    export_to_html(db_path, index)
+    assert f'Total Predictions</div>\n                <div class="stat-value">{ROWS}<' in read(index)
@@ -0,0 +1,61 @@
+"""
+Test /history/export - every format streams the same rows, in id order, across chunks
+"""
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import app, db, Prediction
+from history_export import EXPORT_CHUNK_ROWS, read_columnar
+
+ROWS = EXPORT_CHUNK_ROWS * 2 + 17  # spans several chunks
+
+
+@pytest.fixture
+def client(user, logged_in_client):
+    with app.app_context():
+        start = datetime(2024, 1, 1)
+        db.session.execute(Prediction.__table__.insert(), [
+            {'user_id': user, 'brand': ('HP', 'Dell', 'Acer')[i % 3], 'processor_speed': 2.5,
+             'ram_size': 8 + i % 4, 'storage_capacity': 512, 'screen_size': 15.6, 'weight': 2.0,
+             'predicted_price': 1000.0 + i, 'created_at': start + timedelta(minutes=i)}
+            for i in range(ROWS)
+        ])
+        db.session.commit()
+    return logged_in_client
+
+
+def test_csv_export(client):
+    response = client.get('/history/export?format=csv')
+    assert response.status_code == 200
+    assert response.headers['Content-Disposition'].endswith('.csv')
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert len(rows) == ROWS
+    assert [float(row['predicted_price']) for row in rows[:3]] == [1000.0, 1001.0, 1002.0]
+    assert rows[-1]['created_at'] == (datetime(2024, 1, 1) + timedelta(minutes=ROWS - 1)).isoformat()
+
+
+def test_ndjson_export_with_since(client):
+    response = client.get('/history/export?format=ndjson&since=2024-01-02')
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(rows) == ROWS - 24 * 60
+    assert rows[0]['created_at'] == '2024-01-02T00:00:00'
+    assert [row['id'] for row in rows] == sorted(row['id'] for row in rows)
+
+
+def test_columnar_export_round_trips(client):
+    response = client.get('/history/export?format=columnar')
+    chunks = list(read_columnar(io.BytesIO(response.get_data())))
+    assert [len(chunk['id']) for chunk in chunks] == [EXPORT_CHUNK_ROWS, EXPORT_CHUNK_ROWS, 17]
+    brands = [brand for chunk in chunks for brand in chunk['brand']]
+    assert brands[:4] == ['HP', 'Dell', 'Acer', 'HP']
+    assert chunks[0]['ram_size'][:4] == [8, 9, 10, 11]
+    assert chunks[-1]['created_at'][-1] == datetime(2024, 1, 1) + timedelta(minutes=ROWS - 1)
+
+
+def test_rejects_unknown_format_and_anonymous_users(client):
+    assert client.get('/history/export?format=xlsx').status_code == 400
+    assert app.test_client().get('/history/export').status_code == 401
@@ -0,0 +1,57 @@
+"""
+Test /history keyset pagination and the since filter
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import app, db, Prediction
+
+
+@pytest.fixture
+def client(user, logged_in_client):
+    with app.app_context():
+        old = datetime(2024, 1, 1)
+        db.session.add_all([
+            Prediction(user_id=user, brand='HP', processor_speed=3.5, ram_size=8, storage_capacity=512,
+                       screen_size=15.6, weight=2.0, predicted_price=float(i),
+                       created_at=old + timedelta(days=i))
+            for i in range(25)
+        ])
+        db.session.commit()
+    return logged_in_client
+
+
+def test_pages_cover_history_without_overlap(client):
+    seen = []
+    url = '/history?limit=10'
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        page = response.get_json()
+        assert len(page) <= 10
+        seen.extend(row['id'] for row in page)
+        next_id = response.headers.get('X-Next-Before-Id')
+        url = f'/history?limit=10&before_id={next_id}' if next_id else None
+
+    assert len(seen) == 25
+    assert seen == sorted(seen, reverse=True)
+
+
+def test_rows_keep_to_dict_shape(client):
+    row = client.get('/history?limit=1').get_json()[0]
+    assert set(row) == {'id', 'brand', 'processor_speed', 'ram_size', 'storage_capacity',
+                        'screen_size', 'weight', 'predicted_price', 'created_at'}
+    assert row['predicted_price'] == 24.0
+
+
+def test_since_filter(client):
+    rows = client.get('/history?since=2024-01-21').get_json()
+    assert [row['predicted_price'] for row in rows] == [24.0, 23.0, 22.0, 21.0, 20.0]
+
+
+def test_invalid_parameters(client):
+    assert client.get('/history?since=yesterday').status_code == 400
+    assert client.get('/history?limit=abc').status_code == 400
+    assert client.get('/history?before_id=abc').status_code == 400
+    assert client.get('/history?before_id=').status_code == 400
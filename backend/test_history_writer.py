@@ -0,0 +1,146 @@
+"""
+Test the write-behind history queue - bulk flushes, durable mode, backpressure, flush and retries
+"""
+import threading
+import time
+
+from sqlalchemy.exc import OperationalError
+
+from app import app, db, Prediction
+import history_writer
+from history_writer import HistoryWriter
+
+
+def make_row(user_id, price):
+    return {
+        'user_id': user_id, 'brand': 'HP', 'processor_speed': 3.5, 'ram_size': 8,
+        'storage_capacity': 512, 'screen_size': 15.6, 'weight': 2.0, 'predicted_price': price
+    }
+
+
+def count_rows(user_id):
+    with app.app_context():
+        return Prediction.query.filter_by(user_id=user_id).count()
+
+
+def test_async_rows_flush_in_batches(user):
+    before = count_rows(user)
+    writer = HistoryWriter(app, db, Prediction.__table__, mode='async', batch_size=10, flush_interval_ms=50)
+
+    assert writer.write([make_row(user, float(i)) for i in range(25)]) == 25
+    deadline = time.monotonic() + 5
+    while writer.stats()['flushed'] < 25 and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    stats = writer.stats()
+    assert stats['flushed'] == 25 and stats['dropped'] == 0 and stats['pending'] == 0
+    assert stats['flushes'] >= 3
+    assert count_rows(user) == before + 25
+    writer.stop()
+
+
+def test_durable_mode_writes_before_returning(user):
+    before = count_rows(user)
+    writer = HistoryWriter(app, db, Prediction.__table__, mode='durable')
+    with app.app_context():
+        writer.write([make_row(user, 1.0), make_row(user, 2.0)])
+    assert count_rows(user) == before + 2
+    assert writer.stats()['flushed'] == 2
+
+
+def test_full_queue_inserts_inline_and_stop_flushes(user):
+    before = count_rows(user)
+    writer = HistoryWriter(app, db, Prediction.__table__, mode='async', flush_interval_ms=60000, max_queue=3,
+                           enqueue_timeout_ms=10)
+    writer._ensure_started = lambda: None  # no background thread: rows stay queued until stop()
+
+    with app.app_context():
+        assert writer.write([make_row(user, float(i)) for i in range(5)]) == 5
+    stats = writer.stats()
+    assert stats['dropped'] == 0 and stats['inline'] == 2 and stats['pending'] == 3
+    assert count_rows(user) == before + 2
+
+    writer.stop()
+    assert writer.stats()['flushed'] == 5
+    assert count_rows(user) == before + 5
+
+
+def test_flush_waits_only_for_the_users_earlier_rows(user):
+    before = count_rows(user)
+    writer = HistoryWriter(app, db, Prediction.__table__, mode='async', flush_interval_ms=60000)
+    writer._ensure_started = lambda: None
+
+    writer.write([make_row(user, 1.0), make_row(user, 2.0)])
+    writer.write([make_row(None, 3.0)])
+    assert writer.flush(user_id=user, timeout=5)
+    assert count_rows(user) == before + 2
+    assert writer.flush(user_id=user, timeout=0)  # nothing of theirs left to wait for
+    writer.stop()
+
+
+def test_flush_is_not_starved_by_later_writes(user):
+    writer = HistoryWriter(app, db, Prediction.__table__, mode='async', batch_size=5, flush_interval_ms=5)
+    writer.write([make_row(user, 1.0)])
+    stop = time.monotonic() + 3
+
+    def keep_writing():
+        while time.monotonic() < stop:
+            writer.write([make_row(user, 2.0)])
+
+    producer = threading.Thread(target=keep_writing)
+    producer.start()
+    start = time.monotonic()
+    assert writer.flush(timeout=2)
+    assert time.monotonic() - start < 2
+    producer.join()
+    writer.stop()
+
+
+def test_flush_does_not_wait_out_the_batching_interval(user):
+    writer = HistoryWriter(app, db, Prediction.__table__, mode='async', flush_interval_ms=2000)
+    writer.write([make_row(user, 1.0)])
+    deadline = time.monotonic() + 5
+    while writer.pending() and time.monotonic() < deadline:
+        time.sleep(0.005)  # until the background thread holds the row for its batch
+
+    start = time.monotonic()
+    assert writer.flush(user_id=user, timeout=5)
+    assert time.monotonic() - start < 0.2
+    assert count_rows(user) == 1
+    writer.stop()
+
+
+def test_failed_batch_is_retried_not_dropped(user, monkeypatch):
+    before = count_rows(user)
+    monkeypatch.setattr(history_writer, 'RETRY_DELAY_SECONDS', 0.01)
+    writer = HistoryWriter(app, db, Prediction.__table__, mode='async', flush_interval_ms=60000)
+    writer._ensure_started = lambda: None
+    insert, failures = writer._insert, []
+
+    def flaky_insert(rows):
+        if len(failures) < 2:
+            failures.append(1)
+            raise OperationalError('INSERT', {}, Exception('database is locked'))
+        insert(rows)
+
+    writer._insert = flaky_insert
+    writer.write([make_row(user, 1.0), make_row(user, 2.0)])
+    assert writer.flush(timeout=5)
+    stats = writer.stats()
+    assert stats['retries'] == 2 and stats['dropped'] == 0 and stats['flushed'] == 2
+    assert count_rows(user) == before + 2
+    writer.stop()
+
+
+def test_history_reads_the_users_queued_rows(user, login, monkeypatch):
+    import app as app_module
+
+    writer = HistoryWriter(app, db, Prediction.__table__, mode='async', flush_interval_ms=60000)
+    writer._ensure_started = lambda: None
+    monkeypatch.setattr(app_module, 'history_writer', writer)
+    writer.write([make_row(user, 123.0)])
+
+    response = login(user).get('/history?limit=1')
+    assert response.status_code == 200
+    assert response.get_json()[0]['predicted_price'] == 123.0
+    writer.stop()
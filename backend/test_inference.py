@@ -0,0 +1,75 @@
+"""
+Parity tests - the compiled NumPy engine must match the pickled sklearn objects
+"""
+import os
+import pickle
+
+import numpy as np
+import pytest
+from sklearn.ensemble import GradientBoostingRegressor, RandomForestRegressor
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+from sklearn.tree import DecisionTreeRegressor
+
+from inference import CompiledModel, SklearnPipeline
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_pickle(name):
+    with open(os.path.join(base_dir, name), 'rb') as f:
+        return pickle.load(f)
+
+
+def random_features(encoder, n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.integers(0, len(encoder.classes_), n),
+        rng.uniform(1.5, 4.5, n),
+        rng.choice([4, 8, 16, 32], n),
+        rng.choice([256, 512, 1000], n),
+        rng.uniform(11, 17.3, n),
+        rng.uniform(1.0, 4.0, n),
+    ]).astype(np.float64)
+
+
+def test_shipped_model_parity():
+    model, scaler, encoder = load_pickle('model.pkl'), load_pickle('scaler.pkl'), load_pickle('encoder.pkl')
+    reference = SklearnPipeline(model, scaler, encoder)
+    compiled = CompiledModel.from_sklearn(model, scaler, encoder)
+    assert compiled.kind == 'linear'
+
+    features = random_features(encoder)
+    np.testing.assert_allclose(compiled.predict(features), reference.predict(features), rtol=1e-9)
+
+    for brand in encoder.classes_:
+        values = (3.5, 8, 512, 15.6, 2.0)
+        assert compiled.predict_one(brand, *values) == pytest.approx(reference.predict_one(brand, *values), rel=1e-9)
+
+
+@pytest.mark.parametrize('estimator', [
+    DecisionTreeRegressor(max_depth=8, random_state=0),
+    RandomForestRegressor(n_estimators=20, max_depth=6, random_state=0),
+    GradientBoostingRegressor(n_estimators=30, max_depth=3, random_state=0),
+])
+def test_tree_ensemble_parity(estimator):
+    encoder = LabelEncoder().fit(['Acer', 'Asus', 'Dell', 'HP', 'Lenovo'])
+    features = random_features(encoder, seed=1)
+    prices = features @ [500, 9000, 700, 12, 300, -800] + np.random.default_rng(2).normal(0, 500, len(features))
+    scaler = StandardScaler().fit(features)
+    estimator.fit(scaler.transform(features), prices)
+
+    reference = SklearnPipeline(estimator, scaler, encoder)
+    compiled = CompiledModel.from_sklearn(estimator, scaler, encoder)
+    assert compiled.kind == 'trees'
+
+    test_features = random_features(encoder, seed=3)
+    np.testing.assert_allclose(compiled.predict(test_features), reference.predict(test_features), rtol=1e-9)
+
+
+def test_unknown_brand_raises():
+    model, scaler, encoder = load_pickle('model.pkl'), load_pickle('scaler.pkl'), load_pickle('encoder.pkl')
+    compiled = CompiledModel.from_sklearn(model, scaler, encoder)
+    with pytest.raises(ValueError):
+        compiled.predict_one('Apple', 3.0, 8, 256, 13.3, 1.3)
+    with pytest.raises(ValueError):
+        compiled.encode(['HP', 'Apple'])
@@ -0,0 +1,44 @@
+"""
+Test stage timings, error counters and the Prometheus /metrics endpoint
+"""
+from app import model_registry
+from metrics import Metrics
+
+LAPTOP = {'brand': 'HP', 'processor_speed': 3.5, 'ram_size': 8, 'storage_capacity': 512, 'screen_size': 15.6, 'weight': 2.0}
+
+
+def test_histogram_buckets_are_cumulative():
+    metrics = Metrics(enabled=True, buckets=(0.001, 0.01))
+    labels = (('route', 'predict'), ('stage', 'inference'))
+    for seconds in (0.0005, 0.005, 0.5):
+        metrics.observe('app_stage_seconds', labels, seconds)
+
+    text = metrics.render()
+    assert 'app_stage_seconds_bucket{route="predict",stage="inference",le="0.001"} 1' in text
+    assert 'app_stage_seconds_bucket{route="predict",stage="inference",le="0.01"} 2' in text
+    assert 'app_stage_seconds_bucket{route="predict",stage="inference",le="+Inf"} 3' in text
+    assert 'app_stage_seconds_count{route="predict",stage="inference"} 3' in text
+
+
+def test_disabled_metrics_record_nothing():
+    metrics = Metrics(enabled=False)
+    with metrics.span('predict', 'inference'):
+        pass
+    metrics.count_error('predict', ValueError('boom'))
+    assert metrics.render() == '\n'
+
+
+def test_metrics_endpoint_reports_predict_stages_and_errors(logged_in_client):
+    logged_in_client.post('/predict', json=LAPTOP)
+    logged_in_client.post('/predict', json=dict(LAPTOP, brand='Apple'))
+
+    response = logged_in_client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain')
+    text = response.get_data(as_text=True)
+    for stage in ('parse', 'cache_lookup', 'db_write', 'serialize'):
+        assert f'app_stage_seconds_count{{route="predict",stage="{stage}"}}' in text
+    assert 'app_errors_total{route="predict",type="unknown_brand"}' in text
+    assert 'app_requests_total{endpoint="predict",method="POST",status="400"}' in text
+    assert 'laptop_price_prediction_cache_hits' in text
+    assert f'laptop_price_model_info{{version="{model_registry.version[:12]}"' in text
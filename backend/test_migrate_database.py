@@ -0,0 +1,64 @@
+"""
+Test migrate_database.py - versions are recorded once, and a table rebuild
+resumes from its checkpoint without losing writes made during the copy
+"""
+import sqlite3
+
+from migrate_database import MIGRATIONS, migrate, status, table_columns
+
+ROWS = 23
+
+
+def quiet(message):
+    pass
+
+
+def make_old_db(path):
+    """A database from before predictions had owners or timestamps"""
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE user (id INTEGER PRIMARY KEY, username VARCHAR(80), email VARCHAR(120), '
+                 'password_hash VARCHAR(200), created_at DATETIME)')
+    conn.execute("INSERT INTO user VALUES (7, 'first', 'first@example.com', 'x', '2024-01-01')")
+    conn.execute('CREATE TABLE prediction (id INTEGER PRIMARY KEY, brand VARCHAR(50), processor_speed FLOAT, '
+                 'ram_size INTEGER, storage_capacity INTEGER, screen_size FLOAT, weight FLOAT, predicted_price FLOAT)')
+    conn.executemany('INSERT INTO prediction VALUES (?, ?, 2.5, 8, 512, 15.6, 2.0, ?)',
+                     [(i, 'HP', 1000.0 + i) for i in range(1, ROWS + 1)])
+    conn.commit()
+    conn.close()
+
+
+def test_fresh_database(tmp_path):
+    db_path = str(tmp_path / 'new.db')
+    assert migrate(db_path, log=quiet) == [m.version for m in MIGRATIONS]
+    assert all(applied_at for _, _, applied_at in status(db_path))
+    conn = sqlite3.connect(db_path)
+    assert 'user_id' in table_columns(conn, 'prediction') and 'phone' in table_columns(conn, 'user')
+    conn.close()
+
+
+def test_rebuild_resumes_and_keeps_concurrent_writes(tmp_path):
+    db_path = str(tmp_path / 'old.db')
+    make_old_db(db_path)
+
+    # Stop the copy part-way, as if the process had been killed
+    assert migrate(db_path, batch_size=5, pause=0, max_batches=2, log=quiet) == [1, 2]
+    conn = sqlite3.connect(db_path)
+    assert conn.execute('SELECT last_id FROM migration_checkpoint').fetchone() == (10,)
+
+    # The app keeps writing to the old table meanwhile
+    conn.execute("INSERT INTO prediction VALUES (100, 'Dell', 3.0, 16, 1024, 14.0, 1.5, 2500.0)")
+    conn.execute('UPDATE prediction SET predicted_price = 1.0 WHERE id IN (3, 20)')  # copied and not yet copied
+    conn.execute('DELETE FROM prediction WHERE id IN (4, 21)')
+    conn.commit()
+    conn.close()
+
+    assert migrate(db_path, batch_size=5, pause=0, log=quiet) == [3, 4]
+    conn = sqlite3.connect(db_path)
+    rows = {row[0]: row[1:] for row in conn.execute('SELECT id, user_id, predicted_price, created_at FROM prediction')}
+    assert set(rows) == set(range(1, ROWS + 1)) - {4, 21} | {100}
+    assert {user_id for user_id, _, _ in rows.values()} == {7}
+    assert rows[3][1] == rows[20][1] == 1.0 and rows[100][1] == 2500.0
+    assert all(created_at for _, _, created_at in rows.values())
+    assert conn.execute('SELECT COUNT(*) FROM migration_checkpoint').fetchone() == (0,)
+    assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name LIKE 'prediction__new%'").fetchone() == (0,)
+    conn.close()
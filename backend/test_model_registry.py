@@ -0,0 +1,175 @@
+"""
+Test lazy model loading, the model bundle and hot reload
+"""
+import os
+import pickle
+import shutil
+import subprocess
+import sys
+import threading
+
+import pytest
+
+from model_bundle import BundleError, check_components, load_bundle
+from model_registry import ModelRegistry, build_bundle, load_pickle
+
+base_dir = os.path.dirname(os.path.abspath(__file__))
+LAPTOP = ('HP', 3.5, 8, 512, 15.6, 2.0)
+
+
+@pytest.fixture
+def artifact_dir(tmp_path):
+    for name in ('model.pkl', 'encoder.pkl', 'scaler.pkl'):
+        shutil.copy(os.path.join(base_dir, name), tmp_path / name)
+    return tmp_path
+
+
+def test_loads_once_on_first_use(artifact_dir):
+    registry = ModelRegistry(str(artifact_dir))
+    assert registry.stats()['loaded'] is False
+
+    engines = []
+    threads = [threading.Thread(target=lambda: engines.append(registry.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(engine) for engine in engines}) == 1
+    stats = registry.stats()
+    assert stats['loaded'] and stats['source'] == 'pickle' and stats['load_seconds'] > 0
+
+
+def test_bundle_matches_pickles(artifact_dir):
+    from_pickle = ModelRegistry(str(artifact_dir), reload_interval=0).get()
+    build_bundle(str(artifact_dir))
+    registry = ModelRegistry(str(artifact_dir), reload_interval=0)
+    from_bundle = registry.get()
+
+    assert registry.source == 'bundle'
+    assert from_bundle.version == from_pickle.version
+    assert from_bundle.predict_one(*LAPTOP) == pytest.approx(from_pickle.predict_one(*LAPTOP), rel=1e-12)
+
+
+def test_bundle_deployed_without_pickles(artifact_dir):
+    build_bundle(str(artifact_dir))
+    for name in ('model.pkl', 'encoder.pkl', 'scaler.pkl'):
+        os.remove(artifact_dir / name)
+    registry = ModelRegistry(str(artifact_dir), reload_interval=0)
+    assert registry.get() is not None and registry.source == 'bundle'
+    assert registry.reload() is False
+
+
+def test_corrupt_bundle_is_refused(artifact_dir):
+    path = build_bundle(str(artifact_dir))
+    with open(path, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+    with pytest.raises(BundleError, match='Checksum'):
+        load_bundle(path)
+    # With the pickles still present the registry falls back to them
+    registry = ModelRegistry(str(artifact_dir), reload_interval=0)
+    assert registry.get() is not None and registry.source == 'pickle'
+
+
+def rewrite_manifest(path, edit):
+    """Re-write a bundle's manifest (with a matching id) after edit(manifest)"""
+    import struct
+    from model_bundle import MAGIC, _bundle_id, _canonical, _read_header
+    with open(path, 'rb') as f:
+        manifest, payload_start = _read_header(f)
+        f.seek(payload_start)
+        payload = f.read()
+    edit(manifest)
+    manifest['bundle_id'] = _bundle_id(manifest)
+    header = _canonical(manifest)
+    padding = -(len(MAGIC) + 8 + len(header)) % 64
+    with open(path, 'wb') as f:
+        f.write(MAGIC + struct.pack('<Q', len(header)) + header + b'\0' * padding + payload)
+
+
+@pytest.mark.parametrize('damage', [
+    lambda path: os.truncate(path, 12),
+    lambda path: rewrite_manifest(path, lambda manifest: manifest.pop('arrays')),
+    lambda path: rewrite_manifest(path, lambda manifest: manifest['arrays']['weights' if 'weights' in manifest['arrays']
+                                                                          else 'mean'].update(shape=[7, 7])),
+    lambda path: rewrite_manifest(path, lambda manifest: manifest.update(model='linear')),
+])
+def test_malformed_bundle_raises_bundle_error(artifact_dir, damage):
+    path = build_bundle(str(artifact_dir))
+    damage(path)
+    with pytest.raises(BundleError):
+        load_bundle(path)
+    registry = ModelRegistry(str(artifact_dir), reload_interval=0)
+    assert registry.get() is not None and registry.source == 'pickle'
+
+
+def test_mismatched_components_are_refused(artifact_dir):
+    from sklearn.preprocessing import LabelEncoder
+    model = load_pickle(str(artifact_dir / 'model.pkl'))
+    scaler = load_pickle(str(artifact_dir / 'scaler.pkl'))
+    # An encoder re-fitted on its own with fewer brands than the model was trained on
+    encoder = LabelEncoder().fit(['Dell', 'HP'])
+    with pytest.raises(BundleError, match='re-fitted'):
+        check_components(model, scaler, encoder)
+
+
+def test_stale_bundle_is_ignored(artifact_dir):
+    build_bundle(str(artifact_dir))
+    with open(artifact_dir / 'encoder.pkl', 'ab') as f:
+        f.write(b'\0')  # pickle still loads, but the hash no longer matches
+
+    registry = ModelRegistry(str(artifact_dir))
+    assert registry.get() is not None
+    assert registry.source == 'pickle'
+
+
+def test_app_import_and_bundle_predict_skip_sklearn(tmp_path):
+    script = (
+        "import sys; import app; "
+        "assert 'numpy' not in sys.modules and 'sklearn' not in sys.modules; "
+        "engine = app.model_registry.get(); "
+        "assert app.model_registry.source == 'bundle', app.model_registry.source; "
+        "engine.predict_one('HP', 3.5, 8, 512, 15.6, 2.0); "
+        "assert 'sklearn' not in sys.modules"
+    )
+    env = dict(os.environ, DATABASE_URL='sqlite:///' + str(tmp_path / 'app.db'))
+    result = subprocess.run([sys.executable, '-c', script], cwd=base_dir, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_reload_swaps_in_changed_artifacts(artifact_dir):
+    registry = ModelRegistry(str(artifact_dir), reload_interval=0)
+    old_engine = registry.get()
+    old_price = old_engine.predict_one(*LAPTOP)
+    assert registry.reload() is False  # nothing changed
+
+    model = load_pickle(str(artifact_dir / 'model.pkl'))
+    model.intercept_ = model.intercept_ + 1000.0
+    with open(artifact_dir / 'model.pkl', 'wb') as f:
+        pickle.dump(model, f)
+
+    assert registry.reload() is True
+    new_engine = registry.get()
+    assert new_engine is not old_engine
+    assert new_engine.version == registry.version != old_engine.version
+    assert new_engine.predict_one(*LAPTOP) == pytest.approx(old_price + 1000.0)
+    # A request still holding the old engine keeps getting consistent old prices
+    assert old_engine.predict_one(*LAPTOP) == pytest.approx(old_price)
+    assert registry.stats()['reloads'] == 1
+
+
+def test_broken_artifact_keeps_serving_current_model(artifact_dir):
+    registry = ModelRegistry(str(artifact_dir), reload_interval=0)
+    engine = registry.get()
+    with open(artifact_dir / 'scaler.pkl', 'wb') as f:
+        f.write(b'not a pickle')
+
+    assert registry.reload() is False
+    assert registry.get() is engine
+    stats = registry.stats()
+    assert stats['reload_failures'] == 1 and stats['reload_error']
+    assert registry.reload() is False  # same broken files are not retried
+    assert registry.stats()['reload_failures'] == 1
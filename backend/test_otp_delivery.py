@@ -0,0 +1,121 @@
+"""
+Test background OTP delivery against a local SMTP stand-in (no real email is sent)
+"""
+import smtplib
+import socket
+import threading
+import warnings
+
+import pytest
+
+from otp_delivery import OTPDeliveryService
+
+# smtpd/asyncore ship with Python up to 3.11 (the Vercel runtime); skip the live test elsewhere
+with warnings.catch_warnings():
+    warnings.simplefilter('ignore', DeprecationWarning)
+    try:
+        import asyncore
+        import smtpd
+    except ImportError:
+        smtpd = None
+
+
+def make_recording_server(port):
+    class RecordingSMTPServer(smtpd.SMTPServer):
+        """Accepts every message and keeps it in memory"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.messages = []
+            self.connections = 0
+
+        def handle_accepted(self, conn, addr):
+            self.connections += 1
+            super().handle_accepted(conn, addr)
+
+        def process_message(self, peer, mailfrom, rcpttos, data, **kwargs):
+            self.messages.append((rcpttos, data))
+
+    return RecordingSMTPServer(('127.0.0.1', port), None, decode_data=False)
+
+
+@pytest.fixture
+def smtp_server():
+    if smtpd is None:
+        pytest.skip('smtpd is not available on this Python version')
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+    server = make_recording_server(port)
+    thread = threading.Thread(target=asyncore.loop, kwargs={'timeout': 0.05}, daemon=True)
+    thread.start()
+    yield server, port
+    server.close()
+    thread.join(timeout=5)
+
+
+def test_async_delivery_reuses_connection(smtp_server):
+    server, port = smtp_server
+    service = OTPDeliveryService('127.0.0.1', port, 'noreply@example.com', '', 10,
+                                 mode='async', workers=1, use_tls=False)
+    for i in range(5):
+        assert service.submit(f'user{i}@example.com', f'{100000 + i}', f'user{i}') is True
+    assert service.wait(timeout=10)
+    service.stop()
+
+    assert len(server.messages) == 5
+    assert server.connections == 1
+    stats = service.stats()
+    assert stats['sent'] == 5 and stats['failed'] == 0 and stats['queue_depth'] == 0
+    assert stats['latency_max_seconds'] > 0
+
+
+class FlakySMTP:
+    """smtplib.SMTP stand-in whose first connection drops on the first send"""
+    instances = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        FlakySMTP.instances.append(self)
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def send_message(self, msg):
+        if len(FlakySMTP.instances) == 1:
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        self.sent.append(msg['To'])
+
+    def close(self):
+        pass
+
+    def quit(self):
+        pass
+
+
+def test_reconnects_and_retries_after_disconnect():
+    FlakySMTP.instances = []
+    service = OTPDeliveryService('smtp.example.com', 587, 'noreply@example.com', 'secret', 10,
+                                 mode='sync', backoff_seconds=0, smtp_factory=FlakySMTP)
+
+    assert service.submit('user@example.com', '123456', 'user') is True
+    assert service.submit('other@example.com', '654321', 'other') is True
+
+    assert len(FlakySMTP.instances) == 2
+    assert FlakySMTP.instances[1].sent == ['user@example.com', 'other@example.com']
+    assert service.stats()['retries'] == 1
+
+
+def test_gives_up_after_max_retries():
+    class DownSMTP(FlakySMTP):
+        def __init__(self, host, port, timeout=None):
+            raise ConnectionRefusedError('connection refused')
+
+    service = OTPDeliveryService('smtp.example.com', 587, 'noreply@example.com', 'secret', 10,
+                                 mode='sync', max_retries=2, backoff_seconds=0, smtp_factory=DownSMTP)
+    assert service.submit('user@example.com', '123456', 'user') is False
+    stats = service.stats()
+    assert stats['failed'] == 1 and stats['retries'] == 2
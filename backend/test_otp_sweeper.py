@@ -0,0 +1,41 @@
+"""
+Test the expired-OTP sweeper - batched deletes honour the retention window
+"""
+from datetime import datetime, timedelta
+
+from app import app, db, OTP
+from otp_sweeper import OTPSweeper
+
+
+def add_otps(user_id, count, expires_at, verified=False):
+    db.session.add_all([
+        OTP(user_id=user_id, otp_code='123456', otp_type='email', expires_at=expires_at, is_verified=verified)
+        for _ in range(count)
+    ])
+    db.session.commit()
+
+
+def test_sweep_deletes_only_rows_past_retention(user):
+    now = datetime.utcnow()
+    with app.app_context():
+        add_otps(user, 23, now - timedelta(hours=3))                  # expired long ago
+        add_otps(user, 4, now - timedelta(hours=2), verified=True)    # verified, long expired
+        add_otps(user, 5, now - timedelta(minutes=10))                # expired, inside retention
+        add_otps(user, 6, now + timedelta(minutes=5))                 # still valid
+
+    sweeper = OTPSweeper(app, db, retention_minutes=60, batch_size=10, interval_seconds=0)
+    assert sweeper.sweep() == 27
+
+    with app.app_context():
+        assert OTP.query.filter_by(user_id=user).count() == 11
+    stats = sweeper.stats()
+    assert stats['runs'] == 1 and stats['rows_reclaimed'] == 27 and stats['last_run_rows'] == 27
+
+
+def test_max_batches_bounds_one_run(user):
+    with app.app_context():
+        add_otps(user, 25, datetime.utcnow() - timedelta(days=1))
+
+    sweeper = OTPSweeper(app, db, retention_minutes=0, batch_size=10, interval_seconds=0)
+    assert sweeper.sweep(max_batches=2) == 20
+    assert sweeper.sweep() == 5
@@ -0,0 +1,43 @@
+"""
+Test configurable password hashing and transparent rehash on signin
+"""
+from werkzeug.security import generate_password_hash
+
+import password_hashing
+from app import app, db, User
+from password_hashing import hash_password, needs_rehash, verify_password
+
+
+def test_configured_method_is_used(monkeypatch):
+    monkeypatch.setattr(password_hashing, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:1000')
+    password_hash = hash_password('secret123')
+    assert password_hash.startswith('pbkdf2:sha256:1000$')
+    assert verify_password(password_hash, 'secret123')
+    assert not needs_rehash(password_hash)
+
+
+def test_outdated_parameters_need_rehash(monkeypatch):
+    monkeypatch.setattr(password_hashing, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:2000')
+    assert needs_rehash(generate_password_hash('secret123', method='pbkdf2:sha256:1000'))
+    assert needs_rehash(generate_password_hash('secret123', method='scrypt'))
+
+
+def test_signin_upgrades_outdated_hash(monkeypatch):
+    monkeypatch.setattr(password_hashing, 'PASSWORD_HASH_METHOD', 'pbkdf2:sha256:2000')
+    with app.app_context():
+        user = User(username='rehash_user', email='rehash@example.com',
+                    password_hash=generate_password_hash('secret123', method='pbkdf2:sha256:1000'))
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+
+    client = app.test_client()
+    assert client.post('/api/signin', json={'username': 'rehash_user', 'password': 'wrong-password'}).status_code == 401
+    with app.app_context():
+        assert db.session.get(User, user_id).password_hash.startswith('pbkdf2:sha256:1000$')
+
+    assert client.post('/api/signin', json={'username': 'rehash_user', 'password': 'secret123'}).status_code == 200
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        assert user.password_hash.startswith('pbkdf2:sha256:2000$')
+        assert user.check_password('secret123')
@@ -0,0 +1,53 @@
+"""
+Test the prediction cache - LRU bound, TTL expiry and model-version invalidation
+"""
+from prediction_cache import PredictionCache, cache_key
+
+
+def test_normalized_keys_match():
+    assert cache_key('HP', '3.5', 8.0, 512, 15.6, 2) == cache_key('HP', 3.5, 8, 512.0, '15.6', 2.0)
+
+
+def test_hits_misses_and_lru_eviction():
+    cache = PredictionCache(max_size=2, ttl_seconds=0)
+    a, b, c = (cache_key(brand, 3.5, 8, 512, 15.6, 2.0) for brand in ('HP', 'Dell', 'Acer'))
+
+    assert cache.get(a, 'v1') is None
+    cache.put(a, 100.0, 'v1')
+    cache.put(b, 200.0, 'v1')
+    assert cache.get(a, 'v1') == 100.0  # a is now most recently used
+    cache.put(c, 300.0, 'v1')           # evicts b
+
+    assert cache.get(b, 'v1') is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (1, 2, 1, 2)
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('prediction_cache.time.monotonic', lambda: now[0])
+    cache = PredictionCache(max_size=10, ttl_seconds=60)
+    key = cache_key('HP', 3.5, 8, 512, 15.6, 2.0)
+
+    cache.put(key, 100.0, 'v1')
+    now[0] += 30
+    assert cache.get(key, 'v1') == 100.0
+    now[0] += 31
+    assert cache.get(key, 'v1') is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_new_model_version_invalidates():
+    cache = PredictionCache(max_size=10, ttl_seconds=0)
+    key = cache_key('HP', 3.5, 8, 512, 15.6, 2.0)
+    cache.put(key, 100.0, 'v1')
+
+    assert cache.get(key, 'v2') is None
+    assert cache.stats()['invalidations'] == 1 and cache.stats()['size'] == 0
+
+
+def test_zero_size_disables_cache():
+    cache = PredictionCache(max_size=0)
+    key = cache_key('HP', 3.5, 8, 512, 15.6, 2.0)
+    cache.put(key, 100.0, 'v1')
+    assert cache.get(key, 'v1') is None
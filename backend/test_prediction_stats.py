@@ -0,0 +1,108 @@
+"""
+Test /history/stats - aggregates are updated as predictions are written and
+match a full rebuild from the prediction table
+"""
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import app, db, history_writer, prediction_stats, Prediction, User
+from prediction_stats import summarize
+
+
+def prediction(user_id, brand, price, created_at):
+    return {'user_id': user_id, 'brand': brand, 'processor_speed': 2.5, 'ram_size': 8,
+            'storage_capacity': 512, 'screen_size': 15.6, 'weight': 2.0,
+            'predicted_price': price, 'created_at': created_at}
+
+
+def rebuild():
+    with db.engine.begin() as connection:
+        prediction_stats.rebuild(connection, Prediction.__table__)
+
+
+@pytest.fixture
+def users(make_user):
+    with app.app_context():
+        # Other tests bulk-delete their predictions behind the aggregates' back
+        rebuild()
+    return make_user('stats'), make_user('stats')
+
+
+def test_stats_follow_writes(users, login):
+    user_a, user_b = users
+    today = datetime.utcnow()
+    yesterday = today - timedelta(days=1)
+
+    def global_hp():
+        brands = login(user_a).get('/history/stats?scope=global').get_json()['by_brand']
+        return next((b['count'] for b in brands if b['brand'] == 'HP'), 0)
+
+    hp_before = global_hp()
+    with app.app_context():
+        history_writer.write([prediction(user_a, 'HP', 1000.0, yesterday), prediction(user_a, 'HP', 1400.0, today)])
+        history_writer.write([prediction(user_a, 'Dell', 900.0, today), prediction(user_b, 'HP', 2000.0, today)])
+
+    stats = login(user_a).get('/history/stats').get_json()
+    assert stats['scope'] == 'user'
+    assert (stats['count'], stats['min_price'], stats['max_price']) == (3, 900.0, 1400.0)
+    assert stats['avg_price'] == 1100.0
+    assert [(b['brand'], b['count'], b['avg_price']) for b in stats['by_brand']] == [('HP', 2, 1200.0), ('Dell', 1, 900.0)]
+    assert [(d['day'], d['count']) for d in stats['by_day']] == [
+        (yesterday.date().isoformat(), 1), (today.date().isoformat(), 2)]
+    assert len(login(user_a).get('/history/stats?days=1').get_json()['by_day']) == 1
+
+    # Global stats don't wait for the write queue
+    history_writer.flush()
+    assert global_hp() == hp_before + 3
+
+    with app.app_context(), db.engine.connect() as connection:
+        assert prediction_stats.verify(connection, Prediction.__table__) == []
+
+
+def test_rebuild_repairs_drift(users, login):
+    user_a, _ = users
+    with app.app_context():
+        # Written around the writer, so the aggregates don't know about it
+        db.session.execute(Prediction.__table__.insert(), [prediction(user_a, 'Acer', 700.0, datetime.utcnow())])
+        db.session.commit()
+        with db.engine.connect() as connection:
+            assert prediction_stats.verify(connection, Prediction.__table__)
+        rebuild()
+        with db.engine.connect() as connection:
+            assert prediction_stats.verify(connection, Prediction.__table__) == []
+
+    stats = login(user_a).get('/history/stats').get_json()
+    assert stats['by_brand'] == [{'brand': 'Acer', 'count': 1, 'avg_price': 700.0, 'min_price': 700.0, 'max_price': 700.0}]
+
+
+def test_deleted_user_stats_are_dropped(users, login):
+    user_a, _ = users
+    with app.app_context():
+        history_writer.write([prediction(user_a, 'HP', 1000.0, datetime.utcnow())])
+        history_writer.flush()
+        db.session.delete(db.session.get(User, user_a))
+        db.session.commit()
+    assert login(user_a).get('/history/stats').get_json()['count'] == 0
+
+
+def test_non_finite_prices_are_not_counted(users, login):
+    user_a, _ = users
+    now = datetime.utcnow()
+    with app.app_context():
+        history_writer.write([prediction(user_a, 'HP', price, now)
+                              for price in (1000.0, float('inf'), float('-inf'), float('nan'))])
+    history_writer.flush()
+
+    stats = login(user_a).get('/history/stats').get_json()
+    assert (stats['count'], stats['avg_price'], stats['min_price'], stats['max_price']) == (1, 1000.0, 1000.0, 1000.0)
+    assert summarize([{'user_id': user_a, 'predicted_price': float('nan')}], lambda row, user_id: user_id) == {}
+    with app.app_context(), db.engine.connect() as connection:
+        assert prediction_stats.verify(connection, Prediction.__table__) == []
+
+
+def test_stats_parameters(logged_in_client):
+    assert app.test_client().get('/history/stats').status_code == 401
+    client = logged_in_client
+    assert client.get('/history/stats?scope=team').status_code == 400
+    assert client.get('/history/stats?days=abc').status_code == 400
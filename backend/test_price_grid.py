@@ -0,0 +1,40 @@
+"""
+Test the precomputed price grid - exact hits match the model, everything else falls through
+"""
+import pytest
+
+from app import model_registry
+from prediction_cache import cache_key
+from price_grid import PriceGrid, build_grid
+
+AXES = {
+    'brand': ['HP', 'Dell'],
+    'processor_speed': [2.5, 3.5],
+    'ram_size': [8, 16],
+    'storage_capacity': [256, 512],
+    'screen_size': [14.0, 15.6],
+    'weight': [1.5, 2.0],
+}
+
+
+@pytest.fixture
+def grid(tmp_path):
+    engine = model_registry.get()
+    shape = build_grid(engine, model_registry.version, str(tmp_path), AXES)
+    assert shape == (2, 2, 2, 2, 2, 2)
+    return engine, PriceGrid(str(tmp_path))
+
+
+def test_grid_hits_match_the_model(grid):
+    engine, price_grid = grid
+    for key in (cache_key('HP', 3.5, 8, 512, 15.6, 2.0), cache_key('Dell', '2.5', '16', 256.0, 14, 1.5)):
+        assert price_grid.lookup(key, model_registry.version) == pytest.approx(engine.predict_one(*key))
+    assert price_grid.stats()['hits'] == 2
+
+
+def test_off_grid_and_stale_version_miss(grid):
+    _, price_grid = grid
+    assert price_grid.lookup(cache_key('HP', 3.6, 8, 512, 15.6, 2.0), model_registry.version) is None
+    assert price_grid.lookup(cache_key('Acer', 3.5, 8, 512, 15.6, 2.0), model_registry.version) is None
+    assert price_grid.lookup(cache_key('HP', 3.5, 8, 512, 15.6, 2.0), 'another-model') is None
+    assert not price_grid.stats()['loaded']
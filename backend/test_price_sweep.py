@@ -0,0 +1,64 @@
+"""
+Test /predict/sweep - curves and surfaces must match single predictions
+"""
+import pytest
+
+from app import app, model_registry
+from prediction_cache import cache_key
+from price_sweep import MAX_AXIS_POINTS
+
+BASE = {'brand': 'HP', 'processor_speed': 3.5, 'ram_size': 8, 'storage_capacity': 512, 'screen_size': 15.6, 'weight': 2.0}
+
+
+def test_one_axis_curve(logged_in_client):
+    response = logged_in_client.post('/predict/sweep', json={
+        'base': BASE, 'axes': [{'feature': 'ram_size', 'values': [4, 8, 16, 32]}]})
+    assert response.status_code == 200
+    data = response.get_json()
+    engine = model_registry.get()
+    expected = [engine.predict_one(*cache_key(**dict(BASE, ram_size=ram))) for ram in (4, 8, 16, 32)]
+    assert data['prices'] == pytest.approx(expected)
+    assert data['min_price'] == pytest.approx(min(expected))
+
+
+def test_two_axis_surface_with_range_and_brand(logged_in_client):
+    response = logged_in_client.post('/predict/sweep', json={'base': BASE, 'axes': [
+        {'feature': 'brand', 'values': ['Dell', 'Lenovo']},
+        {'feature': 'storage_capacity', 'start': 256, 'stop': 1024, 'step': 256},
+    ]})
+    assert response.status_code == 200
+    data = response.get_json()
+    assert data['axes'][1]['values'] == [256, 512, 768, 1024]
+    engine = model_registry.get()
+    assert len(data['prices']) == 2 and len(data['prices'][0]) == 4
+    assert data['prices'][1][2] == pytest.approx(
+        engine.predict_one(*cache_key(**dict(BASE, brand='Lenovo', storage_capacity=768))))
+
+
+@pytest.mark.parametrize('body', [
+    {'base': BASE, 'axes': []},
+    {'base': BASE, 'axes': [{'feature': 'ram_size', 'start': 1, 'stop': 1e9, 'step': 1}]},
+    {'base': BASE, 'axes': [{'feature': 'weight', 'values': [1.0]}, {'feature': 'weight', 'values': [2.0]}]},
+    {'base': dict(BASE, brand='Apple'), 'axes': [{'feature': 'ram_size', 'values': [8]}]},
+    {'base': BASE, 'axes': [{'feature': 'weight', 'start': 1, 'stop': float('inf'), 'step': 1}]},
+    {'base': BASE, 'axes': [{'feature': 'ram_size', 'values': [8, float('inf')]}]},
+    {'base': BASE, 'axes': [{'feature': 'screen_size', 'values': [float('nan')]}]},
+    {'base': BASE, 'axes': [{'feature': 'weight', 'start': -1e308, 'stop': 1e308, 'step': 1e-308}]},
+    {'base': BASE, 'axes': [{'feature': 'ram_size', 'start': 1, 'stop': 8, 'num': float('inf')}]},
+])
+def test_invalid_sweeps_are_rejected(logged_in_client, body):
+    response = logged_in_client.post('/predict/sweep', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_oversized_axis_error_stays_short(logged_in_client):
+    response = logged_in_client.post('/predict/sweep', json={
+        'base': BASE, 'axes': [{'feature': 'weight', 'start': 0, 'stop': 6e299, 'step': 1}]})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == f"Axis 'weight' has more than {MAX_AXIS_POINTS} points"
+
+
+def test_requires_login():
+    response = app.test_client().post('/predict/sweep', json={'base': BASE, 'axes': []})
+    assert response.status_code == 401
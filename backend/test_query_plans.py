@@ -0,0 +1,34 @@
+"""
+Test that every hot query is served by an index, and that the migration adds them
+"""
+import sqlite3
+
+from check_query_plans import check_query_plans, is_table_scan
+from migrate_database import INDEXES, migrate
+
+
+def test_hot_queries_use_indexes():
+    assert check_query_plans() == []
+
+
+def test_scan_detection():
+    assert is_table_scan('SCAN prediction')
+    assert is_table_scan('SCAN TABLE otp')
+    assert not is_table_scan('SCAN prediction USING INDEX ix_prediction_user_id_id')
+    assert not is_table_scan('SEARCH otp USING INDEX ix_otp_user_verified_code_expires (user_id=?)')
+
+
+def test_migration_adds_missing_indexes(tmp_path):
+    db_path = str(tmp_path / 'old.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute('CREATE TABLE prediction (id INTEGER PRIMARY KEY, user_id INTEGER NOT NULL)')
+    conn.execute('CREATE TABLE otp (id INTEGER PRIMARY KEY, user_id INTEGER, is_verified BOOLEAN, '
+                 'otp_code VARCHAR(6), expires_at DATETIME)')
+    conn.commit()
+
+    assert migrate(db_path, log=lambda message: None) == [1, 2, 3, 4]
+    assert migrate(db_path, log=lambda message: None) == []  # already applied
+
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='index'")}
+    assert {name for name, _, _ in INDEXES} <= names
+    conn.close()
@@ -0,0 +1,92 @@
+"""
+Tests for the server-side session store
+"""
+import time
+import uuid
+
+from sqlalchemy import event
+
+from app import app, db, User
+from session_store import MemorySessionBackend, SQLiteSessionBackend
+
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemorySessionBackend(max_size=2)
+    backend.set('a', {'user_id': 1}, 60)
+    backend.set('b', {'user_id': 2}, 60)
+    backend.get('a')
+    backend.set('c', {'user_id': 3}, 60)
+    assert backend.get('b') is None
+    assert backend.get('a') == {'user_id': 1}
+    assert backend.stats()['evictions'] == 1
+
+
+def test_memory_backend_expires_idle_sessions():
+    backend = MemorySessionBackend()
+    backend.set('a', {'user_id': 1}, 0)
+    time.sleep(0.01)
+    assert backend.get('a') is None
+
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / 'sessions.db')
+    worker_one = SQLiteSessionBackend(path)
+    worker_two = SQLiteSessionBackend(path)
+    worker_one.set('sid', {'user_id': 5, 'user': {'username': 'x'}}, 60)
+    assert worker_two.get('sid') == {'user_id': 5, 'user': {'username': 'x'}}
+    worker_two.delete('sid')
+    assert worker_one.get('sid') is None
+
+
+def test_check_auth_needs_no_database_query_after_signup():
+    name = f'session_{uuid.uuid4().hex[:8]}'
+    client = app.test_client()
+    response = client.post('/api/signup', json={'username': name, 'email': f'{name}@example.com',
+                                                'password': 'secret123'})
+    assert response.status_code == 201
+
+    statements = []
+    with app.app_context():
+        engine = db.engine
+    listener = lambda *args: statements.append(args[2])  # noqa: E731
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        response = client.get('/api/check-auth')
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+
+    assert response.get_json()['authenticated'] is True
+    assert response.get_json()['user']['username'] == name
+    assert statements == []
+    # Unchanged sessions are not re-sent
+    assert 'Set-Cookie' not in response.headers
+
+    client.post('/api/logout')
+    assert client.get('/api/check-auth').get_json() == {'authenticated': False}
+
+    with app.app_context():
+        User.query.filter_by(username=name).delete()
+        db.session.commit()
+
+
+def test_session_id_is_rotated_on_login():
+    name = f'fixation_{uuid.uuid4().hex[:8]}'
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['visited'] = True  # an anonymous session whose id an attacker could have planted
+    planted = client.get_cookie('session').value
+
+    response = client.post('/api/signup', json={'username': name, 'email': f'{name}@example.com',
+                                                'password': 'secret123'})
+    assert response.status_code == 201
+    assert client.get_cookie('session').value != planted
+    assert app.session_interface.backend.get(planted) is None
+
+    # The planted id is not logged in
+    attacker = app.test_client()
+    attacker.set_cookie('session', planted)
+    assert attacker.get('/api/check-auth').get_json() == {'authenticated': False}
+
+    with app.app_context():
+        User.query.filter_by(username=name).delete()
+        db.session.commit()
@@ -0,0 +1,73 @@
+"""
+Test the user profile cache - LRU bound, TTL expiry and invalidation on User writes
+"""
+from app import app, db, User, user_cache
+from user_cache import UserCache
+
+
+def test_hits_misses_and_lru_eviction():
+    cache = UserCache(max_size=2, ttl_seconds=0)
+    assert cache.get(1) is None
+    cache.put(1, {'id': 1})
+    cache.put(2, {'id': 2})
+    assert cache.get(1) == {'id': 1}
+    cache.put(3, {'id': 3})  # evicts 2
+
+    assert cache.get(2) is None
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions'], stats['size']) == (1, 2, 1, 2)
+    assert stats['hit_rate'] == 1 / 3
+
+
+def test_ttl_expiry(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('user_cache.time.monotonic', lambda: now[0])
+    cache = UserCache(max_size=10, ttl_seconds=60)
+    cache.put(1, {'id': 1})
+    now[0] += 61
+    assert cache.get(1) is None
+    assert cache.stats()['expirations'] == 1
+
+
+def test_profile_change_invalidates_entry(make_user):
+    user_id = make_user('cache', phone='111')
+    with app.app_context():
+        user = db.session.get(User, user_id)
+
+        loads = []
+        def load(uid):
+            loads.append(uid)
+            return User.query.get(uid)
+
+        assert user_cache.get_or_load(user_id, load)['phone'] == '111'
+        assert user_cache.get_or_load(user_id, load)['phone'] == '111'
+        assert loads == [user_id]
+
+        user.phone = '222'
+        db.session.commit()
+        assert user_cache.get_or_load(user_id, load)['phone'] == '222'
+        assert loads == [user_id, user_id]
+
+        db.session.delete(user)
+        db.session.commit()
+        assert user_cache.get_or_load(user_id, load) is None
+
+
+def test_invalidation_waits_for_commit(make_user):
+    user_id = make_user('cache', phone='111')
+    with app.app_context():
+        user = db.session.get(User, user_id)
+
+        user.phone = '222'
+        db.session.flush()
+        # A concurrent request re-caching the still-committed row before our commit...
+        user_cache.put(user_id, {'id': user_id, 'phone': '111'})
+        db.session.commit()
+        # ...is cleaned up by the commit
+        assert user_cache.get(user_id) is None
+
+        user_cache.put(user_id, {'id': user_id, 'phone': '222'})
+        user.phone = '333'
+        db.session.flush()
+        db.session.rollback()
+        assert user_cache.get(user_id) == {'id': user_id, 'phone': '222'}
@@ -18,3 +18,4 @@ with open(encoder_path, 'wb') as f:
 
 print("Encoder updated successfully!")
 print(f"Available brands: {list(encoder.classes_)}")
+print("Run python model_registry.py to check it against the model and scaler and rebuild model.bundle")
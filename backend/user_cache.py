@@ -0,0 +1,121 @@
+"""
+User profile cache - LRU + TTL cache of User.to_dict() payloads keyed on user id.
+
+/api/check-auth, /api/verify-otp and /api/resend-otp read the profile from
+here instead of loading the User row on every request. Entries are dropped
+when a transaction that inserted, updated or deleted a User row commits
+(see watch()) - not at flush, when a concurrent request could still load
+and re-cache the old row.
+
+Invalidation is per-process only: other gunicorn workers (and scripts
+writing to the database) don't see it, so there the TTL bounds staleness.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+DEFAULT_MAX_SIZE = int(os.environ.get('USER_CACHE_SIZE', 4096))
+DEFAULT_TTL_SECONDS = float(os.environ.get('USER_CACHE_TTL', 300))
+
+
+class UserCache:
+    """Thread-safe bounded cache of profile dicts; max_size=0 disables it"""
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl_seconds=DEFAULT_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # user_id -> (payload, stored_at)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, user_id):
+        """Return the cached payload, or None on a miss"""
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            payload, stored_at = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[user_id]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return payload
+
+    def put(self, user_id, payload):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[user_id] = (payload, time.monotonic())
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, user_id, load):
+        """Cached payload, or load(user_id) -> User (or None) on a miss"""
+        payload = self.get(user_id)
+        if payload is None:
+            user = load(user_id)
+            if user is None:
+                return None
+            payload = user.to_dict()
+            self.put(user_id, payload)
+        return payload
+
+    def invalidate(self, user_id):
+        with self._lock:
+            if self._entries.pop(user_id, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def watch(self, model):
+        """Invalidate users of the given model whose insert/update/delete was committed"""
+        key = ('user_cache', id(self))
+
+        def changed(mapper, connection, target):
+            session = object_session(target)
+            if session is not None:
+                session.info.setdefault(key, set()).add(target.id)
+
+        def committed(session):
+            for user_id in session.info.pop(key, ()):
+                self.invalidate(user_id)
+
+        def rolled_back(session, previous_transaction=None):
+            session.info.pop(key, None)
+
+        for name in ('after_insert', 'after_update', 'after_delete'):
+            event.listen(model, name, changed)
+        event.listen(Session, 'after_commit', committed)
+        event.listen(Session, 'after_rollback', rolled_back)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'max_size': self.max_size,
+            'ttl_seconds': self.ttl_seconds,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }